@@ -0,0 +1,34 @@
+"""add pagination indexes
+
+Revision ID: 4b1f0c9d2e7a
+Revises: dd27fbbfde91
+Create Date: 2026-10-18 09:12:41.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b1f0c9d2e7a'
+down_revision: Union[str, Sequence[str], None] = 'dd27fbbfde91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # InnoDB secondary indexes carry the primary key, so (price) already
+    # orders by (price, id) for keyset pagination.
+    op.create_index('idx_products_price', 'products', ['price'])
+    op.create_index('idx_products_name', 'products', ['name'])
+    op.create_index('idx_products_category_price', 'products', ['category_id', 'price'])
+    op.create_index('idx_categories_name', 'categories', ['name'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_categories_name', table_name='categories')
+    op.drop_index('idx_products_category_price', table_name='products')
+    op.drop_index('idx_products_name', table_name='products')
+    op.drop_index('idx_products_price', table_name='products')
@@ -0,0 +1,31 @@
+"""add users token_version
+
+Revision ID: 5e2d7a9c1f44
+Revises: c3a8f2d41b90
+Create Date: 2026-10-18 15:21:09.774015
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2d7a9c1f44'
+down_revision: Union[str, Sequence[str], None] = 'c3a8f2d41b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Bumped on role changes and deactivation; access tokens carry the
+    # version they were issued at.
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+    # Workers periodically load every user with token_version > 0.
+    op.create_index('idx_users_token_version', 'users', ['token_version'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_users_token_version', table_name='users')
+    op.drop_column('users', 'token_version')
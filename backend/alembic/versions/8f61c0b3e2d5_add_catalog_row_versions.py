@@ -0,0 +1,36 @@
+"""add catalog row versions
+
+Revision ID: 8f61c0b3e2d5
+Revises: 5e2d7a9c1f44
+Create Date: 2026-10-18 16:02:44.180936
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f61c0b3e2d5'
+down_revision: Union[str, Sequence[str], None] = '5e2d7a9c1f44'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # version feeds the ETags of product and category reads; every write to
+    # a row (and every new review of a product) increments it.
+    for table in ('products', 'categories'):
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+        op.add_column(table, sa.Column(
+            'updated_at', sa.TIMESTAMP(),
+            server_default=sa.text('CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP'),
+            nullable=False,
+        ))
+
+
+def downgrade() -> None:
+    for table in ('categories', 'products'):
+        op.drop_column(table, 'updated_at')
+        op.drop_column(table, 'version')
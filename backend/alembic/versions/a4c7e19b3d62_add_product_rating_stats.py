@@ -0,0 +1,47 @@
+"""add product rating stats
+
+Revision ID: a4c7e19b3d62
+Revises: 8f61c0b3e2d5
+Create Date: 2026-10-18 18:21:09.412377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c7e19b3d62'
+down_revision: Union[str, Sequence[str], None] = '8f61c0b3e2d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # One row per reviewed product, kept up to date by create_review_db in
+    # the same transaction as the review, so product reads never aggregate
+    # the reviews table.
+    op.create_table(
+        'product_rating_stats',
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False),
+        *(sa.Column(f'rating_{n}', sa.Integer(), server_default='0', nullable=False) for n in range(1, 6)),
+        sa.PrimaryKeyConstraint('product_id'),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    )
+    op.execute("""
+        INSERT INTO product_rating_stats (product_id, rating_count, rating_sum, rating_1, rating_2, rating_3, rating_4, rating_5)
+        SELECT product_id, COUNT(*), SUM(rating),
+               SUM(rating = 1), SUM(rating = 2), SUM(rating = 3), SUM(rating = 4), SUM(rating = 5)
+        FROM reviews
+        GROUP BY product_id
+    """)
+    # Keyset pagination of a product's reviews, newest first.
+    op.create_index('idx_reviews_product_created_at', 'reviews', ['product_id', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_reviews_product_created_at', table_name='reviews')
+    op.drop_table('product_rating_stats')
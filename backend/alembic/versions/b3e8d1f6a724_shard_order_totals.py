@@ -0,0 +1,41 @@
+"""shard order totals
+
+Revision ID: b3e8d1f6a724
+Revises: f5a1d8c3e947
+Create Date: 2026-10-18 22:14:09.533172
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e8d1f6a724'
+down_revision: Union[str, Sequence[str], None] = 'f5a1d8c3e947'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = (('order_status_totals', 'status'), ('order_daily_totals', 'day'))
+
+
+def upgrade() -> None:
+    # Each status and day becomes ORDER_TOTALS_SLOTS rows (created on first
+    # use) so checkouts stop serializing on one counter row. Existing totals
+    # stay in slot 0.
+    for table, key in TABLES:
+        op.add_column(table, sa.Column('slot', sa.SmallInteger(), server_default='0', nullable=False))
+        op.execute(f"ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY ({key}, slot)")
+
+
+def downgrade() -> None:
+    for table, key in TABLES:
+        op.execute(f"""
+            INSERT INTO {table} ({key}, slot, order_count, revenue)
+            SELECT {key}, 0, SUM(order_count), SUM(revenue) FROM {table} WHERE slot > 0 GROUP BY {key}
+            ON DUPLICATE KEY UPDATE order_count = order_count + VALUES(order_count), revenue = revenue + VALUES(revenue)
+        """)
+        op.execute(f"DELETE FROM {table} WHERE slot > 0")
+        op.execute(f"ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY ({key})")
+        op.drop_column(table, 'slot')
@@ -0,0 +1,31 @@
+"""add products fulltext index
+
+Revision ID: b7d35e0a91c4
+Revises: 4b1f0c9d2e7a
+Create Date: 2026-10-18 10:03:17.552931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d35e0a91c4'
+down_revision: Union[str, Sequence[str], None] = '4b1f0c9d2e7a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ft_products_name_description',
+        'products',
+        ['name', 'description'],
+        mysql_prefix='FULLTEXT'
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ft_products_name_description', table_name='products')
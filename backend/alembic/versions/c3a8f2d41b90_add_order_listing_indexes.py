@@ -0,0 +1,30 @@
+"""add order listing indexes
+
+Revision ID: c3a8f2d41b90
+Revises: b7d35e0a91c4
+Create Date: 2026-10-18 14:03:27.518342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a8f2d41b90'
+down_revision: Union[str, Sequence[str], None] = 'b7d35e0a91c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Admin listings and exports scan orders newest first, optionally for a
+    # single status and a created_at range.
+    op.create_index('idx_orders_created_at', 'orders', ['created_at'])
+    op.create_index('idx_orders_status_created_at', 'orders', ['status', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_orders_status_created_at', table_name='orders')
+    op.drop_index('idx_orders_created_at', table_name='orders')
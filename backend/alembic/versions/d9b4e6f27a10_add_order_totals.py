@@ -0,0 +1,51 @@
+"""add order totals
+
+Revision ID: d9b4e6f27a10
+Revises: a4c7e19b3d62
+Create Date: 2026-10-18 19:03:51.268014
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9b4e6f27a10'
+down_revision: Union[str, Sequence[str], None] = 'a4c7e19b3d62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Order counts and revenue per status, and per day of creation. Updated
+    # by create_order and update_order_status in the order's own
+    # transaction, so /orders/admin/stats never scans orders.
+    op.create_table(
+        'order_status_totals',
+        sa.Column('status', sa.String(50), nullable=False),
+        sa.Column('order_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('revenue', sa.DECIMAL(14, 2), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('status'),
+    )
+    op.create_table(
+        'order_daily_totals',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('order_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('revenue', sa.DECIMAL(14, 2), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('day'),
+    )
+    op.execute("""
+        INSERT INTO order_status_totals (status, order_count, revenue)
+        SELECT status, COUNT(*), SUM(total_price) FROM orders GROUP BY status
+    """)
+    op.execute("""
+        INSERT INTO order_daily_totals (day, order_count, revenue)
+        SELECT DATE(created_at), COUNT(*), SUM(total_price) FROM orders GROUP BY DATE(created_at)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('order_daily_totals')
+    op.drop_table('order_status_totals')
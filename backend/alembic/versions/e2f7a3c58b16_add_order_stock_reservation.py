@@ -0,0 +1,34 @@
+"""add order stock reservation
+
+Revision ID: e2f7a3c58b16
+Revises: d9b4e6f27a10
+Create Date: 2026-10-18 20:41:07.532918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2f7a3c58b16'
+down_revision: Union[str, Sequence[str], None] = 'd9b4e6f27a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # stock_reserved: checkout took the items out of products.stock and
+    # cancelling gives them back. Orders placed before this revision never
+    # took any, so they default to false. reserved_until: when an unpaid
+    # order stops holding its stock and is cancelled.
+    op.add_column('orders', sa.Column('stock_reserved', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column('orders', sa.Column('reserved_until', sa.TIMESTAMP(), nullable=True))
+    op.create_index('idx_orders_status_reserved_until', 'orders', ['status', 'reserved_until'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_orders_status_reserved_until', table_name='orders')
+    op.drop_column('orders', 'reserved_until')
+    op.drop_column('orders', 'stock_reserved')
@@ -0,0 +1,27 @@
+"""add products updated_at index
+
+Revision ID: f5a1d8c3e947
+Revises: e2f7a3c58b16
+Create Date: 2026-10-18 21:27:44.106395
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5a1d8c3e947'
+down_revision: Union[str, Sequence[str], None] = 'e2f7a3c58b16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Incremental catalog exports (GET /products/export?updated_since=).
+    op.create_index('idx_products_updated_at', 'products', ['updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_products_updated_at', table_name='products')
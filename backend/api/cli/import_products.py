@@ -0,0 +1,48 @@
+"""Import products from a CSV or NDJSON file, streaming it in chunks.
+
+Columns / keys: name, price, category_id or category_slug, and optionally
+id (update that product), description, image_url, stock. Rows that fail
+validation are reported with their line number; the others are imported.
+
+Usage (from backend/):
+
+    python -m api.cli.import_products feed.csv
+    python -m api.cli.import_products --format ndjson - < feed.ndjson
+"""
+import argparse
+import json
+import sys
+from api.core.config import IMPORT_CHUNK_SIZE, IMPORT_MAX_ERRORS
+from api.core.imports import IMPORT_FORMATS, iter_lines, iter_records
+from api.db.conn import pooled_connection
+from api.db.product_import import import_products
+
+READ_SIZE = 64 * 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="file to import, or - for stdin")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="default: from the file extension (.ndjson/.jsonl, otherwise csv)")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument("--max-errors", type=int, default=IMPORT_MAX_ERRORS)
+    args = parser.parse_args()
+
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    stream = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+    with stream, pooled_connection() as db:
+        cursor = db.cursor(dictionary=True)
+        try:
+            records = iter_records(iter_lines(iter(lambda: stream.read(READ_SIZE), b"")), fmt)
+            summary = import_products((db, cursor), records, chunk_size=args.chunk_size, max_errors=args.max_errors)
+        finally:
+            cursor.close()
+
+    for error in summary.pop("errors"):
+        print(f"line {error['line']}: {error['error']}", file=sys.stderr)
+    print(json.dumps(summary))
+    sys.exit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._data[key]
+            self._misses += 1
+            return default
+
+    def set(self, key, value, ttl: float = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._data),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+
+class SnapshotCache:
+    """A whole table (or any small data set) held in memory.
+
+    The snapshot is dropped when ``notifier`` reports a newer version of
+    ``channel`` (a write in any worker) or after ``ttl`` seconds, as a
+    safety net for writes made outside the application.
+    """
+
+    def __init__(self, channel: str, notifier, ttl: float = 300.0):
+        self.channel = channel
+        self.notifier = notifier
+        self.ttl = ttl
+        self._data = None
+        self._version = None
+        self._expires_at = 0.0
+        self._hits = 0
+        self._misses = 0
+        self._loads = 0
+        self._invalidations = 0
+
+    def get(self):
+        data = self._data
+        if data is not None and time.monotonic() < self._expires_at and self.notifier.version(self.channel) == self._version:
+            self._hits += 1
+            return data
+        self._misses += 1
+        return None
+
+    def begin_load(self):
+        """Version token to pass to store(); taken before reading the data so
+        a write that lands during the load is not missed."""
+        return self.notifier.version(self.channel)
+
+    def store(self, data, version):
+        self._data = data
+        self._version = version
+        self._expires_at = time.monotonic() + self.ttl
+        self._loads += 1
+
+    def invalidate(self):
+        self._data = None
+        self._invalidations += 1
+        self.notifier.publish(self.channel)
+
+    def stats(self):
+        lookups = self._hits + self._misses
+        return {
+            "loaded": self._data is not None,
+            "size": len(self._data) if self._data is not None else 0,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+            "loads": self._loads,
+            "invalidations": self._invalidations,
+        }
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,4 +15,121 @@ DB_CONFIG = {
     "user": os.getenv("DB_USER", ""),
     "password": os.getenv("DB_PASSWORD", ""),
     "database": os.getenv("DB_NAME", ""),
-}
\ No newline at end of file
+}
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = float(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Optional read replica. Catalog reads go here when DB_REPLICA_HOST is set;
+# user, password and database default to the primary's.
+REPLICA_DB_CONFIG = {
+    "host": os.getenv("DB_REPLICA_HOST", ""),
+    "user": os.getenv("DB_REPLICA_USER", DB_CONFIG["user"]),
+    "password": os.getenv("DB_REPLICA_PASSWORD", DB_CONFIG["password"]),
+    "database": os.getenv("DB_REPLICA_NAME", DB_CONFIG["database"]),
+} if os.getenv("DB_REPLICA_HOST") else None
+DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", 5))
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", 5))
+DB_REPLICA_RETRY_AFTER = float(os.getenv("DB_REPLICA_RETRY_AFTER", 30))
+
+# How /products/paginated and /categories/paginated compute "total":
+# exact (COUNT(*) every time), cached (exact, cached per filter set),
+# estimate (table statistics when unfiltered, else cached) or none.
+COUNT_STRATEGY = os.getenv("COUNT_STRATEGY", "cached")
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", 60))
+COUNT_CACHE_SIZE = int(os.getenv("COUNT_CACHE_SIZE", 1024))
+
+# Shortest word the products full-text index holds (innodb_ft_min_token_size).
+# Searches with no word at least this long fall back to LIKE.
+FULLTEXT_MIN_TOKEN_SIZE = int(os.getenv("FULLTEXT_MIN_TOKEN_SIZE", 3))
+
+# Build the in-memory product search index (GET /products/search) at startup.
+SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+# Full rebuild interval, so writes made by other worker processes show up.
+SEARCH_INDEX_REFRESH_SECONDS = float(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", 300))
+
+# Add an X-Query-Count header (SQL statements run for the request) to every
+# response. Per-request totals are always available under /metrics.
+QUERY_COUNT_HEADER = os.getenv("QUERY_COUNT_HEADER", "false").lower() in ("1", "true", "yes")
+
+# Rows fetched per round trip by streaming exports; bounds their memory use.
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 1000))
+# Product imports: rows per multi-row INSERT and commit, and per-row errors
+# reported (beyond that they are only counted).
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 1000))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", 1000))
+# PATCH /products/bulk: most updates per request, and ids per locking read
+# and UPDATE statement.
+PRODUCT_BULK_MAX_ITEMS = int(os.getenv("PRODUCT_BULK_MAX_ITEMS", 50000))
+PRODUCT_BULK_CHUNK_SIZE = int(os.getenv("PRODUCT_BULK_CHUNK_SIZE", 1000))
+# Largest page the cursor-paginated admin listings hand out.
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 500))
+
+# Most operations accepted by one POST /cart/items:batch request.
+CART_BATCH_MAX_ITEMS = int(os.getenv("CART_BATCH_MAX_ITEMS", 200))
+
+# Checkout takes the ordered quantities out of products.stock. Unpaid orders
+# hold them this long and are then cancelled, giving the stock back; 0 holds
+# it until the order is paid or cancelled. Every worker looks for expired
+# orders each ORDER_RESERVATION_SWEEP_SECONDS.
+ORDER_RESERVATION_MINUTES = int(os.getenv("ORDER_RESERVATION_MINUTES", 30))
+ORDER_RESERVATION_SWEEP_SECONDS = float(os.getenv("ORDER_RESERVATION_SWEEP_SECONDS", 60))
+# Rows per status and per day in the order counters; each order write picks
+# one, so up to this many checkouts update the counters at once.
+ORDER_TOTALS_SLOTS = int(os.getenv("ORDER_TOTALS_SLOTS", 16))
+
+# Users resolved from access tokens are cached per worker. Role changes and
+# deactivation clear the entry in the worker that made them; other workers
+# pick them up within USER_CACHE_TTL seconds.
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 30))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+
+# Opt-in: access tokens carry the user id, role and token version, and
+# get_current_user trusts them without a database lookup. Role changes and
+# deactivation reach other workers within TOKEN_VERSIONS_REFRESH_SECONDS.
+STATELESS_TOKENS = os.getenv("STATELESS_TOKENS", "false").lower() in ("1", "true", "yes")
+TOKEN_VERSIONS_REFRESH_SECONDS = float(os.getenv("TOKEN_VERSIONS_REFRESH_SECONDS", 10))
+
+# Argon2id cost for new password hashes. Existing hashes made with other
+# parameters are upgraded on the user's next login.
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 3))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 65536))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 4))
+
+# Password hashing runs in a separate process pool so login bursts cannot
+# occupy the request threadpool. 0 workers hashes in the threadpool instead.
+# Beyond PASSWORD_HASH_MAX_PENDING queued + running hashes, register/login
+# answer 503 with Retry-After.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 32))
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", 1))
+
+# Directory for cross-worker cache invalidation signals (FileNotifier); all
+# workers on a host must share it.
+CACHE_NOTIFY_DIR = os.getenv("CACHE_NOTIFY_DIR", os.path.join(tempfile.gettempdir(), "online_shop_invalidation"))
+# The category list is served from memory; reloaded after any category write
+# and at least this often.
+CATEGORY_CACHE_ENABLED = os.getenv("CATEGORY_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CATEGORY_CACHE_TTL = float(os.getenv("CATEGORY_CACHE_TTL", 300))
+
+# Cache of whole GET responses for the catalog routes: "off", "memory" (per
+# worker, bounded by RESPONSE_CACHE_MAX_BYTES) or "redis" (shared; needs the
+# redis package).
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "off").lower()
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+RESPONSE_CACHE_MAX_ENTRY_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", 1024 * 1024))
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+# Rate limit counters. "shm://<file>" shares them between the workers of a
+# host (fixed-size table, RATE_LIMIT_SLOTS keys); "redis://host:6379" between
+# hosts (needs the redis package); "memory://" keeps them per worker.
+_default_rate_limit_file = "/dev/shm/online_shop_ratelimit" if os.path.isdir("/dev/shm") else os.path.join(tempfile.gettempdir(), "online_shop_ratelimit")
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", f"shm://{_default_rate_limit_file}" if os.name == "posix" else "memory://")
+RATE_LIMIT_STRATEGY = os.getenv("RATE_LIMIT_STRATEGY", "sliding-window-counter")
+RATE_LIMIT_SLOTS = int(os.getenv("RATE_LIMIT_SLOTS", 65536))
+# Proxies in front of the app that append to X-Forwarded-For; the client
+# address is taken this many entries from the right. 0 (the default) ignores
+# the header and uses the socket peer: without a proxy the client writes it.
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", 0))
@@ -0,0 +1,31 @@
+from fastapi import Response
+
+# Part of every ETag. Bump it when a response shape changes, so clients do
+# not keep revalidating a representation that no longer exists.
+REPRESENTATION_VERSION = 2
+
+# Clients (and CDNs) may store the response but must revalidate it.
+CACHE_CONTROL = "no-cache"
+
+
+def make_etag(kind: str, *parts):
+    return '"' + "-".join([kind, f"r{REPRESENTATION_VERSION}", *(str(part) for part in parts)]) + '"'
+
+
+def etag_matches(if_none_match: str, etag: str):
+    """Weak comparison, as If-None-Match requires (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == wanted for candidate in if_none_match.split(","))
+
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def not_modified(etag: str):
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def ndjson_chunk(records):
+    return "".join(json.dumps(record, default=_json_default, separators=(",", ":")) + "\n" for record in records)
+
+
+def csv_chunk(rows, fields, header: bool = False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(fields)
+    for row in rows:
+        writer.writerow([_csv_value(row.get(field)) for field in fields])
+    return buffer.getvalue()
+
+
+def _csv_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return "" if value is None else value
+
+
+def stream_export(chunks, fmt: str, fields=None, flatten=None):
+    """Turn an iterator of record lists into NDJSON or CSV text, one string
+    per chunk so each chunk is written to the client in one go.
+
+    For CSV, ``flatten`` maps one record to one or more flat rows with the
+    columns in ``fields``.
+    """
+    if fmt == "ndjson":
+        for records in chunks:
+            yield ndjson_chunk(records)
+        return
+
+    yield csv_chunk([], fields, header=True)
+    for records in chunks:
+        rows = [row for record in records for row in flatten(record)] if flatten else records
+        yield csv_chunk(rows, fields)
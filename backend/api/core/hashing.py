@@ -0,0 +1,74 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from api.core import metrics
+from api.core.config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+
+
+class HashPoolBusy(Exception):
+    pass
+
+
+class HashPool:
+    """Runs CPU-heavy password hashing in a bounded process pool.
+
+    At most ``max_pending`` calls may be queued or running at once; further
+    calls fail fast with HashPoolBusy instead of piling up behind a login
+    storm. With ``workers=0`` calls run in the event loop's default
+    threadpool (still admission-limited).
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._max_seen = 0
+
+    def _get_executor(self):
+        if self.workers and self._executor is None:
+            # spawn: forking a process that runs uvicorn's threads is unsafe.
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise HashPoolBusy("Too many password operations in progress")
+
+        self._pending += 1
+        self._max_seen = max(self._max_seen, self._pending)
+        try:
+            loop = asyncio.get_running_loop()
+            try:
+                result = await loop.run_in_executor(self._get_executor(), fn, *args)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed); start a fresh pool next time.
+                self._executor = None
+                raise
+            self._completed += 1
+            return result
+        finally:
+            self._pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "max_pending_seen": self._max_seen,
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
+
+
+password_hasher = HashPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+metrics.register("password_hasher", password_hasher.stats)
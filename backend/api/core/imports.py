@@ -0,0 +1,80 @@
+"""Reading CSV and NDJSON uploads one record at a time (see export.py for
+the other direction). Nothing here holds more than one line in memory."""
+import codecs
+import csv
+import json
+import anyio
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+
+def iter_sync(async_iterable):
+    """Iterate an async iterable (e.g. ``request.stream()``) from a worker
+    thread started with run_in_threadpool."""
+    iterator = async_iterable.__aiter__()
+    while True:
+        try:
+            yield anyio.from_thread.run(iterator.__anext__)
+        except StopAsyncIteration:
+            return
+
+
+def iter_lines(byte_chunks):
+    """Lines of UTF-8 text (a leading BOM dropped) from byte chunks of any size.
+
+    Splits on "\\n" only: other line separators may appear inside JSON
+    strings and quoted CSV fields.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    for chunk in byte_chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def iter_records(lines, fmt: str):
+    """(line number, record) pairs. A malformed line gives (line number,
+    ValueError) in place of the record, and reading goes on.
+
+    CSV needs a header row; empty cells are left out of the record.
+    """
+    if fmt == "ndjson":
+        yield from _ndjson_records(lines)
+    else:
+        yield from _csv_records(lines)
+
+
+def _ndjson_records(lines):
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, ValueError(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(record, dict):
+            yield number, ValueError("Expected a JSON object")
+            continue
+        yield number, record
+
+
+def _csv_records(lines):
+    reader = csv.DictReader(lines)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield reader.line_num, ValueError(f"Invalid CSV: {e}")
+            continue
+        if None in row:
+            yield reader.line_num, ValueError("More fields than the header")
+            continue
+        yield reader.line_num, {key: value for key, value in row.items() if value not in ("", None)}
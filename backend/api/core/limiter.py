@@ -1,10 +1,26 @@
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from fastapi import Request
+from api.core import metrics
+from api.core.config import RATE_LIMIT_STORAGE_URI, RATE_LIMIT_STRATEGY, RATE_LIMIT_SLOTS, TRUSTED_PROXY_HOPS
+from api.core import rate_limit_storage  # registers the shm:// scheme
 
 def get_real_ip(request: Request):
-    if "X-Forwarded-For" in request.headers:
-        return request.headers["X-Forwarded-For"]
+    # Our proxies append to X-Forwarded-For; everything left of their entries
+    # is whatever the client sent. Keying on the whole header let a client
+    # get a fresh limit (and a new counter) per request.
+    forwarded = request.headers.get("X-Forwarded-For")
+    if forwarded and TRUSTED_PROXY_HOPS > 0:
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        if hops:
+            return hops[-min(TRUSTED_PROXY_HOPS, len(hops))]
     return get_remote_address(request)
 
-limiter = Limiter(key_func=get_real_ip)
+storage_options = {"slots": RATE_LIMIT_SLOTS} if RATE_LIMIT_STORAGE_URI.startswith("shm://") else {}
+limiter = Limiter(key_func=get_real_ip, storage_uri=RATE_LIMIT_STORAGE_URI, storage_options=storage_options, strategy=RATE_LIMIT_STRATEGY)
+
+def limiter_stats():
+    stats = getattr(limiter._storage, "stats", None)
+    return {"storage": RATE_LIMIT_STORAGE_URI.split(":", 1)[0], "strategy": RATE_LIMIT_STRATEGY, **(stats() if stats else {})}
+
+metrics.register("rate_limiter", limiter_stats)
@@ -0,0 +1,10 @@
+_collectors = {}
+
+
+def register(name: str, collector):
+    """Register a zero-argument callable returning a dict of counters."""
+    _collectors[name] = collector
+
+
+def snapshot():
+    return {name: collector() for name, collector in _collectors.items()}
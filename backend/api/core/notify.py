@@ -0,0 +1,49 @@
+import os
+from api.core.config import CACHE_NOTIFY_DIR
+
+
+class FileNotifier:
+    """Invalidation broadcast between worker processes on one host.
+
+    Each channel is a file under ``directory``. publish() atomically
+    replaces it, which changes its inode and mtime; version() is a single
+    stat() call, cheap enough to run on every cache read. Processes compare
+    the version they loaded their data at with the current one.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, channel: str):
+        return os.path.join(self.directory, channel)
+
+    def publish(self, channel: str):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(channel)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(str(os.getpid()))
+        os.replace(tmp, path)
+
+    def version(self, channel: str):
+        try:
+            st = os.stat(self._path(channel))
+        except FileNotFoundError:
+            return (0, 0)
+        return (st.st_ino, st.st_mtime_ns)
+
+
+class LocalNotifier:
+    """Single-process stand-in for FileNotifier."""
+
+    def __init__(self):
+        self._versions = {}
+
+    def publish(self, channel: str):
+        self._versions[channel] = self._versions.get(channel, 0) + 1
+
+    def version(self, channel: str):
+        return self._versions.get(channel, 0)
+
+
+notifier = FileNotifier(CACHE_NOTIFY_DIR)
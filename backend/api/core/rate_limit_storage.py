@@ -0,0 +1,214 @@
+"""Rate limit counters shared by every worker process on a host.
+
+``SharedMemoryStorage`` is a ``limits`` storage registered for ``shm://``
+URIs. All workers map the same file (by default under /dev/shm) holding a
+fixed-size hash table of sliding-window counters, so a limit applies to the
+host as a whole and memory use does not grow with the number of clients.
+
+Each slot holds one key's current and previous window. A key probes
+PROBE_LENGTH slots from its hash; when none is free or expired, the slot
+whose window started longest ago is evicted. An evicted client starts
+from zero again: under memory pressure the limiter errs on the side of
+letting requests through.
+"""
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse, parse_qs
+from limits.storage import Storage, SlidingWindowCounterSupport
+
+MAGIC = b"rlshm001"
+# magic, slot count, evictions
+HEADER = struct.Struct("<8sQQ")
+HEADER_SIZE = 64
+# key hash (0 = empty), window start, window length, current count, previous count
+SLOT = struct.Struct("<QdIII4x")
+PROBE_LENGTH = 8
+
+
+def key_hash(key: str):
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") | 1
+
+
+class SharedMemoryStorage(Storage, SlidingWindowCounterSupport):
+    STORAGE_SCHEME = ["shm"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, slots: int = 65536, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        parsed = urlparse(uri)
+        self.path = parsed.path
+        query = parse_qs(parsed.query)
+        self.slots = int(query["slots"][0]) if "slots" in query else int(slots)
+        self._lock = threading.Lock()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = HEADER_SIZE + self.slots * SLOT.size
+        with self._locked_fd():
+            if os.fstat(self._fd).st_size != size or os.pread(self._fd, 8, 0) != MAGIC or self._stored_slots() != self.slots:
+                # New file, or one made with another table size: start over.
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, HEADER.pack(MAGIC, self.slots, 0), 0)
+        self._map = mmap.mmap(self._fd, size)
+
+    def _stored_slots(self):
+        raw = os.pread(self._fd, HEADER.size, 0)
+        return HEADER.unpack(raw)[1] if len(raw) == HEADER.size else None
+
+    @contextmanager
+    def _locked_fd(self):
+        # flock serializes processes; the threading lock the threads of this
+        # one (they share the file description, and with it the flock).
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @property
+    def base_exceptions(self):
+        return OSError
+
+    def _offset(self, index: int):
+        return HEADER_SIZE + index * SLOT.size
+
+    def _read(self, index: int):
+        return SLOT.unpack_from(self._map, self._offset(index))
+
+    def _write(self, index: int, hashed: int, start: float, expiry: int, current: int, previous: int):
+        SLOT.pack_into(self._map, self._offset(index), hashed, start, expiry, current, previous)
+
+    def _find(self, hashed: int, now: float, create: bool):
+        """Slot index of ``hashed``; with ``create``, claim one (evicting if
+        needed). Caller holds the lock."""
+        first = hashed % self.slots
+        free = None
+        oldest, oldest_start = None, math.inf
+        for step in range(PROBE_LENGTH):
+            index = (first + step) % self.slots
+            slot_hash, start, expiry, _, _ = self._read(index)
+            if slot_hash == hashed:
+                return index
+            if not create:
+                continue
+            if slot_hash == 0 or start + 2 * expiry <= now:
+                if free is None:
+                    free = index
+            elif start < oldest_start:
+                oldest, oldest_start = index, start
+        if not create:
+            return None
+        if free is not None:
+            return free
+        magic, slots, evictions = HEADER.unpack_from(self._map, 0)
+        HEADER.pack_into(self._map, 0, magic, slots, evictions + 1)
+        return oldest
+
+    def _window(self, index, hashed: int, expiry: int, now: float):
+        """(start, current, previous) of the window containing ``now``."""
+        window = now - now % expiry
+        if index is None:
+            return window, 0, 0
+        slot_hash, start, slot_expiry, current, previous = self._read(index)
+        if slot_hash != hashed or slot_expiry != expiry:
+            return window, 0, 0
+        if start == window:
+            return window, current, previous
+        if start == window - expiry:
+            return window, 0, current
+        return window, 0, 0
+
+    # Sliding window counter
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        hashed = key_hash(key)
+        now = time.time()
+        with self._locked_fd():
+            index = self._find(hashed, now, create=True)
+            start, current, previous = self._window(index, hashed, expiry, now)
+            previous_ttl = expiry - (now - start)
+            weighted = previous * previous_ttl / expiry + current
+            acquired = math.floor(weighted) + amount <= limit
+            if acquired:
+                current += amount
+            self._write(index, hashed, start, expiry, current, previous)
+            return acquired
+
+    def get_sliding_window(self, key: str, expiry: int):
+        hashed = key_hash(key)
+        now = time.time()
+        with self._locked_fd():
+            start, current, previous = self._window(self._find(hashed, now, create=False), hashed, expiry, now)
+        elapsed = now - start
+        return previous, (expiry - elapsed) if previous else 0.0, current, 2 * expiry - elapsed
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        self.clear(key)
+
+    # Fixed window (the base Storage interface)
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        hashed = key_hash(key)
+        now = time.time()
+        with self._locked_fd():
+            index = self._find(hashed, now, create=True)
+            start, current, previous = self._window(index, hashed, expiry, now)
+            current += amount
+            self._write(index, hashed, start, expiry, current, previous)
+            return current
+
+    def get(self, key: str) -> int:
+        hashed = key_hash(key)
+        now = time.time()
+        with self._locked_fd():
+            index = self._find(hashed, now, create=False)
+            if index is None:
+                return 0
+            _, start, expiry, current, _ = self._read(index)
+            return current if start + expiry > now else 0
+
+    def get_expiry(self, key: str) -> float:
+        hashed = key_hash(key)
+        now = time.time()
+        with self._locked_fd():
+            index = self._find(hashed, now, create=False)
+            if index is None:
+                return now
+            _, start, expiry, _, _ = self._read(index)
+            return start + expiry
+
+    def check(self) -> bool:
+        return True
+
+    def reset(self):
+        with self._locked_fd():
+            used = sum(1 for index in range(self.slots) if self._read(index)[0])
+            self._map[HEADER_SIZE:] = bytes(self.slots * SLOT.size)
+            return used
+
+    def clear(self, key: str) -> None:
+        hashed = key_hash(key)
+        with self._locked_fd():
+            index = self._find(hashed, time.time(), create=False)
+            if index is not None:
+                self._write(index, 0, 0.0, 0, 0, 0)
+
+    def stats(self):
+        now = time.time()
+        with self._locked_fd():
+            evictions = HEADER.unpack_from(self._map, 0)[2]
+            live = 0
+            for index in range(self.slots):
+                slot_hash, start, expiry, _, _ = self._read(index)
+                if slot_hash and start + 2 * expiry > now:
+                    live += 1
+        return {"slots": self.slots, "live_keys": live, "evictions": evictions, "bytes": HEADER_SIZE + self.slots * SLOT.size}
@@ -0,0 +1,461 @@
+"""Whole GET responses cached in front of the routers.
+
+Entries carry surrogate tags. ``product:42`` marks a response built from
+product 42, ``product:*`` one built from the product collection as a whole
+(listings, search). Writes purge by kind and id (see ResponseCache.purge),
+which drops exactly the entries that may have changed.
+
+A response whose tags were purged while it was being built may hold the
+row as it was before the write, so it is not stored (see the
+``generation`` argument of the backends' set()). With a read replica, the
+first reads after a write may still see the old row; ``purge_hold``
+refuses stores for a purged tag for that long.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import compile_path
+from api.core.config import RESPONSE_CACHE_BACKEND, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_REDIS_URL, REPLICA_DB_CONFIG, DB_REPLICA_MAX_LAG
+from api.core.etag import etag_matches
+from api.core.notify import notifier
+
+# Per-entry bookkeeping on top of the body and headers.
+ENTRY_OVERHEAD = 200
+
+
+def entry_size(entry: dict):
+    return len(entry["body"]) + sum(len(name) + len(value) for name, value in entry["headers"]) + ENTRY_OVERHEAD
+
+
+class MemoryBackend:
+    """Per-process LRU bounded by the total size of the cached responses.
+
+    Purges are exact in this process. With a ``notifier`` they are also
+    announced to the other workers, which drop their whole cache (they do
+    not know which tags were purged).
+
+    Every purge bumps a local generation; ``_purged`` keeps the generation
+    and time of each tag's last purge, under "" for whole-cache drops.
+    """
+
+    blocking = False
+
+    def __init__(self, max_bytes: int, notifier=None, channel: str = "response_cache", purge_hold: float = 0.0):
+        self.max_bytes = max_bytes
+        self.notifier = notifier
+        self.channel = channel
+        self.purge_hold = purge_hold
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._seen = notifier.version(channel) if notifier else None
+        self._evictions = 0
+        self._remote_purges = 0
+        self._generation = 0
+        self._purged = {}
+
+    def _sync(self):
+        # Caller holds the lock.
+        if self.notifier is None:
+            return
+        version = self.notifier.version(self.channel)
+        if version != self._seen:
+            self._seen = version
+            # Also when empty: a response being built may predate the write.
+            self._mark_purged([""])
+            if self._entries:
+                self._clear()
+                self._remote_purges += 1
+
+    def _mark_purged(self, tags):
+        # Caller holds the lock.
+        self._generation += 1
+        now = time.monotonic()
+        for tag in tags:
+            self._purged[tag] = (self._generation, now)
+
+    def _purged_since(self, tags, generation: int):
+        # Caller holds the lock.
+        now = time.monotonic()
+        for tag in ("", *tags):
+            purged = self._purged.get(tag)
+            if purged is not None and (purged[0] > generation or now - purged[1] < self.purge_hold):
+                return True
+        return False
+
+    def _remove(self, key):
+        expires_at, size, entry, tags = self._entries.pop(key)
+        self._bytes -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def _clear(self):
+        self._entries.clear()
+        self._tags.clear()
+        self._bytes = 0
+
+    def get(self, key):
+        with self._lock:
+            self._sync()
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return item[2]
+
+    def generation(self, tags):
+        with self._lock:
+            self._sync()
+            return self._generation
+
+    def set(self, key, entry: dict, ttl: float, tags, generation=None):
+        """Store ``entry``; False when refused because one of ``tags`` was
+        purged after ``generation`` (or within ``purge_hold``)."""
+        size = entry_size(entry)
+        if size > self.max_bytes:
+            return True
+        with self._lock:
+            self._sync()
+            if generation is not None and self._purged_since(tags, generation):
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, size, entry, tags)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+            return True
+
+    def purge(self, tags, broadcast: bool = True):
+        with self._lock:
+            self._sync()
+            keys = set()
+            for tag in tags:
+                keys |= self._tags.get(tag, set())
+            for key in keys:
+                self._remove(key)
+            self._mark_purged(tags)
+            if broadcast and self.notifier is not None:
+                self.notifier.publish(self.channel)
+                self._seen = self.notifier.version(self.channel)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+                "remote_purges": self._remote_purges,
+            }
+
+
+class RedisBackend:
+    """Entries in a Redis-protocol server, shared by every worker and host.
+
+    ``client`` is a ``redis.Redis`` (or anything with the same get, mget,
+    set, incr, delete, sadd, smembers and expire methods). Each tag is a set
+    of entry keys; purging deletes the members and the set, and bumps the
+    tag's generation counter.
+    """
+
+    blocking = True
+
+    def __init__(self, client, prefix: str = "rc:", tag_ttl: int = 86400, purge_hold: float = 0.0):
+        self.client = client
+        self.prefix = prefix
+        self.tag_ttl = tag_ttl
+        self.purge_hold = purge_hold
+
+    def _entry_key(self, key):
+        return f"{self.prefix}e:{hashlib.sha256(key.encode()).hexdigest()}"
+
+    def _tag_key(self, tag):
+        return f"{self.prefix}t:{tag}"
+
+    def _generation_key(self, tag):
+        return f"{self.prefix}g:{tag}"
+
+    def _hold_key(self, tag):
+        return f"{self.prefix}h:{tag}"
+
+    @staticmethod
+    def dumps(entry: dict):
+        head = json.dumps({"status": entry["status"], "headers": entry["headers"]})
+        return head.encode() + b"\n" + entry["body"]
+
+    @staticmethod
+    def loads(raw: bytes):
+        head, _, body = raw.partition(b"\n")
+        entry = json.loads(head)
+        entry["headers"] = [tuple(header) for header in entry["headers"]]
+        entry["body"] = body
+        return entry
+
+    def get(self, key):
+        raw = self.client.get(self._entry_key(key))
+        return self.loads(raw) if raw is not None else None
+
+    def generation(self, tags):
+        return list(self.client.mget([self._generation_key(tag) for tag in tags]))
+
+    def set(self, key, entry: dict, ttl: float, tags, generation=None):
+        """Store ``entry``; False when refused because one of ``tags`` was
+        purged after ``generation`` (or within ``purge_hold``).
+
+        A purge landing between the check and the write is not caught; the
+        window is one round trip instead of the whole request.
+        """
+        if generation is not None:
+            keys = [self._generation_key(tag) for tag in tags]
+            if self.purge_hold:
+                keys += [self._hold_key(tag) for tag in tags]
+            current = list(self.client.mget(keys))
+            if current[:len(tags)] != generation or any(current[len(tags):]):
+                return False
+        entry_key = self._entry_key(key)
+        self.client.set(entry_key, self.dumps(entry), ex=max(1, round(ttl)))
+        for tag in tags:
+            # Members outliving their entry are harmless: deleting a missing
+            # key is a no-op.
+            self.client.sadd(self._tag_key(tag), entry_key)
+            self.client.expire(self._tag_key(tag), self.tag_ttl)
+        return True
+
+    def purge(self, tags, broadcast: bool = True):
+        # Exact for every process sharing the server: nothing to broadcast.
+        purged = 0
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            keys = list(self.client.smembers(tag_key))
+            if keys:
+                purged += self.client.delete(*keys)
+            self.client.delete(tag_key)
+            self.client.incr(self._generation_key(tag))
+            self.client.expire(self._generation_key(tag), self.tag_ttl)
+            if self.purge_hold:
+                self.client.set(self._hold_key(tag), b"1", px=max(1, round(self.purge_hold * 1000)))
+        return purged
+
+    def stats(self):
+        return {"backend": "redis"}
+
+
+def tag_family(tag: str):
+    return tag.split(":", 1)[0]
+
+
+def entry_tags(tags):
+    # Family tags ("product") let purge(kind) drop every entry of a kind.
+    return sorted(set(tags) | {tag_family(tag) for tag in tags})
+
+
+def cache_key(scope, per_user: bool):
+    query = scope.get("query_string", b"").decode("latin-1")
+    query = urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+    if per_user:
+        authorization = dict(scope["headers"]).get(b"authorization", b"")
+        audience = hashlib.sha256(authorization).hexdigest()[:32] if authorization else "anonymous"
+    else:
+        audience = "public"
+    return f"{scope['path']}?{query}|{audience}"
+
+
+class ResponseCache:
+    def __init__(self, backend=None):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._not_modified = 0
+        self._stores = 0
+        self._uncacheable = 0
+        self._stale = 0
+        self._purges = 0
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    async def _call(self, fn, *args):
+        if self.backend.blocking:
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+
+    async def get(self, key):
+        entry = await self._call(self.backend.get, key)
+        self._count("_hits" if entry is not None else "_misses")
+        return entry
+
+    async def generation(self, tags):
+        """Purge generation of ``tags``; take it before building a response
+        and pass it to store()."""
+        return await self._call(self.backend.generation, entry_tags(tags))
+
+    async def store(self, key, entry: dict, ttl: float, tags, generation=None):
+        stored = await self._call(self.backend.set, key, entry, ttl, entry_tags(tags), generation)
+        self._count("_stores" if stored else "_stale")
+
+    def purge(self, kind: str, ids=None, collections: bool = True, broadcast: bool = True):
+        """Drop responses built from rows ``ids`` of ``kind`` and collection
+        responses of that kind; with ids=None, every response of the kind.
+
+        ``collections=False`` keeps the collection responses and
+        ``broadcast=False`` spares the other workers of the memory backend
+        their whole-cache drop, both for frequent writes whose effect may
+        show late there (TTL-bounded). Call it after the write is committed.
+        """
+        if self.backend is None:
+            return 0
+        if ids is None:
+            tags = [kind]
+        else:
+            tags = ([f"{kind}:*"] if collections else []) + [f"{kind}:{id}" for id in ids]
+        self._count("_purges")
+        return self.backend.purge(tags, broadcast)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            counters = {
+                "enabled": self.enabled,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "not_modified": self._not_modified,
+                "stores": self._stores,
+                "uncacheable": self._uncacheable,
+                "stale": self._stale,
+                "purges": self._purges,
+            }
+        if self.backend is not None:
+            counters.update(self.backend.stats())
+        return counters
+
+
+class ResponseCacheMiddleware:
+    """Serves GET routes listed in ``rules`` from ``cache``.
+
+    ``rules`` maps a route path (as declared, e.g. ``/products/{product_id}``)
+    to ``(ttl, tags, per_user)``; the first rule matching the request path
+    wins, so literal paths go before parameterized ones. Tags may use the
+    path parameters (``product:{product_id}``). ``per_user`` routes are
+    cached per Authorization header; the others are shared by all callers
+    and must not depend on who is asking.
+
+    Only complete 200 responses without cookies are stored, and only if none
+    of their tags was purged while they were being built. A stored ETag lets
+    the middleware answer If-None-Match with a 304 itself.
+    """
+
+    def __init__(self, app, cache: ResponseCache, rules: dict, max_entry_bytes: int = 1024 * 1024):
+        self.app = app
+        self.cache = cache
+        self.rules = [(compile_path(path)[0], rule) for path, rule in rules.items()]
+        self.max_entry_bytes = max_entry_bytes
+
+    def match(self, path: str):
+        for regex, rule in self.rules:
+            match = regex.match(path)
+            if match:
+                return rule, match.groupdict()
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not self.cache.enabled:
+            return await self.app(scope, receive, send)
+        matched = self.match(scope["path"])
+        if matched is None:
+            return await self.app(scope, receive, send)
+        (ttl, tag_templates, per_user), path_params = matched
+
+        key = cache_key(scope, per_user)
+        entry = await self.cache.get(key)
+        if entry is not None:
+            return await self.send_entry(entry, scope, send)
+
+        tags = [tag.format(**path_params) for tag in tag_templates]
+        generation = await self.cache.generation(tags)
+        response = {"status": None, "headers": None, "body": [], "size": 0}
+
+        async def capture(message):
+            await send(message)
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [(name.decode("latin-1"), value.decode("latin-1")) for name, value in message.get("headers", [])]
+                return
+            if message["type"] != "http.response.body" or response["body"] is None:
+                return
+            response["body"].append(message.get("body", b""))
+            response["size"] += len(message.get("body", b""))
+            if response["size"] > self.max_entry_bytes:
+                response["body"] = None
+            elif not message.get("more_body", False):
+                await self.finish(key, response, ttl, tags, generation)
+
+        await self.app(scope, receive, capture)
+
+    async def finish(self, key, response: dict, ttl: float, tags, generation=None):
+        if response["status"] != 200 or any(name.lower() == "set-cookie" for name, _ in response["headers"]):
+            self.cache._count("_uncacheable")
+            return
+        entry = {"status": response["status"], "headers": response["headers"], "body": b"".join(response["body"])}
+        await self.cache.store(key, entry, ttl, tags, generation)
+
+    async def send_entry(self, entry: dict, scope, send):
+        headers = entry["headers"]
+        etag = next((value for name, value in headers if name.lower() == "etag"), None)
+        if_none_match = dict(scope["headers"]).get(b"if-none-match")
+        if etag and if_none_match and etag_matches(if_none_match.decode("latin-1"), etag):
+            self.cache._count("_not_modified")
+            status, body = 304, b""
+            headers = [(name, value) for name, value in headers if name.lower() in ("etag", "cache-control")]
+        else:
+            status, body = entry["status"], entry["body"]
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers] + [(b"x-cache", b"HIT")],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def build_backend(kind: str = RESPONSE_CACHE_BACKEND):
+    # Catalog reads may come from a replica up to DB_REPLICA_MAX_LAG behind.
+    purge_hold = DB_REPLICA_MAX_LAG if REPLICA_DB_CONFIG is not None else 0.0
+    if kind == "memory":
+        return MemoryBackend(RESPONSE_CACHE_MAX_BYTES, notifier, purge_hold=purge_hold)
+    if kind == "redis":
+        import redis  # optional dependency, only needed for this backend
+        return RedisBackend(redis.Redis.from_url(RESPONSE_CACHE_REDIS_URL), purge_hold=purge_hold)
+    if kind in ("", "off", "none"):
+        return None
+    raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {kind}")
+
+
+response_cache = ResponseCache(build_backend())
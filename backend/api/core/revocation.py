@@ -0,0 +1,55 @@
+import threading
+import time
+
+
+class TokenVersions:
+    """In-memory copy of ``users.token_version`` for stateless access tokens.
+
+    Only users whose version was ever bumped are held (everyone else is at
+    version 0), so the map stays small. A token whose ``ver`` claim is below
+    the user's current version is no longer trusted on its claims alone.
+    The map counts as fresh for ``max_age`` seconds after the last load;
+    past that, callers should fall back to the database.
+    """
+
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+        self._versions = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self._loads = 0
+        self._rejected = 0
+
+    def load(self, rows):
+        versions = {row['id']: row['token_version'] for row in rows}
+        with self._lock:
+            self._versions = versions
+            self._loaded_at = time.monotonic()
+            self._loads += 1
+
+    def bump(self, user_id: int, version: int):
+        # Apply this worker's own writes without waiting for the next load.
+        with self._lock:
+            if version > self._versions.get(user_id, 0):
+                self._versions[user_id] = version
+
+    def fresh(self):
+        loaded_at = self._loaded_at
+        return loaded_at is not None and time.monotonic() - loaded_at <= self.max_age
+
+    def is_current(self, user_id: int, version: int):
+        with self._lock:
+            current = version >= self._versions.get(user_id, 0)
+            if not current:
+                self._rejected += 1
+            return current
+
+    def stats(self):
+        with self._lock:
+            return {
+                "fresh": self.fresh(),
+                "users": len(self._versions),
+                "loads": self._loads,
+                "age": round(time.monotonic() - self._loaded_at, 3) if self._loaded_at is not None else None,
+                "outdated_tokens": self._rejected,
+            }
@@ -0,0 +1,245 @@
+import math
+import re
+import threading
+from array import array
+from bisect import bisect_left, insort
+
+TOKEN_RE = re.compile(r"\w+")
+STOPWORDS = {"a", "an", "and", "for", "in", "of", "on", "or", "the", "to", "with"}
+
+# Term frequencies are weighted by the field they come from.
+NAME_WEIGHT = 3
+CATEGORY_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+
+MAX_PREFIX_EXPANSIONS = 50
+
+
+def tokenize(text: str):
+    if not text:
+        return []
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+class _Doc:
+    __slots__ = ("terms", "length", "price", "category_id")
+
+    def __init__(self, terms, length, price, category_id):
+        self.terms = terms
+        self.length = length
+        self.price = price
+        self.category_id = category_id
+
+
+class SearchIndex:
+    """In-memory inverted index over products with BM25 ranking.
+
+    Each term owns a posting list of product ids kept as a sorted
+    ``array('I')`` with a parallel ``array('H')`` of weighted term
+    frequencies. The last query word is matched as a prefix so the index
+    can serve typeahead.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._reset()
+        self.ready = False
+        self._pending = None
+
+    def _reset(self):
+        self._term_ids = {}
+        self._terms = []
+        self._postings = []
+        self._freqs = []
+        self._vocab = []
+        self._docs = {}
+        self._total_length = 0
+
+    # Building
+
+    def begin_rebuild(self):
+        """Start recording writes so they can be replayed after load()."""
+        with self._lock:
+            self._pending = []
+
+    def load(self, rows):
+        """Replace the whole index with ``rows`` (dicts ordered by id)."""
+        fresh = SearchIndex(self.k1, self.b)
+        for row in rows:
+            fresh._add(row, ordered=True)
+
+        with self._lock:
+            pending, self._pending = self._pending or [], None
+            self._term_ids = fresh._term_ids
+            self._terms = fresh._terms
+            self._postings = fresh._postings
+            self._freqs = fresh._freqs
+            self._vocab = sorted(fresh._terms)
+            self._docs = fresh._docs
+            self._total_length = fresh._total_length
+            self.ready = True
+            for op, arg in pending:
+                if op == "add":
+                    self._add(arg)
+                else:
+                    self._remove(arg)
+
+    # Incremental updates
+
+    def add(self, row: dict):
+        """Index (or re-index) one product row.
+
+        ``row`` needs id, name, description, price, category_id and
+        category_name.
+        """
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(("add", row))
+            self._add(row)
+
+    def remove(self, product_id: int):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(("remove", product_id))
+            self._remove(product_id)
+
+    def remove_category(self, category_id: int):
+        with self._lock:
+            for product_id in [pid for pid, doc in self._docs.items() if doc.category_id == category_id]:
+                self.remove(product_id)
+
+    def _term_id(self, term: str):
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = len(self._terms)
+            self._term_ids[term] = term_id
+            self._terms.append(term)
+            self._postings.append(array("I"))
+            self._freqs.append(array("H"))
+            if self.ready:
+                insort(self._vocab, term)
+        return term_id
+
+    def _add(self, row: dict, ordered: bool = False):
+        product_id = row["id"]
+        if product_id in self._docs:
+            self._remove(product_id)
+
+        weights = {}
+        for field, weight in (("name", NAME_WEIGHT), ("category_name", CATEGORY_WEIGHT), ("description", DESCRIPTION_WEIGHT)):
+            for token in tokenize(row.get(field)):
+                weights[token] = weights.get(token, 0) + weight
+
+        term_ids = array("I")
+        for term, tf in weights.items():
+            term_id = self._term_id(term)
+            postings, freqs = self._postings[term_id], self._freqs[term_id]
+            tf = min(tf, 0xFFFF)
+            if ordered:
+                postings.append(product_id)
+                freqs.append(tf)
+            else:
+                i = bisect_left(postings, product_id)
+                postings.insert(i, product_id)
+                freqs.insert(i, tf)
+            term_ids.append(term_id)
+
+        length = sum(weights.values())
+        price = float(row["price"]) if row.get("price") is not None else None
+        self._docs[product_id] = _Doc(term_ids, length, price, row.get("category_id"))
+        self._total_length += length
+
+    def _remove(self, product_id: int):
+        doc = self._docs.pop(product_id, None)
+        if doc is None:
+            return
+        for term_id in doc.terms:
+            postings = self._postings[term_id]
+            i = bisect_left(postings, product_id)
+            if i < len(postings) and postings[i] == product_id:
+                del postings[i]
+                del self._freqs[term_id][i]
+        self._total_length -= doc.length
+
+    # Querying
+
+    def _expand(self, token: str, prefix: bool):
+        if not prefix:
+            term_id = self._term_ids.get(token)
+            return [term_id] if term_id is not None else []
+
+        matches = []
+        i = bisect_left(self._vocab, token)
+        while i < len(self._vocab) and self._vocab[i].startswith(token):
+            term_id = self._term_ids[self._vocab[i]]
+            if self._postings[term_id]:
+                matches.append(term_id)
+            i += 1
+        # Keep the most common completions.
+        matches.sort(key=lambda term_id: len(self._postings[term_id]), reverse=True)
+        return matches[:MAX_PREFIX_EXPANSIONS]
+
+    def search(self, query: str, min_price: float = None, max_price: float = None, category_id: int = None, limit: int = 20, offset: int = 0):
+        """Return (product ids ordered by BM25 score, total matches).
+
+        Every query word must match; the last one also matches as a prefix.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return [], 0
+
+        with self._lock:
+            n_docs = len(self._docs)
+            if not n_docs:
+                return [], 0
+            avg_length = self._total_length / n_docs
+
+            scores = None
+            for position, token in enumerate(tokens):
+                term_ids = self._expand(token, prefix=position == len(tokens) - 1)
+                token_scores = {}
+                for term_id in term_ids:
+                    postings, freqs = self._postings[term_id], self._freqs[term_id]
+                    df = len(postings)
+                    idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                    for product_id, tf in zip(postings, freqs):
+                        if scores is not None and product_id not in scores:
+                            continue
+                        norm = self.k1 * (1 - self.b + self.b * self._docs[product_id].length / avg_length)
+                        score = idf * tf * (self.k1 + 1) / (tf + norm)
+                        if score > token_scores.get(product_id, 0.0):
+                            token_scores[product_id] = score
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {pid: scores[pid] + s for pid, s in token_scores.items()}
+                if not scores:
+                    return [], 0
+
+            matches = []
+            for product_id, score in scores.items():
+                doc = self._docs[product_id]
+                if category_id is not None and doc.category_id != category_id:
+                    continue
+                if min_price is not None and (doc.price is None or doc.price < min_price):
+                    continue
+                if max_price is not None and (doc.price is None or doc.price > max_price):
+                    continue
+                matches.append((-score, product_id))
+
+        matches.sort()
+        return [product_id for _, product_id in matches[offset:offset + limit]], len(matches)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "documents": len(self._docs),
+                "terms": len(self._terms),
+                "postings": sum(len(postings) for postings in self._postings),
+            }
+
+
+product_index = SearchIndex()
@@ -1,10 +1,22 @@
 from passlib.context import CryptContext
 from jose import jwt
 from datetime import datetime, timedelta
-from api.core.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS
+from api.core.config import (
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS,
+    ARGON2_TIME_COST, ARGON2_MEMORY_COST, ARGON2_PARALLELISM,
+)
 
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__rounds=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM,
+)
+
+# These run inside the password hashing process pool (api.core.hashing);
+# call them through password_hasher from request handlers.
 
 def hash_password(password: str):
     return pwd_context.hash(password)
@@ -14,6 +26,27 @@ def verify_password(plain: str, hashed: str):
     return pwd_context.verify(plain, hashed)
 
 
+def verify_and_update_password(plain: str, hashed: str):
+    """(valid, new hash or None); a new hash is returned when ``hashed`` was
+    made with other cost parameters than the configured ones."""
+    return pwd_context.verify_and_update(plain, hashed)
+
+
+def access_token_claims(user: dict):
+    """Claims for a user's access token.
+
+    Besides the subject, the token carries what get_current_user needs to
+    authorize a request without a database lookup (STATELESS_TOKENS).
+    """
+    return {
+        "sub": user["email"],
+        "uid": user["id"],
+        "role": user["role"],
+        "name": user.get("full_name"),
+        "ver": user.get("token_version", 0),
+    }
+
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -0,0 +1,79 @@
+from api.db.cart import (
+    CART_ITEMS_QUERY, USER_CART_QUERY, CART_UPSERT, CART_ITEM_UPSERT, CART_ITEM_DECREMENT, CART_ITEM_DELETE_EMPTY,
+    CART_ITEM_REMOVE, build_cart, fold_cart_operations, build_existing_products_query, missing_products_error,
+    cart_batch_statements,
+)
+
+
+async def get_cart_by_user_id(db_conn, user_id: int):
+    db, cursor = db_conn
+    
+    # 1. Cart and items in one read
+    await cursor.execute(USER_CART_QUERY, (user_id,))
+    rows = await cursor.fetchall()
+    if rows:
+        return build_cart(rows[0]['cart_id'], user_id, rows)
+
+    # 2. First visit: create the cart
+    await cursor.execute(CART_UPSERT, (user_id,))
+    await db.commit()
+    return build_cart(cursor.lastrowid, user_id, [])
+
+async def add_to_cart(db_conn, user_id: int, product_id: int, quantity: int):
+    db, cursor = db_conn
+    try:
+        # 1. Get or create the cart
+        await cursor.execute(CART_UPSERT, (user_id,))
+        cart_id = cursor.lastrowid
+
+        # 2. Change the item
+        if quantity > 0:
+            await cursor.execute(CART_ITEM_UPSERT, (cart_id, quantity, product_id, quantity))
+            if cursor.rowcount == 0:
+                raise ValueError("Product not found")
+        elif quantity < 0:
+            await cursor.execute(CART_ITEM_DECREMENT, (quantity, cart_id, product_id))
+            await cursor.execute(CART_ITEM_DELETE_EMPTY, (cart_id, product_id))
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    # 3. The updated cart
+    await cursor.execute(CART_ITEMS_QUERY, (cart_id,))
+    return build_cart(cart_id, user_id, await cursor.fetchall())
+
+async def update_cart_items(db_conn, user_id: int, operations):
+    db, cursor = db_conn
+    sets, deltas = fold_cart_operations(operations)
+    product_ids = sorted(set(sets) | set(deltas))
+    try:
+        # 1. Check every product at once
+        if product_ids:
+            await cursor.execute(*build_existing_products_query(product_ids))
+            error = missing_products_error(product_ids, await cursor.fetchall())
+            if error:
+                raise error
+
+        # 2. Get or create the cart
+        await cursor.execute(CART_UPSERT, (user_id,))
+        cart_id = cursor.lastrowid
+
+        # 3. Multi-row upserts, then drop emptied items
+        for statement in cart_batch_statements(cart_id, sets, deltas):
+            await cursor.execute(*statement)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    # 4. The updated cart
+    await cursor.execute(CART_ITEMS_QUERY, (cart_id,))
+    return build_cart(cart_id, user_id, await cursor.fetchall())
+
+async def remove_from_cart(db_conn, user_id: int, item_id: int):
+    db, cursor = db_conn
+    # Only deletes the item if it is in the user's cart
+    await cursor.execute(CART_ITEM_REMOVE, (item_id, user_id))
+    await db.commit()
+    return await get_cart_by_user_id(db_conn, user_id)
@@ -0,0 +1,113 @@
+from api.db.categories import (
+    ALL_CATEGORIES_QUERY, build_categories_query, build_count_categories_query, build_update_category_query,
+    build_categories_version_query, categories_etag, categories_etag_for_rows, category_cache, select_categories,
+    invalidate_category_caches,
+)
+from api.db.counts import ESTIMATE_ROWS_QUERY
+from api.db.aio.conn import async_pooled_connection
+from api.db.aio.products import reindex_products
+from api.core.config import SEARCH_INDEX_ENABLED, CATEGORY_CACHE_ENABLED
+from api.core.search_index import product_index
+
+
+async def cached_categories():
+    """Every category, from memory; None when the cache is disabled.
+
+    Misses load from the primary, never a replica: the reload usually
+    follows a write, which a lagging replica may not have yet.
+    """
+    if not CATEGORY_CACHE_ENABLED:
+        return None
+    rows = category_cache.get()
+    if rows is None:
+        version = category_cache.begin_load()
+        async with async_pooled_connection() as (db, cursor):
+            await cursor.execute(ALL_CATEGORIES_QUERY)
+            rows = list(await cursor.fetchall())
+        category_cache.store(rows, version)
+    return rows
+
+
+async def get_all_categories(db_conn, search_query: str = None, limit: int = None, offset: int = None, sort: str = "id", seek=None, backwards: bool = False):
+    rows = await cached_categories()
+    if rows is not None:
+        return select_categories(rows, search_query, limit, offset, sort, seek, backwards)
+    db, cursor = db_conn
+    await cursor.execute(*build_categories_query(search_query, limit, offset, sort, seek, backwards))
+    return await cursor.fetchall()
+
+
+async def count_categories(db_conn, search_query: str = None):
+    rows = await cached_categories()
+    if rows is not None:
+        return len(select_categories(rows, search_query))
+    db, cursor = db_conn
+    await cursor.execute(*build_count_categories_query(search_query))
+    return (await cursor.fetchone())['COUNT(*)']
+
+
+async def estimate_categories(db_conn):
+    rows = await cached_categories()
+    if rows is not None:
+        return len(rows)
+    db, cursor = db_conn
+    await cursor.execute(ESTIMATE_ROWS_QUERY, ("categories",))
+    row = await cursor.fetchone()
+    return int(row['estimate'] or 0) if row else 0
+
+
+async def get_categories_etag(db_conn, search_query: str = None):
+    rows = await cached_categories()
+    if rows is not None:
+        return categories_etag_for_rows(select_categories(rows, search_query))
+    db, cursor = db_conn
+    await cursor.execute(*build_categories_version_query(search_query))
+    row = await cursor.fetchone()
+    return categories_etag(row['n'], row['max_id'], row['versions'])
+
+
+async def get_category_by_id(db_conn, category_id: int):
+    rows = await cached_categories()
+    if rows is not None:
+        return next((row for row in rows if row['id'] == category_id), None)
+    db, cursor = db_conn
+    await cursor.execute("SELECT * FROM categories WHERE id=%s", (category_id,))
+    return await cursor.fetchone()
+
+
+async def create_category(db_conn, name: str, slug: str):
+    db, cursor = db_conn
+    await cursor.execute(
+        "INSERT INTO categories (name, slug) VALUES (%s, %s)",
+        (name, slug)
+    )
+    await db.commit()
+    category_id = cursor.lastrowid
+    invalidate_category_caches([category_id])
+    return category_id
+
+
+async def update_category(db_conn, category_id: int, name: str = None, slug: str = None):
+    db, cursor = db_conn
+    
+    statement = build_update_category_query(category_id, name, slug)
+    if statement is None:
+        return 0
+
+    await cursor.execute(*statement)
+    await db.commit()
+    rowcount = cursor.rowcount
+    invalidate_category_caches([category_id])
+    if name is not None:
+        await reindex_products(db_conn, "p.category_id = %s", (category_id,))
+    return rowcount
+
+
+async def delete_category(db_conn, category_id: int):
+    db, cursor = db_conn
+    await cursor.execute("DELETE FROM categories WHERE id=%s", (category_id,))
+    await db.commit()
+    invalidate_category_caches([category_id], products_changed=True)
+    if SEARCH_INDEX_ENABLED:
+        product_index.remove_category(category_id)
+    return cursor.rowcount
@@ -0,0 +1,170 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+import aiomysql
+from pymysql.err import ProgrammingError
+from api.core.config import DB_CONFIG, REPLICA_DB_CONFIG, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_RECYCLE
+from api.core import metrics
+from api.db.conn import replica_monitor
+from api.db.querycount import AsyncCountingCursor
+from api.db.replica import REPLICA_STATUS_QUERIES, parse_replica_lag
+
+# aiomysql pools are bound to the event loop that created them.
+_pools = {}
+_replica_pools = {}
+_stats = {
+    "checkouts": 0,
+    "waits": 0,
+    "wait_time_total": 0.0,
+    "wait_time_max": 0.0,
+    "timeouts": 0,
+}
+
+
+async def _get_pool(pools, config):
+    loop = asyncio.get_running_loop()
+    pool = pools.get(loop)
+    if pool is None:
+        pool = await aiomysql.create_pool(
+            minsize=0,
+            maxsize=DB_POOL_SIZE,
+            pool_recycle=DB_POOL_RECYCLE,
+            autocommit=False,
+            host=config["host"],
+            user=config["user"],
+            password=config["password"],
+            db=config["database"],
+        )
+        pools[loop] = pool
+    return pool
+
+
+async def get_async_pool():
+    return await _get_pool(_pools, DB_CONFIG)
+
+
+async def get_async_replica_pool():
+    if REPLICA_DB_CONFIG is None:
+        return None
+    return await _get_pool(_replica_pools, REPLICA_DB_CONFIG)
+
+
+async def close_async_pool():
+    loop = asyncio.get_running_loop()
+    for pools in (_pools, _replica_pools):
+        pool = pools.pop(loop, None)
+        if pool is not None:
+            pool.close()
+            await pool.wait_closed()
+
+
+def async_pool_stats():
+    stats = dict(_stats)
+    stats["size"] = sum(pool.size for pool in _pools.values())
+    stats["idle"] = sum(pool.freesize for pool in _pools.values())
+    return stats
+
+
+metrics.register("db_pool_async", async_pool_stats)
+
+
+async def _acquire(pool):
+    start = time.monotonic()
+    had_to_wait = pool.freesize == 0 and pool.size >= pool.maxsize
+    try:
+        conn = await asyncio.wait_for(pool.acquire(), DB_POOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        _stats["timeouts"] += 1
+        raise
+    waited = time.monotonic() - start
+    _stats["checkouts"] += 1
+    if had_to_wait:
+        _stats["waits"] += 1
+    _stats["wait_time_total"] += waited
+    _stats["wait_time_max"] = max(_stats["wait_time_max"], waited)
+    return conn
+
+
+async def _release(pool, db):
+    try:
+        await db.rollback()
+    except Exception:
+        db.close()
+    pool.release(db)
+
+
+@asynccontextmanager
+async def _connection(pool, db):
+    cursor = AsyncCountingCursor(await db.cursor(aiomysql.DictCursor))
+    try:
+        yield db, cursor
+    finally:
+        await cursor.close()
+        await _release(pool, db)
+
+
+@asynccontextmanager
+async def async_pooled_connection():
+    """(db, cursor) on the primary, outside of request dependencies."""
+    pool = await get_async_pool()
+    db = await _acquire(pool)
+    async with _connection(pool, db) as conn:
+        yield conn
+
+
+async def get_async_db():
+    async with async_pooled_connection() as conn:
+        yield conn
+
+
+async def _measure_replica_lag(db):
+    async with db.cursor(aiomysql.DictCursor) as cursor:
+        for query in REPLICA_STATUS_QUERIES:
+            try:
+                await cursor.execute(query)
+            except ProgrammingError:
+                continue
+            rows = await cursor.fetchall()
+            return parse_replica_lag(rows[0] if rows else None)
+    raise RuntimeError("Unable to read replica status")
+
+
+async def _acquire_replica():
+    """Check out a replica connection, or None when reads should use the primary."""
+    if REPLICA_DB_CONFIG is None or not replica_monitor.available():
+        return None, None
+
+    try:
+        pool = await get_async_replica_pool()
+        db = await asyncio.wait_for(pool.acquire(), DB_POOL_TIMEOUT)
+    except Exception:
+        replica_monitor.record_failure()
+        return None, None
+
+    if replica_monitor.needs_check():
+        try:
+            replica_monitor.record_lag(await _measure_replica_lag(db))
+        except Exception:
+            replica_monitor.record_failure()
+            await _release(pool, db)
+            return None, None
+
+    if not replica_monitor.usable():
+        await _release(pool, db)
+        return None, None
+    return pool, db
+
+
+async def get_async_read_db():
+    """Async counterpart of api.db.conn.get_read_db."""
+    pool, db = await _acquire_replica()
+    if db is None:
+        if REPLICA_DB_CONFIG is not None:
+            replica_monitor.record_read(replica=False)
+        pool = await get_async_pool()
+        db = await _acquire(pool)
+    else:
+        replica_monitor.record_read(replica=True)
+
+    async with _connection(pool, db) as conn:
+        yield conn
@@ -0,0 +1,138 @@
+from api.db.orders import (
+    ORDER_ITEMS_QUERY, ORDER_STATUS_FOR_UPDATE, CHECKOUT_CART_QUERY, ORDER_INSERT, ORDER_ITEMS_INSERT, ORDER_STATUS_TOTALS_QUERY, ORDER_DAILY_TOTALS_QUERY, DAILY_TOTALS_UPDATE,
+    build_all_orders_query, build_order_items_batch_query, attach_order_items, build_status_totals_update,
+    status_change_deltas, totals_slot, order_stats_response, order_item_rows, build_created_order,
+    ORDER_RESERVED_ITEMS_QUERY, EXPIRED_RESERVATIONS_QUERY, OrderStatusConflict, stock_quantities, build_stock_reservation,
+    build_stock_release, insufficient_stock_error, reservation_deadline, check_status_change, releases_stock,
+)
+from api.db.cart import build_cart
+from api.db.products import invalidate_product_stock
+
+async def create_order(db_conn, user_id: int, shipping_address: str):
+    db, cursor = db_conn
+
+    # 1. Lock the user's cart
+    await cursor.execute(CHECKOUT_CART_QUERY, (user_id,))
+    rows = await cursor.fetchall()
+    if not rows:
+        await db.rollback()
+        raise ValueError("Cart is empty")
+    cart = build_cart(rows[0]['cart_id'], user_id, rows)
+    created_at = rows[0]['checkout_at']
+    reserved_until = reservation_deadline(created_at)
+    total_price = cart['total_price']
+    quantities = stock_quantities((item['product']['id'], item['quantity']) for item in cart['items'])
+
+    try:
+        # 2. Create Order
+        await cursor.execute(ORDER_INSERT, (user_id, total_price, 'pending', shipping_address, created_at, reserved_until))
+        order_id = cursor.lastrowid
+
+        # 3. Create Order Items (one multi-row INSERT)
+        await cursor.executemany(ORDER_ITEMS_INSERT, order_item_rows(order_id, cart))
+        first_item_id = cursor.lastrowid
+
+        # 4. Clear Cart
+        await cursor.execute("DELETE FROM cart_items WHERE cart_id = %s", (cart['id'],))
+
+        # 5. Count the order
+        await cursor.execute(*build_status_totals_update({'pending': (1, total_price)}))
+        await cursor.execute(DAILY_TOTALS_UPDATE, (created_at.date(), totals_slot(), 1, total_price))
+
+        # 6. Reserve the stock, last to keep the product row locks short
+        await cursor.execute(*build_stock_reservation(quantities))
+        if cursor.rowcount != len(quantities):
+            raise insufficient_stock_error(cart, quantities)
+
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    invalidate_product_stock(list(quantities))
+    return build_created_order(order_id, first_item_id, user_id, shipping_address, created_at, reserved_until, cart)
+
+async def get_orders_by_user(db_conn, user_id: int):
+    db, cursor = db_conn
+    await cursor.execute("SELECT * FROM orders WHERE user_id = %s ORDER BY created_at DESC", (user_id,))
+    orders = await cursor.fetchall()
+    return await load_order_items(db_conn, orders)
+
+async def get_order_by_id(db_conn, order_id: int):
+    db, cursor = db_conn
+    await cursor.execute("SELECT * FROM orders WHERE id = %s", (order_id,))
+    order = await cursor.fetchone()
+    if order:
+         order['items'] = await get_order_items(db_conn, order_id)
+    return order
+
+async def get_order_items(db_conn, order_id: int):
+    db, cursor = db_conn
+    await cursor.execute(ORDER_ITEMS_QUERY, (order_id,))
+    return await cursor.fetchall()
+
+async def load_order_items(db_conn, orders: list):
+    if not orders:
+        return orders
+    db, cursor = db_conn
+    await cursor.execute(*build_order_items_batch_query([order['id'] for order in orders]))
+    return attach_order_items(orders, await cursor.fetchall())
+
+async def get_all_orders(db_conn, search_query: str = None, status: str = None, created_from=None, created_to=None, limit: int = None, seek=None, backwards: bool = False):
+    db, cursor = db_conn
+    await cursor.execute(*build_all_orders_query(search_query, status, created_from, created_to, limit, seek, backwards))
+    
+    orders = await cursor.fetchall()
+    return await load_order_items(db_conn, orders)
+
+async def update_order_status(db_conn, order_id: int, status: str, from_statuses=None):
+    db, cursor = db_conn
+    await cursor.execute(ORDER_STATUS_FOR_UPDATE, (order_id,))
+    order = await cursor.fetchone()
+    if order is None:
+        await db.rollback()
+        return None
+    released = []
+    try:
+        check_status_change(order, status, from_statuses)
+        if order['status'] != status:
+            release = releases_stock(order, status)
+            if release:
+                await cursor.execute("UPDATE orders SET status = %s, stock_reserved = FALSE WHERE id = %s", (status, order_id))
+            else:
+                await cursor.execute("UPDATE orders SET status = %s WHERE id = %s", (status, order_id))
+            await cursor.execute(*build_status_totals_update(status_change_deltas(order['status'], status, order['total_price'])))
+            if release:
+                await cursor.execute(ORDER_RESERVED_ITEMS_QUERY, (order_id,))
+                quantities = stock_quantities((row['product_id'], row['quantity']) for row in await cursor.fetchall())
+                if quantities:
+                    await cursor.execute(*build_stock_release(quantities))
+                    released = list(quantities)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    if released:
+        invalidate_product_stock(released)
+    return await get_order_by_id(db_conn, order_id)
+
+async def release_expired_reservations(db_conn, limit: int = 100):
+    db, cursor = db_conn
+    await cursor.execute(EXPIRED_RESERVATIONS_QUERY, (limit,))
+    order_ids = [row['id'] for row in await cursor.fetchall()]
+    await db.commit()
+    cancelled = []
+    for order_id in order_ids:
+        try:
+            if await update_order_status(db_conn, order_id, 'cancelled', from_statuses=('pending',)):
+                cancelled.append(order_id)
+        except OrderStatusConflict:
+            pass
+    return cancelled
+
+
+async def get_order_stats(db_conn, days: int = 30):
+    db, cursor = db_conn
+    await cursor.execute(ORDER_STATUS_TOTALS_QUERY)
+    status_rows = await cursor.fetchall()
+    await cursor.execute(ORDER_DAILY_TOTALS_QUERY, (days,))
+    return order_stats_response(status_rows, await cursor.fetchall())
@@ -0,0 +1,100 @@
+from api.core.config import SEARCH_INDEX_ENABLED
+from api.core.search_index import product_index
+from api.db.products import (
+    PRODUCT_SELECT, PRODUCT_VERSION_QUERY, SEARCH_INDEX_SELECT, build_products_query, build_count_products_query, build_update_product_query,
+    build_products_by_ids_query, order_by_ids, invalidate_product_caches, unindex_product,
+)
+from api.db.counts import ESTIMATE_ROWS_QUERY
+
+
+async def get_all_products(db_conn, search_query: str = None, min_price: float = None, max_price: float = None, category_id: int = None, limit: int = None, offset: int = None, sort: str = "id", seek=None, backwards: bool = False):
+    db, cursor = db_conn
+    await cursor.execute(*build_products_query(search_query, min_price, max_price, category_id, limit, offset, sort, seek, backwards))
+    return await cursor.fetchall()
+
+
+async def count_products(db_conn, search_query: str = None, min_price: float = None, max_price: float = None, category_id: int = None):
+    db, cursor = db_conn
+    await cursor.execute(*build_count_products_query(search_query, min_price, max_price, category_id))
+    return (await cursor.fetchone())['COUNT(*)']
+
+
+async def estimate_products(db_conn):
+    db, cursor = db_conn
+    await cursor.execute(ESTIMATE_ROWS_QUERY, ("products",))
+    row = await cursor.fetchone()
+    return int(row['estimate'] or 0) if row else 0
+
+
+async def get_product_by_id(db_conn, product_id: int):
+    db, cursor = db_conn
+    await cursor.execute(PRODUCT_SELECT + " WHERE p.id=%s", (product_id,))
+    return await cursor.fetchone()
+
+
+async def get_product_version(db_conn, product_id: int):
+    db, cursor = db_conn
+    await cursor.execute(PRODUCT_VERSION_QUERY, (product_id,))
+    return await cursor.fetchone()
+
+
+async def bump_product_version(db_conn, product_id: int):
+    db, cursor = db_conn
+    await cursor.execute("UPDATE products SET version = version + 1 WHERE id = %s", (product_id,))
+
+
+async def get_products_by_ids(db_conn, product_ids):
+    if not product_ids:
+        return []
+    db, cursor = db_conn
+    await cursor.execute(*build_products_by_ids_query(product_ids))
+    return order_by_ids(await cursor.fetchall(), product_ids)
+
+
+async def reindex_products(db_conn, where: str, params: tuple):
+    if not SEARCH_INDEX_ENABLED:
+        return
+    db, cursor = db_conn
+    await cursor.execute(SEARCH_INDEX_SELECT + " WHERE " + where, params)
+    for row in await cursor.fetchall():
+        product_index.add(row)
+
+
+async def create_product(db_conn, name: str, price: float, category_id: int, description: str = None, image_url: str = None, stock: int = 0):
+    db, cursor = db_conn
+    await cursor.execute(
+        """
+        INSERT INTO products (name, description, price, image_url, stock, category_id) 
+        VALUES (%s, %s, %s, %s, %s, %s)
+        """,
+        (name, description, price, image_url, stock, category_id)
+    )
+    await db.commit()
+    product_id = cursor.lastrowid
+    invalidate_product_caches([product_id])
+    await reindex_products(db_conn, "p.id = %s", (product_id,))
+    return product_id
+
+
+async def update_product(db_conn, product_id: int, name: str = None, price: float = None, category_id: int = None, description: str = None, image_url: str = None, stock: int = None):
+    db, cursor = db_conn
+    
+    statement = build_update_product_query(product_id, name, price, category_id, description, image_url, stock)
+    if statement is None:
+        return
+    
+    await cursor.execute(*statement)
+    await db.commit()
+    rowcount = cursor.rowcount
+    invalidate_product_caches([product_id])
+    await reindex_products(db_conn, "p.id = %s", (product_id,))
+    return rowcount
+
+
+async def delete_product(db_conn, product_id: int):
+    db, cursor = db_conn
+    await cursor.execute("DELETE FROM products WHERE id=%s", (product_id,))
+    await db.commit()
+    invalidate_product_caches([product_id])
+    unindex_product(product_id)
+    return cursor.rowcount
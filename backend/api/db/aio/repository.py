@@ -0,0 +1,78 @@
+from api.db.repository import USER_PUBLIC_COLUMNS, user_cache, token_versions, get_cached_user
+
+
+async def get_user_by_email(db_conn, email: str):
+    db, cursor = db_conn
+    await cursor.execute("SELECT * FROM users WHERE email=%s", (email,))
+    return await cursor.fetchone()
+
+
+async def get_auth_user(db_conn, email: str):
+    user = get_cached_user(email)
+    if user is None:
+        db, cursor = db_conn
+        await cursor.execute(f"SELECT {USER_PUBLIC_COLUMNS} FROM users WHERE email=%s", (email,))
+        user = await cursor.fetchone()
+        if user is None:
+            return None
+        user_cache.set(email, user)
+        user = dict(user)
+    return user
+
+
+async def invalidate_user(db_conn, user_id: int):
+    db, cursor = db_conn
+    await cursor.execute("SELECT email, token_version FROM users WHERE id = %s", (user_id,))
+    row = await cursor.fetchone()
+    if row:
+        user_cache.invalidate(row['email'])
+        token_versions.bump(user_id, row['token_version'])
+
+
+async def create_user(db_conn, email: str, password: str, full_name: str = None):
+    db, cursor = db_conn
+    await cursor.execute(
+        "INSERT INTO users (email, password, full_name) VALUES (%s, %s, %s)", 
+        (email, password, full_name)
+    )
+    await db.commit()
+    return cursor.lastrowid
+
+
+async def update_user_password(db_conn, user_id: int, password: str):
+    db, cursor = db_conn
+    await cursor.execute("UPDATE users SET password = %s WHERE id = %s", (password, user_id))
+    await db.commit()
+
+
+async def get_all_users(db_conn, search_query: str = None):
+    db, cursor = db_conn
+    if search_query:
+        search_param = f"%{search_query}%"
+        await cursor.execute(
+            f"SELECT {USER_PUBLIC_COLUMNS} FROM users WHERE email LIKE %s OR full_name LIKE %s", 
+            (search_param, search_param)
+        )
+    else:
+        await cursor.execute(f"SELECT {USER_PUBLIC_COLUMNS} FROM users")
+    return await cursor.fetchall()
+
+
+async def update_user_role(db_conn, user_id: int, role: str):
+    db, cursor = db_conn
+    await cursor.execute("UPDATE users SET role = %s, token_version = token_version + 1 WHERE id = %s", (role, user_id))
+    await db.commit()
+    updated = cursor.rowcount > 0
+    if updated:
+        await invalidate_user(db_conn, user_id)
+    return updated
+
+
+async def set_user_active(db_conn, user_id: int, is_active: bool):
+    db, cursor = db_conn
+    await cursor.execute("UPDATE users SET is_active = %s, token_version = token_version + 1 WHERE id = %s", (is_active, user_id))
+    await db.commit()
+    updated = cursor.rowcount > 0
+    if updated:
+        await invalidate_user(db_conn, user_id)
+    return updated
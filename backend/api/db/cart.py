@@ -1,34 +1,104 @@
-def get_cart_by_user_id(db_conn, user_id: int):
-    db, cursor = db_conn
-    
-    # 1. Get or Create Cart
-    cursor.execute("SELECT * FROM carts WHERE user_id = %s", (user_id,))
-    cart = cursor.fetchone()
-    
-    if not cart:
-        cursor.execute("INSERT INTO carts (user_id) VALUES (%s)", (user_id,))
-        db.commit()
-        cart_id = cursor.lastrowid
-        cursor.execute("SELECT * FROM carts WHERE id = %s", (cart_id,))
-        cart = cursor.fetchone()
-    
-    cart_id = cart['id']
-    
-    # 2. Get Items with Product Details
-    query = """
-        SELECT ci.id, ci.quantity, ci.cart_id, 
-               p.id as product_id, p.name, p.description, p.price, p.image_url, p.stock, p.category_id, p.created_at
-        FROM cart_items ci
-        JOIN products p ON ci.product_id = p.id
-        WHERE ci.cart_id = %s
-    """
-    cursor.execute(query, (cart_id,))
-    rows = cursor.fetchall()
-    
+CART_ITEMS_QUERY = """
+    SELECT ci.id, ci.quantity, ci.cart_id, 
+           p.id as product_id, p.name, p.description, p.price, p.image_url, p.stock, p.category_id, p.created_at
+    FROM cart_items ci
+    JOIN products p ON ci.product_id = p.id
+    WHERE ci.cart_id = %s
+    ORDER BY ci.id
+"""
+
+# The user's cart and its items in one read. The cart row comes back even
+# when it is empty (one row of NULL item columns).
+USER_CART_QUERY = """
+    SELECT c.id as cart_id, ci.id, ci.quantity,
+           p.id as product_id, p.name, p.description, p.price, p.image_url, p.stock, p.category_id, p.created_at
+    FROM carts c
+    LEFT JOIN cart_items ci ON ci.cart_id = c.id
+    LEFT JOIN products p ON ci.product_id = p.id
+    WHERE c.user_id = %s
+    ORDER BY ci.id
+"""
+
+# Creates the cart on first use. Either way LAST_INSERT_ID(), and with it
+# cursor.lastrowid, is the cart's id.
+CART_UPSERT = "INSERT INTO carts (user_id) VALUES (%s) ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id)"
+
+# Adds to the quantity already in the cart (uq_cart_item_product). Selecting
+# from products makes an unknown product insert nothing: rowcount 0.
+CART_ITEM_UPSERT = """
+    INSERT INTO cart_items (cart_id, product_id, quantity)
+    SELECT %s, p.id, %s FROM products p WHERE p.id = %s
+    ON DUPLICATE KEY UPDATE quantity = cart_items.quantity + %s
+"""
+
+CART_ITEM_DECREMENT = "UPDATE cart_items SET quantity = quantity + %s WHERE cart_id = %s AND product_id = %s"
+CART_ITEM_DELETE_EMPTY = "DELETE FROM cart_items WHERE cart_id = %s AND product_id = %s AND quantity <= 0"
+
+CART_ITEM_REMOVE = """
+    DELETE ci FROM cart_items ci
+    JOIN carts c ON c.id = ci.cart_id
+    WHERE ci.id = %s AND c.user_id = %s
+"""
+
+
+
+def fold_cart_operations(operations):
+    """Net effect of (product_id, quantity, delta) operations, applied in
+    order, as (quantities to set, deltas to add), each ordered by product
+    id so concurrent batches lock rows in the same order."""
+    sets, deltas = {}, {}
+    for product_id, quantity, delta in operations:
+        if quantity is not None:
+            sets[product_id] = quantity
+            deltas.pop(product_id, None)
+        elif product_id in sets:
+            sets[product_id] = max(0, sets[product_id] + delta)
+        else:
+            deltas[product_id] = deltas.get(product_id, 0) + delta
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta != 0}
+    return dict(sorted(sets.items())), dict(sorted(deltas.items()))
+
+def build_existing_products_query(product_ids):
+    placeholders = ", ".join(["%s"] * len(product_ids))
+    return f"SELECT id FROM products WHERE id IN ({placeholders})", tuple(product_ids)
+
+def build_cart_items_upsert(cart_id: int, quantities: dict, add: bool):
+    """One multi-row upsert: set the quantities, or with ``add`` add them to
+    what the cart holds."""
+    placeholders = ", ".join(["(%s, %s, %s)"] * len(quantities))
+    update = "cart_items.quantity + VALUES(quantity)" if add else "VALUES(quantity)"
+    query = f"INSERT INTO cart_items (cart_id, product_id, quantity) VALUES {placeholders} ON DUPLICATE KEY UPDATE quantity = {update}"
+    return query, tuple(value for product_id, quantity in quantities.items() for value in (cart_id, product_id, quantity))
+
+def build_delete_empty_items(cart_id: int, product_ids):
+    placeholders = ", ".join(["%s"] * len(product_ids))
+    return f"DELETE FROM cart_items WHERE cart_id = %s AND product_id IN ({placeholders}) AND quantity <= 0", (cart_id, *product_ids)
+
+def cart_batch_statements(cart_id: int, sets: dict, deltas: dict):
+    statements = []
+    if sets:
+        statements.append(build_cart_items_upsert(cart_id, sets, add=False))
+    if deltas:
+        statements.append(build_cart_items_upsert(cart_id, deltas, add=True))
+    # Items that may have dropped to zero or below
+    emptied = sorted([product_id for product_id, quantity in sets.items() if quantity == 0] + [product_id for product_id, delta in deltas.items() if delta < 0])
+    if emptied:
+        statements.append(build_delete_empty_items(cart_id, emptied))
+    return statements
+
+def missing_products_error(product_ids, rows):
+    missing = sorted(set(product_ids) - {row['id'] for row in rows})
+    return ValueError("Products not found: " + ", ".join(str(product_id) for product_id in missing)) if missing else None
+
+
+def build_cart(cart_id: int, user_id: int, rows):
     items = []
     total_price = 0
     
     for row in rows:
+        if row['id'] is None:
+            # USER_CART_QUERY's row for an empty cart
+            continue
         product = {
             "id": row['product_id'],
             "name": row['name'],
@@ -55,36 +125,86 @@ def get_cart_by_user_id(db_conn, user_id: int):
         "total_price": total_price
     }
 
-def add_to_cart(db_conn, user_id: int, product_id: int, quantity: int):
+
+def get_cart_by_user_id(db_conn, user_id: int):
     db, cursor = db_conn
     
-    # Ensure cart exists
-    cart = get_cart_by_user_id(db_conn, user_id)
-    cart_id = cart['id']
-    
-    # Check if item exists in cart
-    cursor.execute("SELECT * FROM cart_items WHERE cart_id = %s AND product_id = %s", (cart_id, product_id))
-    existing_item = cursor.fetchone()
-    
-    if existing_item:
-        new_quantity = existing_item['quantity'] + quantity
-        if new_quantity <= 0:
-             cursor.execute("DELETE FROM cart_items WHERE id = %s", (existing_item['id'],))
-        else:
-             cursor.execute("UPDATE cart_items SET quantity = %s WHERE id = %s", (new_quantity, existing_item['id']))
-    else:
-        if quantity > 0:
-            cursor.execute("INSERT INTO cart_items (cart_id, product_id, quantity) VALUES (%s, %s, %s)", (cart_id, product_id, quantity))
-            
+    # 1. Cart and items in one read
+    cursor.execute(USER_CART_QUERY, (user_id,))
+    rows = cursor.fetchall()
+    if rows:
+        return build_cart(rows[0]['cart_id'], user_id, rows)
+
+    # 2. First visit: create the cart
+    cursor.execute(CART_UPSERT, (user_id,))
     db.commit()
-    return get_cart_by_user_id(db_conn, user_id)
+    return build_cart(cursor.lastrowid, user_id, [])
+
+def add_to_cart(db_conn, user_id: int, product_id: int, quantity: int):
+    """Add ``quantity`` (negative to take some out) of a product to the cart.
+
+    Three round trips for an addition: cart upsert, item upsert, cart read.
+    Raises ValueError if the product does not exist.
+    """
+    db, cursor = db_conn
+    try:
+        # 1. Get or create the cart
+        cursor.execute(CART_UPSERT, (user_id,))
+        cart_id = cursor.lastrowid
+
+        # 2. Change the item
+        if quantity > 0:
+            cursor.execute(CART_ITEM_UPSERT, (cart_id, quantity, product_id, quantity))
+            if cursor.rowcount == 0:
+                raise ValueError("Product not found")
+        elif quantity < 0:
+            cursor.execute(CART_ITEM_DECREMENT, (quantity, cart_id, product_id))
+            cursor.execute(CART_ITEM_DELETE_EMPTY, (cart_id, product_id))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    # 3. The updated cart
+    cursor.execute(CART_ITEMS_QUERY, (cart_id,))
+    return build_cart(cart_id, user_id, cursor.fetchall())
+
+def update_cart_items(db_conn, user_id: int, operations):
+    """Apply (product_id, quantity, delta) operations in one transaction.
+
+    At most six statements whatever the number of operations. Raises
+    ValueError, changing nothing, if any product does not exist.
+    """
+    db, cursor = db_conn
+    sets, deltas = fold_cart_operations(operations)
+    product_ids = sorted(set(sets) | set(deltas))
+    try:
+        # 1. Check every product at once
+        if product_ids:
+            cursor.execute(*build_existing_products_query(product_ids))
+            error = missing_products_error(product_ids, cursor.fetchall())
+            if error:
+                raise error
+
+        # 2. Get or create the cart
+        cursor.execute(CART_UPSERT, (user_id,))
+        cart_id = cursor.lastrowid
+
+        # 3. Multi-row upserts, then drop emptied items
+        for statement in cart_batch_statements(cart_id, sets, deltas):
+            cursor.execute(*statement)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    # 4. The updated cart
+    cursor.execute(CART_ITEMS_QUERY, (cart_id,))
+    return build_cart(cart_id, user_id, cursor.fetchall())
 
 def remove_from_cart(db_conn, user_id: int, item_id: int):
     db, cursor = db_conn
-    # Verify item belongs to user's cart
-    cart = get_cart_by_user_id(db_conn, user_id)
-    cart_id = cart['id']
-    
-    cursor.execute("DELETE FROM cart_items WHERE id = %s AND cart_id = %s", (item_id, cart_id))
+    # Only deletes the item if it is in the user's cart
+    cursor.execute(CART_ITEM_REMOVE, (item_id, user_id))
     db.commit()
     return get_cart_by_user_id(db_conn, user_id)
@@ -1,11 +1,90 @@
-def get_all_categories(db_conn, search_query: str = None, limit: int = None, offset: int = None):
-    db, cursor = db_conn
-    query = "SELECT * FROM categories WHERE 1=1"
+from api.db.pagination import parse_sort, keyset_clause, order_clause
+from api.db.counts import category_counts
+from api.db.products import invalidate_product_caches, reindex_products
+from api.core import metrics
+from api.core.cache import SnapshotCache
+from api.core.config import SEARCH_INDEX_ENABLED, CATEGORY_CACHE_ENABLED, CATEGORY_CACHE_TTL
+from api.core.etag import make_etag
+from api.core.notify import notifier
+from api.core.response_cache import response_cache
+from api.core.search_index import product_index
+
+
+def _category_filters(search_query: str = None):
+    clauses = ""
     params = []
 
     if search_query:
-        query += " AND (name LIKE %s OR slug LIKE %s)"
+        clauses += " AND (name LIKE %s OR slug LIKE %s)"
         params.extend([f"%{search_query}%", f"%{search_query}%"])
+
+    return clauses, params
+
+
+CATEGORY_SORT_COLUMNS = {
+    "id": "id",
+    "name": "name",
+    "slug": "slug",
+}
+
+# The whole categories table, shared by the async read path and imports.
+category_cache = SnapshotCache("categories", notifier, CATEGORY_CACHE_TTL)
+metrics.register("category_cache", category_cache.stats)
+
+ALL_CATEGORIES_QUERY = "SELECT * FROM categories ORDER BY id"
+
+
+def load_categories(db_conn):
+    """Every category: the cached snapshot, or read through ``db_conn``
+    (which should be the primary) and cached."""
+    rows = category_cache.get() if CATEGORY_CACHE_ENABLED else None
+    if rows is None:
+        version = category_cache.begin_load()
+        db, cursor = db_conn
+        cursor.execute(ALL_CATEGORIES_QUERY)
+        rows = list(cursor.fetchall())
+        if CATEGORY_CACHE_ENABLED:
+            category_cache.store(rows, version)
+    return rows
+
+
+def _sort_value(value):
+    # Approximates MySQL's case-insensitive collation.
+    return value.casefold() if isinstance(value, str) else value
+
+
+def select_categories(rows, search_query: str = None, limit: int = None, offset: int = None, sort: str = "id", seek=None, backwards: bool = False):
+    """build_categories_query evaluated over in-memory rows (same order and paging)."""
+    key, _, descending = parse_sort(sort, CATEGORY_SORT_COLUMNS)
+
+    if search_query:
+        needle = search_query.casefold()
+        rows = [row for row in rows if needle in row['name'].casefold() or needle in row['slug'].casefold()]
+
+    reverse = descending != backwards
+    rows = sorted(rows, key=lambda row: (_sort_value(row[key]), row['id']), reverse=reverse)
+
+    if seek is not None:
+        bound = (_sort_value(seek[0]), seek[1])
+        if reverse:
+            rows = [row for row in rows if (_sort_value(row[key]), row['id']) < bound]
+        else:
+            rows = [row for row in rows if (_sort_value(row[key]), row['id']) > bound]
+
+    start = offset or 0
+    return rows[start:start + limit] if limit is not None else rows[start:]
+
+
+def build_categories_query(search_query: str = None, limit: int = None, offset: int = None, sort: str = "id", seek=None, backwards: bool = False):
+    clauses, params = _category_filters(search_query)
+    key, column, descending = parse_sort(sort, CATEGORY_SORT_COLUMNS)
+
+    if seek is not None:
+        seek_clause, seek_params = keyset_clause(column, "id", seek, descending, backwards)
+        clauses += seek_clause
+        params.extend(seek_params)
+
+    query = "SELECT * FROM categories WHERE 1=1" + clauses + order_clause(column, "id", descending, backwards)
     
     if limit is not None:
         query += " LIMIT %s"
@@ -15,21 +94,64 @@ def get_all_categories(db_conn, search_query: str = None, limit: int = None, off
         query += " OFFSET %s"
         params.append(offset)
 
-    cursor.execute(query, tuple(params))
+    return query, tuple(params)
+
+
+def build_count_categories_query(search_query: str = None):
+    clauses, params = _category_filters(search_query)
+    return "SELECT COUNT(*) FROM categories WHERE 1=1" + clauses, tuple(params)
+
+
+def build_categories_version_query(search_query: str = None):
+    # A collection version that changes on every insert (max id grows),
+    # update (a version grows) and delete (the count drops).
+    clauses, params = _category_filters(search_query)
+    query = (
+        "SELECT COUNT(*) AS n, COALESCE(MAX(id), 0) AS max_id, COALESCE(SUM(version), 0) AS versions"
+        " FROM categories WHERE 1=1" + clauses
+    )
+    return query, tuple(params)
+
+
+def categories_etag(n: int, max_id: int, versions: int):
+    return make_etag("categories", n, max_id, int(versions))
+
+
+def categories_etag_for_rows(rows):
+    """The same ETag as categories_etag, computed from the listed rows."""
+    return categories_etag(len(rows), max((row['id'] for row in rows), default=0), sum(row['version'] for row in rows))
+
+
+def get_categories_etag(db_conn, search_query: str = None):
+    db, cursor = db_conn
+    cursor.execute(*build_categories_version_query(search_query))
+    row = cursor.fetchone()
+    return categories_etag(row['n'], row['max_id'], row['versions'])
+
+
+def get_all_categories(db_conn, search_query: str = None, limit: int = None, offset: int = None, sort: str = "id", seek=None, backwards: bool = False):
+    db, cursor = db_conn
+    cursor.execute(*build_categories_query(search_query, limit, offset, sort, seek, backwards))
     return cursor.fetchall()
 
 
 def count_categories(db_conn, search_query: str = None):
     db, cursor = db_conn
-    query = "SELECT COUNT(*) FROM categories WHERE 1=1"
-    params = []
+    cursor.execute(*build_count_categories_query(search_query))
+    return cursor.fetchone()['COUNT(*)']
 
-    if search_query:
-        query += " AND (name LIKE %s OR slug LIKE %s)"
-        params.extend([f"%{search_query}%", f"%{search_query}%"])
 
-    cursor.execute(query, tuple(params))
-    return cursor.fetchone()['COUNT(*)']
+def invalidate_category_caches(category_ids=None, products_changed: bool = False):
+    """Drop cached data derived from the categories table after a write.
+
+    ``products_changed`` is set when the write also touched products, e.g.
+    a delete cascading to the category's products.
+    """
+    category_counts.clear()
+    category_cache.invalidate()
+    response_cache.purge("category", category_ids)
+    if products_changed:
+        invalidate_product_caches()
 
 
 def get_category_by_id(db_conn, category_id: int):
@@ -45,11 +167,12 @@ def create_category(db_conn, name: str, slug: str):
         (name, slug)
     )
     db.commit()
-    return cursor.lastrowid
+    category_id = cursor.lastrowid
+    invalidate_category_caches([category_id])
+    return category_id
 
 
-def update_category(db_conn, category_id: int, name: str = None, slug: str = None):
-    db, cursor = db_conn
+def build_update_category_query(category_id: int, name: str = None, slug: str = None):
     fields = []
     params = []
 
@@ -61,17 +184,35 @@ def update_category(db_conn, category_id: int, name: str = None, slug: str = Non
         params.append(slug)
     
     if not fields:
-        return 0
+        return None
 
+    fields.append("version = version + 1")
     params.append(category_id)
-    query = f"UPDATE categories SET {', '.join(fields)} WHERE id = %s"
-    cursor.execute(query, tuple(params))
+    return f"UPDATE categories SET {', '.join(fields)} WHERE id = %s", tuple(params)
+
+
+def update_category(db_conn, category_id: int, name: str = None, slug: str = None):
+    db, cursor = db_conn
+    
+    statement = build_update_category_query(category_id, name, slug)
+    if statement is None:
+        return 0
+
+    cursor.execute(*statement)
     db.commit()
-    return cursor.rowcount
+    rowcount = cursor.rowcount
+    invalidate_category_caches([category_id])
+    if name is not None:
+        # Category names are part of the indexed product text.
+        reindex_products(db_conn, "p.category_id = %s", (category_id,))
+    return rowcount
 
 
 def delete_category(db_conn, category_id: int):
     db, cursor = db_conn
     cursor.execute("DELETE FROM categories WHERE id=%s", (category_id,))
     db.commit()
+    invalidate_category_caches([category_id], products_changed=True)
+    if SEARCH_INDEX_ENABLED:
+        product_index.remove_category(category_id)
     return cursor.rowcount
@@ -1,12 +1,172 @@
+import threading
+from contextlib import contextmanager
 import mysql.connector
-from api.core.config import DB_CONFIG
+from api.core.config import (
+    DB_CONFIG, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+    REPLICA_DB_CONFIG, DB_REPLICA_MAX_LAG, DB_REPLICA_CHECK_INTERVAL, DB_REPLICA_RETRY_AFTER,
+)
+from api.core import metrics
+from api.db.pool import ConnectionPool
+from api.db.querycount import CountingCursor
+from api.db.replica import ReplicaMonitor, REPLICA_STATUS_QUERIES, parse_replica_lag
+
+_pool = None
+_replica_pool = None
+_pool_lock = threading.Lock()
+
+replica_monitor = ReplicaMonitor(DB_REPLICA_MAX_LAG, DB_REPLICA_CHECK_INTERVAL, DB_REPLICA_RETRY_AFTER)
+
+
+def _make_pool(config):
+    return ConnectionPool(
+        lambda: mysql.connector.connect(**config),
+        size=DB_POOL_SIZE,
+        timeout=DB_POOL_TIMEOUT,
+        recycle=DB_POOL_RECYCLE,
+        pre_ping=DB_POOL_PRE_PING,
+    )
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _make_pool(DB_CONFIG)
+    return _pool
+
+
+def get_replica_pool():
+    global _replica_pool
+    if REPLICA_DB_CONFIG is None:
+        return None
+    if _replica_pool is None:
+        with _pool_lock:
+            if _replica_pool is None:
+                _replica_pool = _make_pool(REPLICA_DB_CONFIG)
+    return _replica_pool
+
+
+def close_pool():
+    for pool in (_pool, _replica_pool):
+        if pool is not None:
+            pool.close()
+
+
+def pool_stats():
+    return _pool.stats() if _pool is not None else {}
+
+
+def replica_stats():
+    stats = replica_monitor.stats()
+    if _replica_pool is not None:
+        stats["pool"] = _replica_pool.stats()
+    return stats
+
+
+metrics.register("db_pool", pool_stats)
+metrics.register("db_replica", replica_stats)
+
+
+@contextmanager
+def pooled_connection():
+    pool = get_pool()
+    db = pool.acquire()
+    try:
+        yield db
+    finally:
+        pool.release(db)
 
 
 def get_db():
-    db = mysql.connector.connect(**DB_CONFIG)
+    with pooled_connection() as db:
+        cursor = CountingCursor(db.cursor(dictionary=True))
+        try:
+            yield db, cursor
+        finally:
+            cursor.close()
+
+
+@contextmanager
+def streaming_cursor():
+    """(db, cursor) for reading a large result with fetchmany().
+
+    The cursor is unbuffered, so rows stay on the server until fetched. If
+    the reader stops early (client disconnect) the connection is closed
+    rather than drained and returned to the pool.
+    """
+    pool = get_pool()
+    db = pool.acquire()
+    cursor = CountingCursor(db.cursor(dictionary=True, buffered=False))
+    try:
+        yield db, cursor
+    except BaseException:
+        pool.discard(db)
+        raise
+    try:
+        cursor.close()
+    except Exception:
+        pool.discard(db)
+        raise
+    pool.release(db)
+
+
+def _measure_replica_lag(db):
     cursor = db.cursor(dictionary=True)
+    try:
+        for query in REPLICA_STATUS_QUERIES:
+            try:
+                cursor.execute(query)
+            except mysql.connector.ProgrammingError:
+                continue
+            rows = cursor.fetchall()
+            return parse_replica_lag(rows[0] if rows else None)
+        raise RuntimeError("Unable to read replica status")
+    finally:
+        cursor.close()
+
+
+def _acquire_replica():
+    """Check out a replica connection, or None when reads should use the primary."""
+    pool = get_replica_pool()
+    if pool is None or not replica_monitor.available():
+        return pool, None
+
+    try:
+        db = pool.acquire()
+    except Exception:
+        replica_monitor.record_failure()
+        return pool, None
+
+    if replica_monitor.needs_check():
+        try:
+            replica_monitor.record_lag(_measure_replica_lag(db))
+        except Exception:
+            replica_monitor.record_failure()
+            pool.release(db)
+            return pool, None
+
+    if not replica_monitor.usable():
+        pool.release(db)
+        return pool, None
+    return pool, db
+
+
+def get_read_db():
+    """Like get_db, but served by the read replica when one is configured and
+    healthy. Only for reads that tolerate replication lag; anything that must
+    see the caller's own writes (cart, orders) stays on get_db."""
+    pool, db = _acquire_replica()
+    if db is None:
+        if pool is not None:
+            replica_monitor.record_read(replica=False)
+        yield from get_db()
+        return
+
+    replica_monitor.record_read(replica=True)
+    cursor = CountingCursor(db.cursor(dictionary=True))
     try:
         yield db, cursor
     finally:
         cursor.close()
-        db.close()
\ No newline at end of file
+        pool.release(db)
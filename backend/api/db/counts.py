@@ -0,0 +1,51 @@
+from api.core.cache import TTLCache
+from api.core.config import COUNT_STRATEGY, COUNT_CACHE_TTL, COUNT_CACHE_SIZE
+from api.core import metrics
+
+COUNT_STRATEGIES = ("exact", "cached", "estimate", "none")
+
+# Exact totals keyed by filter signature. Cleared by the write paths in
+# api.db.products / api.db.categories; the TTL bounds staleness for writes
+# made by other worker processes.
+product_counts = TTLCache(maxsize=COUNT_CACHE_SIZE, ttl=COUNT_CACHE_TTL)
+category_counts = TTLCache(maxsize=COUNT_CACHE_SIZE, ttl=COUNT_CACHE_TTL)
+
+metrics.register("product_count_cache", product_counts.stats)
+metrics.register("category_count_cache", category_counts.stats)
+
+ESTIMATE_ROWS_QUERY = """
+    SELECT TABLE_ROWS AS estimate
+    FROM information_schema.TABLES
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+"""
+
+
+def resolve_count_strategy(strategy: str = None, include_total: bool = True):
+    if not include_total:
+        return "none"
+    strategy = strategy or COUNT_STRATEGY
+    if strategy not in COUNT_STRATEGIES:
+        raise ValueError(f"Unknown count strategy '{strategy}'. Allowed: {', '.join(COUNT_STRATEGIES)}")
+    return strategy
+
+
+async def count_with_strategy(strategy: str, cache: TTLCache, key: tuple, exact, estimate):
+    """Return (total, estimated) for ``strategy``.
+
+    ``exact`` and ``estimate`` are zero-argument coroutine functions. The
+    estimate is only used when no filter is applied (``key`` is all None).
+    """
+    if strategy == "none":
+        return None, False
+
+    if strategy == "estimate" and all(part is None for part in key):
+        return await estimate(), True
+
+    if strategy == "exact":
+        return await exact(), False
+
+    total = cache.get(key)
+    if total is None:
+        total = await exact()
+        cache.set(key, total)
+    return total, False
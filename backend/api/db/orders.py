@@ -1,50 +1,242 @@
-from api.db.cart import get_cart_by_user_id
+import random
+from datetime import timedelta
+from decimal import Decimal
+from api.core.config import ORDER_RESERVATION_MINUTES, ORDER_TOTALS_SLOTS
+from api.db.cart import build_cart
+from api.db.products import invalidate_product_stock
+from api.db.pagination import keyset_clause, order_clause
+
+# Join with products to get current name (or snapshot if we stored it, but we only have ID)
+# Ideally order_items should have snapshot data, but for now we pull from products.
+# If product deleted, name comes up null or need left join.
+ORDER_ITEMS_QUERY = """
+    SELECT oi.*, p.name as product_name
+    FROM order_items oi
+    LEFT JOIN products p ON oi.product_id = p.id
+    WHERE oi.order_id = %s
+"""
+
+def build_order_items_batch_query(order_ids: list):
+    placeholders = ", ".join(["%s"] * len(order_ids))
+    query = f"""
+        SELECT oi.*, p.name as product_name
+        FROM order_items oi
+        LEFT JOIN products p ON oi.product_id = p.id
+        WHERE oi.order_id IN ({placeholders})
+        ORDER BY oi.order_id, oi.id
+    """
+    return query, tuple(order_ids)
+
+def attach_order_items(orders: list, item_rows: list):
+    """Group item rows by order_id onto each order's 'items' list."""
+    by_order = {order['id']: order for order in orders}
+    for order in orders:
+        order['items'] = []
+    for item in item_rows:
+        by_order[item['order_id']]['items'].append(item)
+    return orders
+
+# Order counters (order_status_totals, order_daily_totals) change in the
+# same transaction as the orders they count. Each status and day is split
+# over ORDER_TOTALS_SLOTS rows and every write picks one at random, so
+# concurrent checkouts do not queue on one row lock until they commit.
+# Readers sum the slots; a single slot may go negative.
+def totals_slot():
+    return random.randrange(ORDER_TOTALS_SLOTS)
+
+def build_status_totals_update(deltas: dict, slot: int = None):
+    """Upsert ``{status: (count_delta, revenue_delta)}`` into one slot, rows
+    in status order so concurrent transitions lock them in the same order."""
+    if slot is None:
+        slot = totals_slot()
+    rows = sorted(deltas.items())
+    placeholders = ", ".join(["(%s, %s, %s, %s)"] * len(rows))
+    query = f"""
+        INSERT INTO order_status_totals (status, slot, order_count, revenue) VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE order_count = order_count + VALUES(order_count), revenue = revenue + VALUES(revenue)
+    """
+    params = [value for status, (count, revenue) in rows for value in (status, slot, count, revenue)]
+    return query, tuple(params)
+
+def status_change_deltas(old_status: str, new_status: str, total_price):
+    return {old_status: (-1, -total_price), new_status: (1, total_price)}
+
+# (day, slot, count_delta, revenue_delta)
+DAILY_TOTALS_UPDATE = """
+    INSERT INTO order_daily_totals (day, slot, order_count, revenue) VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE order_count = order_count + VALUES(order_count), revenue = revenue + VALUES(revenue)
+"""
+
+ORDER_STATUS_FOR_UPDATE = "SELECT id, status, total_price, stock_reserved FROM orders WHERE id = %s FOR UPDATE"
+
+# Statuses whose orders still hold the stock they reserved at checkout;
+# cancelling one of them puts it back. Shipped goods have left.
+STOCK_HOLDING_STATUSES = ('pending', 'processing')
+
+def stock_quantities(items):
+    """Quantity per product id, ordered by id: rows are locked in that
+    order, so concurrent checkouts cannot deadlock each other."""
+    quantities = {}
+    for product_id, quantity in items:
+        if product_id is not None:
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+    return dict(sorted(quantities.items()))
+
+def _stock_case(quantities: dict):
+    return "CASE id " + " ".join(["WHEN %s THEN %s"] * len(quantities)) + " END"
+
+def build_stock_reservation(quantities: dict):
+    """One UPDATE taking ``quantities`` out of stock. A product without
+    enough stock is left alone, so the reservation succeeded only if every
+    product matched (rowcount == len(quantities))."""
+    case = _stock_case(quantities)
+    case_params = [value for item in quantities.items() for value in item]
+    ids = list(quantities)
+    placeholders = ", ".join(["%s"] * len(ids))
+    query = (
+        f"UPDATE products SET stock = stock - {case}, version = version + 1 "
+        f"WHERE id IN ({placeholders}) AND stock >= {case}"
+    )
+    return query, tuple(case_params + ids + case_params)
+
+def build_stock_release(quantities: dict):
+    case = _stock_case(quantities)
+    ids = list(quantities)
+    placeholders = ", ".join(["%s"] * len(ids))
+    query = f"UPDATE products SET stock = stock + {case}, version = version + 1 WHERE id IN ({placeholders})"
+    return query, tuple([value for item in quantities.items() for value in item] + ids)
+
+def short_products(cart: dict, quantities: dict):
+    """Names of the cart's products whose stock (as read at checkout) does
+    not cover the order."""
+    products = {item['product']['id']: item['product'] for item in cart['items']}
+    return [products[product_id]['name'] for product_id, quantity in quantities.items() if products[product_id]['stock'] < quantity]
+
+def insufficient_stock_error(cart: dict, quantities: dict):
+    names = short_products(cart, quantities)
+    # Empty when another checkout took the stock after the cart was read.
+    return ValueError("Insufficient stock for: " + ", ".join(names) if names else "Insufficient stock")
+
+ORDER_RESERVED_ITEMS_QUERY = "SELECT product_id, quantity FROM order_items WHERE order_id = %s"
+
+# Unpaid orders whose reservation ran out, oldest first.
+EXPIRED_RESERVATIONS_QUERY = """
+    SELECT id FROM orders
+    WHERE status = 'pending' AND reserved_until < NOW()
+    ORDER BY reserved_until
+    LIMIT %s
+"""
+
+def reservation_deadline(created_at):
+    if ORDER_RESERVATION_MINUTES <= 0:
+        return None
+    return created_at + timedelta(minutes=ORDER_RESERVATION_MINUTES)
+
+class OrderStatusConflict(ValueError):
+    """The order is not in a status the requested change starts from."""
+
+# The cart and its items, locked until the checkout commits: concurrent
+# cart edits wait instead of changing what is being ordered. Products are
+# read but not locked (FOR UPDATE OF, MySQL 8.0.1+). NOW() is the order's
+# created_at, taken from the database clock like the column default.
+CHECKOUT_CART_QUERY = """
+    SELECT c.id as cart_id, ci.id, ci.quantity,
+           p.id as product_id, p.name, p.description, p.price, p.image_url, p.stock, p.category_id, p.created_at,
+           NOW() as checkout_at
+    FROM carts c
+    JOIN cart_items ci ON ci.cart_id = c.id
+    JOIN products p ON ci.product_id = p.id
+    WHERE c.user_id = %s
+    ORDER BY ci.id
+    FOR UPDATE OF c, ci
+"""
+
+ORDER_INSERT = """
+    INSERT INTO orders (user_id, total_price, status, shipping_address, created_at, stock_reserved, reserved_until)
+    VALUES (%s, %s, %s, %s, %s, TRUE, %s)
+"""
+ORDER_ITEMS_INSERT = "INSERT INTO order_items (order_id, product_id, quantity, price_at_purchase) VALUES (%s, %s, %s, %s)"
+
+def order_item_rows(order_id: int, cart: dict):
+    return [(order_id, item['product']['id'], item['quantity'], item['product']['price']) for item in cart['items']]
+
+def build_created_order(order_id: int, first_item_id: int, user_id: int, shipping_address: str, created_at, reserved_until, cart: dict):
+    """The order as get_order_by_id would return it, from the checkout's data.
+
+    A multi-row INSERT gets consecutive auto-increment ids, so item ids
+    follow from the first one.
+    """
+    items = [
+        {
+            "id": first_item_id + i,
+            "order_id": order_id,
+            "product_id": item['product']['id'],
+            "quantity": item['quantity'],
+            "price_at_purchase": item['product']['price'],
+            "product_name": item['product']['name'],
+        }
+        for i, item in enumerate(cart['items'])
+    ]
+    return {
+        "id": order_id,
+        "user_id": user_id,
+        "total_price": cart['total_price'],
+        "status": 'pending',
+        "shipping_address": shipping_address,
+        "created_at": created_at,
+        "reserved_until": reserved_until,
+        "items": items,
+    }
 
 def create_order(db_conn, user_id: int, shipping_address: str):
     db, cursor = db_conn
-    
-    # 1. Get User's Cart
-    cart = get_cart_by_user_id(db_conn, user_id)
-    cart_items = cart['items']
-    
-    if not cart_items:
+
+    # 1. Lock the user's cart
+    cursor.execute(CHECKOUT_CART_QUERY, (user_id,))
+    rows = cursor.fetchall()
+    if not rows:
+        db.rollback()
         raise ValueError("Cart is empty")
-        
+    cart = build_cart(rows[0]['cart_id'], user_id, rows)
+    created_at = rows[0]['checkout_at']
+    reserved_until = reservation_deadline(created_at)
     total_price = cart['total_price']
-    
-    # 2. Create Order
-    cursor.execute(
-        "INSERT INTO orders (user_id, total_price, status, shipping_address) VALUES (%s, %s, %s, %s)",
-        (user_id, total_price, 'pending', shipping_address)
-    )
-    order_id = cursor.lastrowid
-    
-    # 3. Create Order Items (Copy from Cart)
-    for item in cart_items:
-        product = item['product']
-        cursor.execute(
-            "INSERT INTO order_items (order_id, product_id, quantity, price_at_purchase) VALUES (%s, %s, %s, %s)",
-            (order_id, product['id'], item['quantity'], product['price'])
-        )
-        
-    # 4. Clear Cart
-    cursor.execute("DELETE FROM cart_items WHERE cart_id = %s", (cart['id'],))
-    
-    db.commit()
-    return get_order_by_id(db_conn, order_id)
+    quantities = stock_quantities((item['product']['id'], item['quantity']) for item in cart['items'])
+
+    try:
+        # 2. Create Order
+        cursor.execute(ORDER_INSERT, (user_id, total_price, 'pending', shipping_address, created_at, reserved_until))
+        order_id = cursor.lastrowid
+
+        # 3. Create Order Items (one multi-row INSERT)
+        cursor.executemany(ORDER_ITEMS_INSERT, order_item_rows(order_id, cart))
+        first_item_id = cursor.lastrowid
+
+        # 4. Clear Cart
+        cursor.execute("DELETE FROM cart_items WHERE cart_id = %s", (cart['id'],))
+
+        # 5. Count the order
+        cursor.execute(*build_status_totals_update({'pending': (1, total_price)}))
+        cursor.execute(DAILY_TOTALS_UPDATE, (created_at.date(), totals_slot(), 1, total_price))
+
+        # 6. Reserve the stock. Last, so the product rows every checkout of
+        # a product waits for are locked only until the commit below.
+        cursor.execute(*build_stock_reservation(quantities))
+        if cursor.rowcount != len(quantities):
+            raise insufficient_stock_error(cart, quantities)
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    invalidate_product_stock(list(quantities))
+    return build_created_order(order_id, first_item_id, user_id, shipping_address, created_at, reserved_until, cart)
 
 def get_orders_by_user(db_conn, user_id: int):
     db, cursor = db_conn
     cursor.execute("SELECT * FROM orders WHERE user_id = %s ORDER BY created_at DESC", (user_id,))
     orders = cursor.fetchall()
-    
-    # Fetch items for all orders (naive N+1 constraint for now, optimization later if needed)
-    result = []
-    for order in orders:
-        order['items'] = get_order_items(db_conn, order['id'])
-        result.append(order)
-        
-    return result
+    return load_order_items(db_conn, orders)
 
 def get_order_by_id(db_conn, order_id: int):
     db, cursor = db_conn
@@ -56,57 +248,240 @@ def get_order_by_id(db_conn, order_id: int):
 
 def get_order_items(db_conn, order_id: int):
     db, cursor = db_conn
-    # Join with products to get current name (or snapshot if we stored it, but we only have ID)
-    # Ideally order_items should have snapshot data, but for now we pull from products.
-    # If product deleted, name comes up null or need left join.
-    query = """
-        SELECT oi.*, p.name as product_name
-        FROM order_items oi
-        LEFT JOIN products p ON oi.product_id = p.id
-        WHERE oi.order_id = %s
-    """
-    cursor.execute(query, (order_id,))
+    cursor.execute(ORDER_ITEMS_QUERY, (order_id,))
     return cursor.fetchall()
 
-def get_all_orders(db_conn, search_query: str = None):
+def load_order_items(db_conn, orders: list):
+    # One query for the items of every order in the list instead of one per order.
+    if not orders:
+        return orders
     db, cursor = db_conn
-    
+    cursor.execute(*build_order_items_batch_query([order['id'] for order in orders]))
+    return attach_order_items(orders, cursor.fetchall())
+
+ORDER_STATUSES = ('pending', 'processing', 'shipped', 'completed', 'cancelled')
+
+# Admin listings are always newest first; keyset pagination seeks on (created_at, id).
+ORDER_SORT = "-created_at"
+
+def _order_filters(search_query: str = None, status: str = None, created_from=None, created_to=None):
+    clauses = ""
+    params = []
+
     if search_query:
         # Check if query is a number (for ID search)
         if search_query.isdigit():
             # Search by ID or Status
-             cursor.execute(
-                "SELECT * FROM orders WHERE id = %s OR status LIKE %s ORDER BY created_at DESC", 
-                (int(search_query), f"%{search_query}%")
-            )
+            clauses += " AND (o.id = %s OR o.status LIKE %s)"
+            params.extend([int(search_query), f"%{search_query}%"])
         else:
-             cursor.execute(
-                "SELECT * FROM orders WHERE status LIKE %s ORDER BY created_at DESC", 
-                (f"%{search_query}%",)
-            )
-    else:
-        cursor.execute("SELECT * FROM orders ORDER BY created_at DESC")
+            clauses += " AND o.status LIKE %s"
+            params.append(f"%{search_query}%")
+
+    if status:
+        clauses += " AND o.status = %s"
+        params.append(status)
+
+    # created_from is inclusive, created_to exclusive.
+    if created_from is not None:
+        clauses += " AND o.created_at >= %s"
+        params.append(created_from)
+
+    if created_to is not None:
+        clauses += " AND o.created_at < %s"
+        params.append(created_to)
+
+    return clauses, params
+
+def build_all_orders_query(search_query: str = None, status: str = None, created_from=None, created_to=None, limit: int = None, seek=None, backwards: bool = False):
+    clauses, params = _order_filters(search_query, status, created_from, created_to)
+
+    if seek is not None:
+        seek_clause, seek_params = keyset_clause("o.created_at", "o.id", seek, True, backwards)
+        clauses += seek_clause
+        params.extend(seek_params)
+
+    query = "SELECT o.* FROM orders o WHERE 1=1" + clauses + order_clause("o.created_at", "o.id", True, backwards)
+
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+
+    return query, tuple(params)
+
+def get_all_orders(db_conn, search_query: str = None, status: str = None, created_from=None, created_to=None, limit: int = None, seek=None, backwards: bool = False):
+    db, cursor = db_conn
+    cursor.execute(*build_all_orders_query(search_query, status, created_from, created_to, limit, seek, backwards))
     
     orders = cursor.fetchall()
     # Populate items? For admin listing usually summary is enough, but user might expand. 
     # Let's keep it consistent.
-    result = []
-    for order in orders:
-        order['items'] = get_order_items(db_conn, order['id'])
-        result.append(order)
-    return result
+    return load_order_items(db_conn, orders)
+
+def build_order_export_query(search_query: str = None, status: str = None, created_from=None, created_to=None):
+    # One row per order item (orders without items get one row of NULLs),
+    # ordered so the rows of an order are adjacent.
+    clauses, params = _order_filters(search_query, status, created_from, created_to)
+    query = """
+        SELECT o.id, o.user_id, o.total_price, o.status, o.shipping_address, o.created_at,
+               oi.id AS item_id, oi.product_id, oi.quantity, oi.price_at_purchase, p.name AS product_name
+        FROM orders o
+        LEFT JOIN order_items oi ON oi.order_id = o.id
+        LEFT JOIN products p ON p.id = oi.product_id
+        WHERE 1=1""" + clauses + " ORDER BY o.created_at DESC, o.id DESC, oi.id"
+    return query, tuple(params)
 
-def update_order_status(db_conn, order_id: int, status: str):
+ORDER_EXPORT_FIELDS = ("id", "user_id", "total_price", "status", "shipping_address", "created_at")
+ORDER_ITEM_EXPORT_FIELDS = ("product_id", "quantity", "price_at_purchase", "product_name")
+
+ORDER_EXPORT_CSV_FIELDS = ORDER_EXPORT_FIELDS + ("item_id",) + ORDER_ITEM_EXPORT_FIELDS
+
+def flatten_export_order(order: dict):
+    """CSV rows for one exported order: one per item, or one with empty item columns."""
+    base = {field: order[field] for field in ORDER_EXPORT_FIELDS}
+    if not order['items']:
+        return [base]
+    return [dict(base, item_id=item['id'], **{field: item[field] for field in ORDER_ITEM_EXPORT_FIELDS}) for item in order['items']]
+
+def group_export_rows(rows, current=None):
+    """Fold joined order/item rows into orders.
+
+    Returns (finished orders, the order still being filled). The last
+    order of a chunk may continue in the next one, so it is carried over.
+    """
+    finished = []
+    for row in rows:
+        if current is None or current['id'] != row['id']:
+            if current is not None:
+                finished.append(current)
+            current = {field: row[field] for field in ORDER_EXPORT_FIELDS}
+            current['items'] = []
+        if row['item_id'] is not None:
+            item = {field: row[field] for field in ORDER_ITEM_EXPORT_FIELDS}
+            item['id'] = row['item_id']
+            current['items'].append(item)
+    return finished, current
+
+def iter_orders_export(db_conn, search_query: str = None, status: str = None, created_from=None, created_to=None, chunk_size: int = 1000):
+    """Yield lists of orders (with items) read in chunks of ``chunk_size`` rows.
+
+    The cursor must be unbuffered so rows stay on the server until fetched;
+    memory use is bounded by the chunk size, not the number of orders.
+    """
     db, cursor = db_conn
-    cursor.execute("UPDATE orders SET status = %s WHERE id = %s", (status, order_id))
-    db.commit()
-    if cursor.rowcount == 0:
+    cursor.execute(*build_order_export_query(search_query, status, created_from, created_to))
+    current = None
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        finished, current = group_export_rows(rows, current)
+        if finished:
+            yield finished
+    if current is not None:
+        yield [current]
+
+def check_status_change(order: dict, status: str, from_statuses=None):
+    if from_statuses is not None and order['status'] not in from_statuses:
+        raise OrderStatusConflict(f"Cannot change order in status '{order['status']}' to '{status}'")
+    if order['status'] == 'cancelled' and status != 'cancelled':
+        # Its stock went back on sale when it was cancelled.
+        raise OrderStatusConflict("Cancelled orders cannot be reopened")
+
+def releases_stock(order: dict, status: str):
+    return status == 'cancelled' and order['stock_reserved'] and order['status'] in STOCK_HOLDING_STATUSES
+
+def update_order_status(db_conn, order_id: int, status: str, from_statuses=None):
+    """Move the order to ``status``; with ``from_statuses``, only from one
+    of those (checked under the row lock, raises OrderStatusConflict).
+
+    Cancelling an order that holds stock gives it back in the same
+    transaction.
+    """
+    db, cursor = db_conn
+    # The row lock makes concurrent changes of one order move the counters
+    # one after the other.
+    cursor.execute(ORDER_STATUS_FOR_UPDATE, (order_id,))
+    order = cursor.fetchone()
+    if order is None:
+        db.rollback()
         return None
+    released = []
+    try:
+        check_status_change(order, status, from_statuses)
+        if order['status'] != status:
+            release = releases_stock(order, status)
+            if release:
+                cursor.execute("UPDATE orders SET status = %s, stock_reserved = FALSE WHERE id = %s", (status, order_id))
+            else:
+                cursor.execute("UPDATE orders SET status = %s WHERE id = %s", (status, order_id))
+            cursor.execute(*build_status_totals_update(status_change_deltas(order['status'], status, order['total_price'])))
+            if release:
+                # Product rows last, as in create_order: both lock the counter
+                # rows before products, so they cannot deadlock each other.
+                cursor.execute(ORDER_RESERVED_ITEMS_QUERY, (order_id,))
+                quantities = stock_quantities((row['product_id'], row['quantity']) for row in cursor.fetchall())
+                if quantities:
+                    cursor.execute(*build_stock_release(quantities))
+                    released = list(quantities)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    if released:
+        invalidate_product_stock(released)
     return get_order_by_id(db_conn, order_id)
 
+def release_expired_reservations(db_conn, limit: int = 100):
+    """Cancel unpaid orders past their reservation, each in its own
+    transaction. Returns the ids cancelled here.
+
+    Safe to run in every worker at once: an order paid or cancelled
+    meanwhile fails the status check under its row lock and is skipped.
+    """
+    db, cursor = db_conn
+    cursor.execute(EXPIRED_RESERVATIONS_QUERY, (limit,))
+    order_ids = [row['id'] for row in cursor.fetchall()]
+    db.commit()
+    cancelled = []
+    for order_id in order_ids:
+        try:
+            if update_order_status(db_conn, order_id, 'cancelled', from_statuses=('pending',)):
+                cancelled.append(order_id)
+        except OrderStatusConflict:
+            pass
+    return cancelled
+
+
+ORDER_STATUS_TOTALS_QUERY = """
+    SELECT status, CAST(SUM(order_count) AS SIGNED) AS order_count, SUM(revenue) AS revenue
+    FROM order_status_totals
+    GROUP BY status
+"""
+
+# The last ``days`` days, today included.
+ORDER_DAILY_TOTALS_QUERY = """
+    SELECT day, CAST(SUM(order_count) AS SIGNED) AS order_count, SUM(revenue) AS revenue
+    FROM order_daily_totals
+    WHERE day > CURRENT_DATE() - INTERVAL %s DAY
+    GROUP BY day
+    ORDER BY day
+"""
+
+def order_stats_response(status_rows: list, daily_rows: list):
+    statuses = {status: {"count": 0, "revenue": Decimal("0.00")} for status in ORDER_STATUSES}
+    for row in status_rows:
+        statuses[row['status']] = {"count": row['order_count'], "revenue": row['revenue']}
+    return {
+        # Orders waiting for the shop: what the admin notification badge shows.
+        "pending_count": statuses['pending']['count'] + statuses['processing']['count'],
+        "statuses": statuses,
+        "daily": [{"day": row['day'], "count": row['order_count'], "revenue": row['revenue']} for row in daily_rows],
+    }
 
-def get_order_stats(db_conn):
+def get_order_stats(db_conn, days: int = 30):
     db, cursor = db_conn
-    cursor.execute("SELECT COUNT(*) as count FROM orders WHERE status IN ('pending', 'processing')")
-    result = cursor.fetchone()
-    return {"pending_count": result['count'] if result else 0}
+    cursor.execute(ORDER_STATUS_TOTALS_QUERY)
+    status_rows = cursor.fetchall()
+    cursor.execute(ORDER_DAILY_TOTALS_QUERY, (days,))
+    return order_stats_response(status_rows, cursor.fetchall())
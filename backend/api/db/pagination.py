@@ -0,0 +1,81 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+
+
+def parse_sort(sort: str, columns: dict):
+    """Split ``"price"`` / ``"-price"`` into (key, column, descending)."""
+    descending = sort.startswith("-")
+    key = sort.lstrip("-")
+    if key not in columns:
+        raise ValueError(f"Cannot sort by '{key}'. Allowed: {', '.join(columns)}")
+    return key, columns[key], descending
+
+
+def encode_cursor(sort: str, row: dict, key: str, backwards: bool = False):
+    value = row[key]
+    if isinstance(value, datetime):
+        value = value.isoformat(sep=" ")
+    elif isinstance(value, Decimal):
+        value = str(value)
+    payload = {"s": sort, "v": value, "id": row["id"], "b": backwards}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, sort: str):
+    """Return (value, id, backwards) for a cursor issued for ``sort``."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        seek = (payload["v"], int(payload["id"]))
+        backwards = bool(payload.get("b", False))
+        issued_for = payload["s"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    if issued_for != sort:
+        raise ValueError("Cursor was issued for a different sort order")
+    return seek, backwards
+
+
+def keyset_clause(column: str, id_column: str, seek, descending: bool, backwards: bool):
+    """WHERE fragment selecting rows strictly after ``seek`` in scan order.
+
+    Written as ``k > v OR (k = v AND id > i)`` rather than a row constructor
+    so MySQL can use a range scan on the ``(k, id)`` index.
+    """
+    op = "<" if descending != backwards else ">"
+    value, row_id = seek
+    if column == id_column:
+        return f" AND {id_column} {op} %s", [row_id]
+    return f" AND ({column} {op} %s OR ({column} = %s AND {id_column} {op} %s))", [value, value, row_id]
+
+
+def order_clause(column: str, id_column: str, descending: bool, backwards: bool):
+    direction = "DESC" if descending != backwards else "ASC"
+    if column == id_column:
+        return f" ORDER BY {id_column} {direction}"
+    return f" ORDER BY {column} {direction}, {id_column} {direction}"
+
+
+def page_cursors(rows: list, size: int, sort: str, key: str, backwards: bool, has_previous: bool):
+    """Trim the ``size + 1`` look-ahead row and build next/prev cursors.
+
+    ``rows`` are in scan order; the returned items are in display order.
+    ``has_previous`` says whether the caller arrived from an earlier page
+    (a cursor, or page > 1 in page/size mode).
+    """
+    has_more = len(rows) > size
+    items = rows[:size]
+    if backwards:
+        items.reverse()
+
+    if not items:
+        return items, None, None
+
+    more_after = has_previous if backwards else has_more
+    more_before = has_more if backwards else has_previous
+    next_cursor = encode_cursor(sort, items[-1], key) if more_after else None
+    prev_cursor = encode_cursor(sort, items[0], key, backwards=True) if more_before else None
+    return items, next_cursor, prev_cursor
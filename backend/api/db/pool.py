@@ -0,0 +1,167 @@
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Fixed-size, thread-safe pool of DB-API connections.
+
+    Connections are opened lazily up to ``size``. A checkout waits at most
+    ``timeout`` seconds for a free connection, pings idle connections before
+    handing them out (``pre_ping``) and reopens any connection older than
+    ``recycle`` seconds.
+    """
+
+    def __init__(self, connect, size: int = 10, timeout: float = 30.0, recycle: float = 1800.0, pre_ping: bool = True):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._born = {}
+        self._open = 0
+
+        # Counters
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._exhausted = 0
+        self._timeouts = 0
+        self._connects = 0
+        self._recycled = 0
+        self._invalidated = 0
+
+    def acquire(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        conn = None
+        had_to_wait = False
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    break
+                if not had_to_wait:
+                    had_to_wait = True
+                    self._exhausted += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"No database connection available within {self.timeout}s")
+                self._cond.wait(remaining)
+
+            waited = time.monotonic() - start
+            self._checkouts += 1
+            if had_to_wait:
+                self._waits += 1
+            self._wait_time_total += waited
+            self._wait_time_max = max(self._wait_time_max, waited)
+
+        if conn is not None:
+            conn = self._validate(conn)
+        if conn is None:
+            conn = self._open_connection()
+        return conn
+
+    def release(self, conn):
+        try:
+            # Never hand a connection with an open transaction (or a stale
+            # REPEATABLE READ snapshot) to the next request.
+            conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def discard(self, conn):
+        """Close a checked-out connection instead of returning it to the pool."""
+        with self._cond:
+            self._invalidated += 1
+        self._discard(conn)
+
+    def close(self):
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_time_total": round(self._wait_time_total, 6),
+                "wait_time_max": round(self._wait_time_max, 6),
+                "exhausted": self._exhausted,
+                "timeouts": self._timeouts,
+                "connects": self._connects,
+                "recycled": self._recycled,
+                "invalidated": self._invalidated,
+            }
+
+    def _open_connection(self):
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._connects += 1
+            self._born[id(conn)] = time.monotonic()
+        return conn
+
+    def _validate(self, conn):
+        born = self._born.get(id(conn), 0.0)
+        if self.recycle and time.monotonic() - born > self.recycle:
+            with self._cond:
+                self._recycled += 1
+            self._close_quietly(conn)
+            return None
+
+        if self.pre_ping:
+            try:
+                alive = conn.is_connected()
+            except Exception:
+                alive = False
+            if not alive:
+                with self._cond:
+                    self._invalidated += 1
+                self._close_quietly(conn)
+                return None
+
+        return conn
+
+    def _discard(self, conn):
+        self._close_quietly(conn)
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def _close_quietly(self, conn):
+        self._born.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -0,0 +1,153 @@
+"""Bulk product import: records validated one at a time, written in chunks.
+
+Used by POST /products/import and ``python -m api.cli.import_products``.
+Each chunk is committed on its own, so memory stays bounded by the chunk
+size and a failure late in a file keeps what was imported before it.
+"""
+import mysql.connector
+from pydantic import ValidationError
+from api.core.config import IMPORT_CHUNK_SIZE, IMPORT_MAX_ERRORS
+from api.db.categories import load_categories
+from api.db.products import invalidate_product_caches, reindex_products
+from api.schemas.product import ProductCreate
+
+PRODUCT_IMPORT_COLUMNS = ("name", "description", "price", "image_url", "stock", "category_id")
+
+PRODUCT_IMPORT_INSERT = (
+    f"INSERT INTO products ({', '.join(PRODUCT_IMPORT_COLUMNS)}) "
+    f"VALUES ({', '.join(['%s'] * len(PRODUCT_IMPORT_COLUMNS))})"
+)
+
+# Rows with an id replace that product, or create it under that id.
+PRODUCT_IMPORT_UPSERT = (
+    f"INSERT INTO products (id, {', '.join(PRODUCT_IMPORT_COLUMNS)}) "
+    f"VALUES ({', '.join(['%s'] * (len(PRODUCT_IMPORT_COLUMNS) + 1))}) "
+    f"ON DUPLICATE KEY UPDATE {', '.join(f'{column} = VALUES({column})' for column in PRODUCT_IMPORT_COLUMNS)}, version = version + 1"
+)
+
+
+def error_message(error: Exception):
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors())
+    if isinstance(error, mysql.connector.Error):
+        return error.msg
+    return str(error)
+
+
+def prepare_row(record: dict, category_ids: set, category_ids_by_slug: dict):
+    """(product id or None, insert parameters) for one record; raises
+    ValueError when it is not a valid product.
+
+    ``category_slug`` may stand in for ``category_id``.
+    """
+    record = dict(record)
+    slug = record.pop("category_slug", None)
+    if slug is not None:
+        if slug not in category_ids_by_slug:
+            raise ValueError(f"Unknown category slug '{slug}'")
+        record["category_id"] = category_ids_by_slug[slug]
+    product_id = record.pop("id", None)
+    if product_id is not None:
+        try:
+            product_id = int(product_id)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid id '{product_id}'")
+    product = ProductCreate.model_validate(record)
+    if product.category_id not in category_ids:
+        raise ValueError(f"Unknown category_id {product.category_id}")
+    return product_id, tuple(getattr(product, column) for column in PRODUCT_IMPORT_COLUMNS)
+
+
+def new_summary():
+    return {"rows": 0, "inserted": 0, "updated": 0, "failed": 0, "errors": [], "errors_truncated": False}
+
+
+def record_error(summary: dict, line: int, error: Exception, max_errors: int):
+    summary["failed"] += 1
+    if len(summary["errors"]) < max_errors:
+        summary["errors"].append({"line": line, "error": error_message(error)})
+    else:
+        summary["errors_truncated"] = True
+
+
+def write_rows(cursor, rows):
+    """Insert/upsert (line, product id, params) rows, uncommitted. Returns
+    (ids written, inserted, updated)."""
+    inserts = [params for line, product_id, params in rows if product_id is None]
+    upserts = [(product_id,) + params for line, product_id, params in rows if product_id is not None]
+    ids, inserted, updated = [], 0, 0
+    if inserts:
+        # One multi-row INSERT: consecutive ids from the first one.
+        cursor.executemany(PRODUCT_IMPORT_INSERT, inserts)
+        ids.extend(range(cursor.lastrowid, cursor.lastrowid + len(inserts)))
+        inserted += len(inserts)
+    if upserts:
+        cursor.executemany(PRODUCT_IMPORT_UPSERT, upserts)
+        # Affected rows: 1 per new product, 2 per updated one (the version
+        # always changes).
+        replaced = cursor.rowcount - len(upserts)
+        inserted += len(upserts) - replaced
+        updated += replaced
+        ids.extend(row[0] for row in upserts)
+    return ids, inserted, updated
+
+
+def write_chunk(db_conn, rows, summary: dict, max_errors: int):
+    db, cursor = db_conn
+    try:
+        ids, inserted, updated = write_rows(cursor, rows)
+        db.commit()
+    except mysql.connector.Error:
+        db.rollback()
+        # Some row was refused (e.g. a value too long for its column): write
+        # this chunk one row at a time to find it.
+        ids, inserted, updated = [], 0, 0
+        for row in rows:
+            try:
+                row_ids, row_inserted, row_updated = write_rows(cursor, [row])
+                db.commit()
+            except mysql.connector.Error as e:
+                db.rollback()
+                record_error(summary, row[0], e, max_errors)
+                continue
+            ids.extend(row_ids)
+            inserted += row_inserted
+            updated += row_updated
+    summary["inserted"] += inserted
+    summary["updated"] += updated
+    if ids:
+        # Committed: counts, cached responses and the search index catch up
+        # chunk by chunk, not only when a long import is over.
+        invalidate_product_caches(ids)
+        placeholders = ", ".join(["%s"] * len(ids))
+        reindex_products(db_conn, f"p.id IN ({placeholders})", tuple(ids))
+
+
+def import_products(db_conn, records, chunk_size: int = IMPORT_CHUNK_SIZE, max_errors: int = IMPORT_MAX_ERRORS):
+    """Validate and write the (line number, record) pairs of iter_records.
+
+    Returns a summary: rows read, products inserted and updated, rows
+    failed, and the first ``max_errors`` errors with their line numbers.
+    """
+    # One category lookup for the whole import.
+    categories = load_categories(db_conn)
+    category_ids = {row["id"] for row in categories}
+    category_ids_by_slug = {row["slug"]: row["id"] for row in categories}
+
+    summary = new_summary()
+    chunk = []
+    for line, record in records:
+        summary["rows"] += 1
+        try:
+            if isinstance(record, Exception):
+                raise record
+            chunk.append((line,) + prepare_row(record, category_ids, category_ids_by_slug))
+        except ValueError as e:
+            record_error(summary, line, e, max_errors)
+            continue
+        if len(chunk) >= chunk_size:
+            write_chunk(db_conn, chunk, summary, max_errors)
+            chunk = []
+    if chunk:
+        write_chunk(db_conn, chunk, summary, max_errors)
+    return summary
@@ -1,30 +1,127 @@
-def get_all_products(db_conn, search_query: str = None, min_price: float = None, max_price: float = None, category_id: int = None, limit: int = None, offset: int = None):
-    db, cursor = db_conn
-    
-    query = """
-        SELECT p.*, c.name as category_name 
-        FROM products p
-        LEFT JOIN categories c ON p.category_id = c.id
-        WHERE 1=1
+import re
+from decimal import Decimal, ROUND_HALF_UP
+from api.core.config import FULLTEXT_MIN_TOKEN_SIZE, SEARCH_INDEX_ENABLED, PRODUCT_BULK_CHUNK_SIZE
+from api.core.etag import make_etag
+from api.core.response_cache import response_cache
+from api.core.search_index import product_index
+from api.db.pagination import parse_sort, keyset_clause, order_clause
+from api.db.counts import product_counts
+
+
+# Ratings come from product_rating_stats (one row per reviewed product),
+# never from aggregating reviews.
+PRODUCT_SELECT = """
+    SELECT p.*, c.name as category_name, c.version as category_version,
+           COALESCE(rs.rating_count, 0) as rating_count,
+           ROUND(rs.rating_sum / rs.rating_count, 2) as rating_average
+    FROM products p
+    LEFT JOIN categories c ON p.category_id = c.id
+    LEFT JOIN product_rating_stats rs ON rs.product_id = p.id
+"""
+
+PRODUCT_SELECT_WITH_RELEVANCE = """
+    SELECT p.*, c.name as category_name, c.version as category_version,
+           COALESCE(rs.rating_count, 0) as rating_count,
+           ROUND(rs.rating_sum / rs.rating_count, 2) as rating_average,
+           MATCH(p.name, p.description) AGAINST (%s IN BOOLEAN MODE) AS relevance
+    FROM products p
+    LEFT JOIN categories c ON p.category_id = c.id
+    LEFT JOIN product_rating_stats rs ON rs.product_id = p.id
+"""
+
+# InnoDB's default full-text stopword list. A required (+) stopword would
+# match nothing, so these are dropped from the query instead.
+FULLTEXT_STOPWORDS = {
+    "a", "about", "an", "are", "as", "at", "be", "by", "com", "de", "en", "for",
+    "from", "how", "i", "in", "is", "it", "la", "of", "on", "or", "that", "the",
+    "this", "to", "was", "what", "when", "where", "who", "will", "with", "und", "www",
+}
+
+
+def fulltext_query(search_query: str):
+    """Boolean-mode AGAINST expression requiring every word as a prefix.
+
+    ``"red lam"`` becomes ``"+red* +lam*"``. Returns None when no word is
+    long enough for the full-text index, in which case callers fall back
+    to LIKE.
     """
+    if not search_query:
+        return None
+    words = [
+        word for word in re.findall(r"\w+", search_query.lower())
+        if len(word) >= FULLTEXT_MIN_TOKEN_SIZE and word not in FULLTEXT_STOPWORDS
+    ]
+    if not words:
+        return None
+    return " ".join(f"+{word}*" for word in words)
+
+
+def _product_filters(search_query: str = None, min_price: float = None, max_price: float = None, category_id: int = None):
+    clauses = ""
     params = []
     
     if search_query:
-        query += " AND (p.name LIKE %s OR p.description LIKE %s)"
-        params.extend([f"%{search_query}%", f"%{search_query}%"])
+        against = fulltext_query(search_query)
+        if against:
+            clauses += " AND MATCH(p.name, p.description) AGAINST (%s IN BOOLEAN MODE)"
+            params.append(against)
+        else:
+            # Too short for the full-text index
+            clauses += " AND (p.name LIKE %s OR p.description LIKE %s)"
+            params.extend([f"%{search_query}%", f"%{search_query}%"])
         
     if min_price is not None:
-        query += " AND p.price >= %s"
+        clauses += " AND p.price >= %s"
         params.append(min_price)
         
     if max_price is not None:
-        query += " AND p.price <= %s"
+        clauses += " AND p.price <= %s"
         params.append(max_price)
         
     if category_id is not None:
-        query += " AND p.category_id = %s"
+        clauses += " AND p.category_id = %s"
         params.append(category_id)
         
+    return clauses, params
+
+
+PRODUCT_SORT_COLUMNS = {
+    "id": "p.id",
+    "price": "p.price",
+    "name": "p.name",
+    "relevance": "relevance",
+}
+
+
+def default_product_sort(search_query: str = None):
+    """Most relevant first for full-text searches, by id otherwise."""
+    return "-relevance" if fulltext_query(search_query) else "id"
+
+
+def build_products_query(search_query: str = None, min_price: float = None, max_price: float = None, category_id: int = None, limit: int = None, offset: int = None, sort: str = "id", seek=None, backwards: bool = False):
+    clauses, params = _product_filters(search_query, min_price, max_price, category_id)
+    key, column, descending = parse_sort(sort, PRODUCT_SORT_COLUMNS)
+    
+    against = fulltext_query(search_query)
+    select = PRODUCT_SELECT
+    if against:
+        select = PRODUCT_SELECT_WITH_RELEVANCE
+        params.insert(0, against)
+    elif key == "relevance":
+        raise ValueError("Sorting by relevance requires a search query")
+    
+    having = ""
+    if seek is not None:
+        seek_clause, seek_params = keyset_clause(column, "p.id", seek, descending, backwards)
+        if key == "relevance":
+            # The relevance alias is only visible to HAVING, not WHERE.
+            having = " HAVING " + seek_clause[len(" AND "):]
+        else:
+            clauses += seek_clause
+        params.extend(seek_params)
+    
+    query = select + " WHERE 1=1" + clauses + having + order_clause(column, "p.id", descending, backwards)
+        
     if limit is not None:
         query += " LIMIT %s"
         params.append(limit)
@@ -33,47 +130,175 @@ def get_all_products(db_conn, search_query: str = None, min_price: float = None,
         query += " OFFSET %s"
         params.append(offset)
         
-    cursor.execute(query, tuple(params))
+    return query, tuple(params)
+
+
+def build_count_products_query(search_query: str = None, min_price: float = None, max_price: float = None, category_id: int = None):
+    clauses, params = _product_filters(search_query, min_price, max_price, category_id)
+    return "SELECT COUNT(*) FROM products p WHERE 1=1" + clauses, tuple(params)
+
+
+def get_all_products(db_conn, search_query: str = None, min_price: float = None, max_price: float = None, category_id: int = None, limit: int = None, offset: int = None, sort: str = "id", seek=None, backwards: bool = False):
+    db, cursor = db_conn
+    cursor.execute(*build_products_query(search_query, min_price, max_price, category_id, limit, offset, sort, seek, backwards))
     return cursor.fetchall()
 
 
 def count_products(db_conn, search_query: str = None, min_price: float = None, max_price: float = None, category_id: int = None):
     db, cursor = db_conn
-    
-    query = "SELECT COUNT(*) FROM products WHERE 1=1"
-    params = []
-    
-    if search_query:
-        query += " AND (name LIKE %s OR description LIKE %s)"
-        params.extend([f"%{search_query}%", f"%{search_query}%"])
-        
-    if min_price is not None:
-        query += " AND price >= %s"
-        params.append(min_price)
-        
-    if max_price is not None:
-        query += " AND price <= %s"
-        params.append(max_price)
-        
-    if category_id is not None:
-        query += " AND category_id = %s"
-        params.append(category_id)
-        
-    cursor.execute(query, tuple(params))
+    cursor.execute(*build_count_products_query(search_query, min_price, max_price, category_id))
     return cursor.fetchone()['COUNT(*)']
 
 
+def invalidate_product_caches(product_ids=None):
+    """Drop cached data derived from the products table after a write."""
+    product_counts.clear()
+    response_cache.purge("product", product_ids)
+
+
+def invalidate_product_stock(product_ids):
+    """After a stock-only change (checkout, cancellation), which happens on
+    every order: counts and the search index do not depend on stock.
+
+    Only the products' own responses are dropped, and with the memory
+    backend only in this worker. Listings and the other workers show the
+    old stock until their entries expire, instead of every order emptying
+    the listing cache of every worker.
+    """
+    response_cache.purge("product", product_ids, collections=False, broadcast=False)
+
+
 def get_product_by_id(db_conn, product_id: int):
     db, cursor = db_conn
-    cursor.execute("""
-        SELECT p.*, c.name as category_name 
-        FROM products p
-        LEFT JOIN categories c ON p.category_id = c.id
-        WHERE p.id=%s
-    """, (product_id,))
+    cursor.execute(PRODUCT_SELECT + " WHERE p.id=%s", (product_id,))
     return cursor.fetchone()
 
 
+# Just enough to compute a product's ETag; the product response embeds the
+# category name, so the category's version is part of it.
+PRODUCT_VERSION_QUERY = """
+    SELECT p.id, p.version, c.version as category_version
+    FROM products p
+    LEFT JOIN categories c ON p.category_id = c.id
+    WHERE p.id = %s
+"""
+
+
+def product_etag(row: dict):
+    return make_etag("product", row['id'], row['version'], row['category_version'] or 0)
+
+
+def get_product_version(db_conn, product_id: int):
+    db, cursor = db_conn
+    cursor.execute(PRODUCT_VERSION_QUERY, (product_id,))
+    return cursor.fetchone()
+
+
+def bump_product_version(db_conn, product_id: int):
+    """Mark a product as changed for data stored outside its row (e.g. reviews).
+
+    Runs inside the caller's transaction; the caller commits.
+    """
+    db, cursor = db_conn
+    cursor.execute("UPDATE products SET version = version + 1 WHERE id = %s", (product_id,))
+
+
+def build_products_by_ids_query(product_ids):
+    placeholders = ", ".join(["%s"] * len(product_ids))
+    return PRODUCT_SELECT + f" WHERE p.id IN ({placeholders})", tuple(product_ids)
+
+
+def order_by_ids(rows, product_ids):
+    by_id = {row['id']: row for row in rows}
+    return [by_id[product_id] for product_id in product_ids if product_id in by_id]
+
+
+def get_products_by_ids(db_conn, product_ids):
+    """Products for ``product_ids``, in that order; missing ids are skipped."""
+    if not product_ids:
+        return []
+    db, cursor = db_conn
+    cursor.execute(*build_products_by_ids_query(product_ids))
+    return order_by_ids(cursor.fetchall(), product_ids)
+
+
+# Catalog export
+
+PRODUCT_EXPORT_FIELDS = (
+    "id", "name", "description", "price", "image_url", "stock", "category_id", "category_slug", "category_name",
+    "version", "created_at", "updated_at",
+)
+
+
+def build_product_export_query(updated_since=None):
+    # category_slug makes an export loadable again with the product import.
+    query = """
+        SELECT p.id, p.name, p.description, p.price, p.image_url, p.stock, p.category_id,
+               c.slug AS category_slug, c.name AS category_name, p.version, p.created_at, p.updated_at
+        FROM products p
+        LEFT JOIN categories c ON p.category_id = c.id"""
+    params = []
+    if updated_since is not None:
+        query += " WHERE p.updated_at >= %s"
+        params.append(updated_since)
+    return query + " ORDER BY p.id", tuple(params)
+
+
+def iter_products_export(db_conn, updated_since=None, chunk_size: int = 1000):
+    """Yield lists of at most ``chunk_size`` product rows, in id order.
+
+    Meant for an unbuffered cursor (streaming_cursor()): memory use depends
+    on the chunk size, not on the size of the catalog.
+    """
+    db, cursor = db_conn
+    cursor.execute(*build_product_export_query(updated_since))
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield rows
+
+
+# Search index maintenance
+
+SEARCH_INDEX_SELECT = """
+    SELECT p.id, p.name, p.description, p.price, p.category_id, c.name as category_name
+    FROM products p
+    LEFT JOIN categories c ON p.category_id = c.id
+"""
+
+
+def load_product_index(db_conn, batch_size: int = 5000):
+    """Rebuild the in-memory search index from the products table."""
+    db, cursor = db_conn
+    product_index.begin_rebuild()
+    cursor.execute(SEARCH_INDEX_SELECT + " ORDER BY p.id")
+
+    def rows():
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            yield from batch
+
+    product_index.load(rows())
+
+
+def reindex_products(db_conn, where: str, params: tuple):
+    """Re-read the matching products into the search index."""
+    if not SEARCH_INDEX_ENABLED:
+        return
+    db, cursor = db_conn
+    cursor.execute(SEARCH_INDEX_SELECT + " WHERE " + where, params)
+    for row in cursor.fetchall():
+        product_index.add(row)
+
+
+def unindex_product(product_id: int):
+    if SEARCH_INDEX_ENABLED:
+        product_index.remove(product_id)
+
+
 def create_product(db_conn, name: str, price: float, category_id: int, description: str = None, image_url: str = None, stock: int = 0):
     db, cursor = db_conn
     cursor.execute(
@@ -84,12 +309,13 @@ def create_product(db_conn, name: str, price: float, category_id: int, descripti
         (name, description, price, image_url, stock, category_id)
     )
     db.commit()
-    return cursor.lastrowid
+    product_id = cursor.lastrowid
+    invalidate_product_caches([product_id])
+    reindex_products(db_conn, "p.id = %s", (product_id,))
+    return product_id
 
 
-def update_product(db_conn, product_id: int, name: str = None, price: float = None, category_id: int = None, description: str = None, image_url: str = None, stock: int = None):
-    db, cursor = db_conn
-    
+def build_update_product_query(product_id: int, name: str = None, price: float = None, category_id: int = None, description: str = None, image_url: str = None, stock: int = None):
     fields = []
     params = []
     
@@ -113,18 +339,123 @@ def update_product(db_conn, product_id: int, name: str = None, price: float = No
         params.append(stock)
         
     if not fields:
-        return
+        return None
         
+    fields.append("version = version + 1")
     params.append(product_id)
-    query = f"UPDATE products SET {', '.join(fields)} WHERE id = %s"
+    return f"UPDATE products SET {', '.join(fields)} WHERE id = %s", tuple(params)
+
+
+def update_product(db_conn, product_id: int, name: str = None, price: float = None, category_id: int = None, description: str = None, image_url: str = None, stock: int = None):
+    db, cursor = db_conn
     
-    cursor.execute(query, tuple(params))
+    statement = build_update_product_query(product_id, name, price, category_id, description, image_url, stock)
+    if statement is None:
+        return
+    
+    cursor.execute(*statement)
     db.commit()
-    return cursor.rowcount
+    rowcount = cursor.rowcount
+    invalidate_product_caches([product_id])
+    reindex_products(db_conn, "p.id = %s", (product_id,))
+    return rowcount
+
+
+# Bulk price and stock updates
+
+PRICE_STEP = Decimal("0.01")  # products.price is DECIMAL(10, 2)
+
+
+def merge_bulk_updates(updates):
+    """(id, price, stock) updates merged per id (later values win), ordered
+    by id so rows are locked in the same order by every caller."""
+    merged = {}
+    for product_id, price, stock in updates:
+        current_price, current_stock = merged.get(product_id, (None, None))
+        if price is not None:
+            # Rounded as MySQL stores it, so an unchanged price compares equal.
+            current_price = Decimal(price).quantize(PRICE_STEP, rounding=ROUND_HALF_UP)
+        merged[product_id] = (current_price, stock if stock is not None else current_stock)
+    return dict(sorted(merged.items()))
+
+
+def build_bulk_lock_query(product_ids):
+    placeholders = ", ".join(["%s"] * len(product_ids))
+    return f"SELECT id, price, stock FROM products WHERE id IN ({placeholders}) FOR UPDATE", tuple(product_ids)
+
+
+def bulk_changes(updates: dict, rows):
+    """The updates that change something, as {id: {column: value}}."""
+    changes = {}
+    for row in rows:
+        price, stock = updates[row['id']]
+        change = {}
+        if price is not None and price != row['price']:
+            change['price'] = price
+        if stock is not None and stock != row['stock']:
+            change['stock'] = stock
+        if change:
+            changes[row['id']] = change
+    return dict(sorted(changes.items()))
+
+
+def build_bulk_update_query(changes: dict):
+    """One UPDATE for many products: a CASE per column, rows not setting
+    that column keep their value."""
+    assignments, params = [], []
+    for column in ("price", "stock"):
+        ids = [product_id for product_id, change in changes.items() if column in change]
+        if not ids:
+            continue
+        assignments.append(f"{column} = CASE id {' '.join(['WHEN %s THEN %s'] * len(ids))} ELSE {column} END")
+        params.extend(value for product_id in ids for value in (product_id, changes[product_id][column]))
+    assignments.append("version = version + 1")
+    placeholders = ", ".join(["%s"] * len(changes))
+    query = f"UPDATE products SET {', '.join(assignments)} WHERE id IN ({placeholders})"
+    return query, tuple(params) + tuple(changes)
+
+
+def bulk_update_products(db_conn, updates, chunk_size: int = PRODUCT_BULK_CHUNK_SIZE):
+    """Apply (id, price, stock) updates, None meaning "leave as is", in one
+    transaction. Returns (ids changed, ids not found).
+
+    Per chunk of ids: one locking read to find the rows that exist and
+    actually change, and one CASE update of those. Only the changed
+    products get a new version and have their cached responses dropped.
+    """
+    db, cursor = db_conn
+    merged = merge_bulk_updates(updates)
+    product_ids = list(merged)
+    changed, repriced, missing = [], [], []
+    try:
+        for start in range(0, len(product_ids), chunk_size):
+            chunk = product_ids[start:start + chunk_size]
+            cursor.execute(*build_bulk_lock_query(chunk))
+            rows = cursor.fetchall()
+            found = {row['id'] for row in rows}
+            missing.extend(product_id for product_id in chunk if product_id not in found)
+            changes = bulk_changes(merged, rows)
+            if changes:
+                cursor.execute(*build_bulk_update_query(changes))
+                changed.extend(changes)
+                repriced.extend(product_id for product_id, change in changes.items() if 'price' in change)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    if changed:
+        invalidate_product_caches(changed)
+        # Prices are part of the search index.
+        for start in range(0, len(repriced), chunk_size):
+            chunk = repriced[start:start + chunk_size]
+            reindex_products(db_conn, f"p.id IN ({', '.join(['%s'] * len(chunk))})", tuple(chunk))
+    return changed, missing
 
 
 def delete_product(db_conn, product_id: int):
     db, cursor = db_conn
     cursor.execute("DELETE FROM products WHERE id=%s", (product_id,))
     db.commit()
+    invalidate_product_caches([product_id])
+    unindex_product(product_id)
     return cursor.rowcount
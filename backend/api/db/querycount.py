@@ -0,0 +1,82 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+
+# Set per request by the query-count middleware (or query_counter() in tests).
+# Sync dependencies run in a worker thread with a copy of the context, which
+# still shares the same QueryCounter object.
+_current = ContextVar("query_counter", default=None)
+
+_totals_lock = threading.Lock()
+_totals = {"requests": 0, "queries": 0, "max_per_request": 0}
+
+
+def _record():
+    counter = _current.get()
+    if counter is not None:
+        counter.count += 1
+
+
+@contextmanager
+def query_counter():
+    """Count the statements executed through counted cursors in this block."""
+    counter = QueryCounter()
+    token = _current.set(counter)
+    try:
+        yield counter
+    finally:
+        _current.reset(token)
+
+
+def record_request(count: int):
+    with _totals_lock:
+        _totals["requests"] += 1
+        _totals["queries"] += count
+        _totals["max_per_request"] = max(_totals["max_per_request"], count)
+
+
+def query_stats():
+    with _totals_lock:
+        stats = dict(_totals)
+    stats["avg_per_request"] = round(stats["queries"] / stats["requests"], 3) if stats["requests"] else 0.0
+    return stats
+
+
+class CountingCursor:
+    """Cursor proxy that counts execute()/executemany() calls."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        _record()
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        _record()
+        return self._cursor.executemany(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class AsyncCountingCursor(CountingCursor):
+    async def execute(self, *args, **kwargs):
+        _record()
+        return await self._cursor.execute(*args, **kwargs)
+
+    async def executemany(self, *args, **kwargs):
+        _record()
+        return await self._cursor.executemany(*args, **kwargs)
+
+    def __aiter__(self):
+        return self._cursor.__aiter__()
@@ -0,0 +1,92 @@
+import threading
+import time
+
+REPLICA_STATUS_QUERIES = ("SHOW REPLICA STATUS", "SHOW SLAVE STATUS")
+
+
+def parse_replica_lag(row):
+    """Seconds behind the primary from a SHOW REPLICA STATUS row.
+
+    No row means the server is not replicating (e.g. a stand-in), which we
+    treat as caught up. A NULL lag means replication is stopped.
+    """
+    if row is None:
+        return 0.0
+    for key in ("Seconds_Behind_Source", "Seconds_Behind_Master"):
+        if key in row:
+            value = row[key]
+            return None if value is None else float(value)
+    return 0.0
+
+
+class ReplicaMonitor:
+    """Tracks whether the read replica may serve reads.
+
+    The replica is skipped for ``retry_after`` seconds after a connection
+    failure, and while its last measured lag exceeds ``max_lag``. Lag is
+    re-measured at most every ``check_interval`` seconds.
+    """
+
+    def __init__(self, max_lag: float, check_interval: float, retry_after: float):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.retry_after = retry_after
+
+        self._lock = threading.Lock()
+        self._lag = 0.0
+        self._checked_at = None
+        self._down_until = 0.0
+        self._replica_reads = 0
+        self._fallbacks = 0
+        self._failures = 0
+
+    def available(self):
+        with self._lock:
+            if time.monotonic() < self._down_until:
+                return False
+            # A lagging replica gets re-measured once its check is due.
+            return self._lag_ok() or self._check_due()
+
+    def needs_check(self):
+        with self._lock:
+            return self._check_due()
+
+    def usable(self):
+        """Whether the most recent measurement allows reading from the replica."""
+        with self._lock:
+            return time.monotonic() >= self._down_until and self._lag_ok()
+
+    def _lag_ok(self):
+        return self._lag is not None and self._lag <= self.max_lag
+
+    def _check_due(self):
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.check_interval
+
+    def record_lag(self, lag):
+        with self._lock:
+            self._lag = lag
+            self._checked_at = time.monotonic()
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._down_until = time.monotonic() + self.retry_after
+            # Force a fresh lag measurement once the replica is retried.
+            self._checked_at = None
+
+    def record_read(self, replica: bool):
+        with self._lock:
+            if replica:
+                self._replica_reads += 1
+            else:
+                self._fallbacks += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "lag": self._lag,
+                "down": time.monotonic() < self._down_until,
+                "replica_reads": self._replica_reads,
+                "fallbacks": self._fallbacks,
+                "failures": self._failures,
+            }
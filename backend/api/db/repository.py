@@ -1,5 +1,22 @@
+from api.core import metrics
+from api.core.cache import TTLCache
+from api.core.config import USER_CACHE_TTL, USER_CACHE_SIZE, TOKEN_VERSIONS_REFRESH_SECONDS
+from api.core.revocation import TokenVersions
 
+# Everything but the password hash; used wherever a user record is handed
+# back to a route.
+USER_PUBLIC_COLUMNS = "id, email, full_name, role, is_active, created_at"
 
+# Authenticated users by email (the token subject), without the password.
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+metrics.register("user_cache", user_cache.stats)
+
+# Stop trusting token claims if the map has not been reloaded for a few
+# refresh intervals (e.g. the database is unreachable).
+token_versions = TokenVersions(max_age=3 * TOKEN_VERSIONS_REFRESH_SECONDS)
+metrics.register("token_versions", token_versions.stats)
+
+TOKEN_VERSIONS_QUERY = "SELECT id, token_version FROM users WHERE token_version > 0"
 
 def get_user_by_email(db_conn, email: str):
     db, cursor = db_conn
@@ -7,6 +24,41 @@ def get_user_by_email(db_conn, email: str):
     return cursor.fetchone()
 
 
+def get_cached_user(email: str):
+    # A copy, so callers can modify it freely.
+    user = user_cache.get(email)
+    return dict(user) if user is not None else None
+
+
+def get_auth_user(db_conn, email: str):
+    """The user a token belongs to, served from user_cache when possible."""
+    user = get_cached_user(email)
+    if user is None:
+        db, cursor = db_conn
+        cursor.execute(f"SELECT {USER_PUBLIC_COLUMNS} FROM users WHERE email=%s", (email,))
+        user = cursor.fetchone()
+        if user is None:
+            return None
+        user_cache.set(email, user)
+        user = dict(user)
+    return user
+
+
+def invalidate_user(db_conn, user_id: int):
+    db, cursor = db_conn
+    cursor.execute("SELECT email, token_version FROM users WHERE id = %s", (user_id,))
+    row = cursor.fetchone()
+    if row:
+        user_cache.invalidate(row['email'])
+        token_versions.bump(user_id, row['token_version'])
+
+
+def load_token_versions(db_conn):
+    db, cursor = db_conn
+    cursor.execute(TOKEN_VERSIONS_QUERY)
+    token_versions.load(cursor.fetchall())
+
+
 def create_user(db_conn, email: str, password: str, full_name: str = None):
     db, cursor = db_conn
     cursor.execute(
@@ -17,21 +69,40 @@ def create_user(db_conn, email: str, password: str, full_name: str = None):
     return cursor.lastrowid
 
 
+def update_user_password(db_conn, user_id: int, password: str):
+    db, cursor = db_conn
+    cursor.execute("UPDATE users SET password = %s WHERE id = %s", (password, user_id))
+    db.commit()
+
+
 def get_all_users(db_conn, search_query: str = None):
     db, cursor = db_conn
     if search_query:
         search_param = f"%{search_query}%"
         cursor.execute(
-            "SELECT id, email, full_name, role, is_active, created_at FROM users WHERE email LIKE %s OR full_name LIKE %s", 
+            f"SELECT {USER_PUBLIC_COLUMNS} FROM users WHERE email LIKE %s OR full_name LIKE %s", 
             (search_param, search_param)
         )
     else:
-        cursor.execute("SELECT id, email, full_name, role, is_active, created_at FROM users")
+        cursor.execute(f"SELECT {USER_PUBLIC_COLUMNS} FROM users")
     return cursor.fetchall()
 
 
 def update_user_role(db_conn, user_id: int, role: str):
     db, cursor = db_conn
-    cursor.execute("UPDATE users SET role = %s WHERE id = %s", (role, user_id))
+    cursor.execute("UPDATE users SET role = %s, token_version = token_version + 1 WHERE id = %s", (role, user_id))
+    db.commit()
+    updated = cursor.rowcount > 0
+    if updated:
+        invalidate_user(db_conn, user_id)
+    return updated
+
+
+def set_user_active(db_conn, user_id: int, is_active: bool):
+    db, cursor = db_conn
+    cursor.execute("UPDATE users SET is_active = %s, token_version = token_version + 1 WHERE id = %s", (is_active, user_id))
     db.commit()
-    return cursor.rowcount > 0
\ No newline at end of file
+    updated = cursor.rowcount > 0
+    if updated:
+        invalidate_user(db_conn, user_id)
+    return updated
\ No newline at end of file
@@ -1,15 +1,40 @@
+from contextlib import contextmanager
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from api.core.config import SECRET_KEY, ALGORITHM
+from api.core.config import SECRET_KEY, ALGORITHM, STATELESS_TOKENS
 from api.db.conn import get_db
-from api.db.repository import get_user_by_email
+from api.db.repository import get_auth_user, get_cached_user, token_versions
 
 from fastapi import Request
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
 
-def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: tuple = Depends(get_db)):
+# Opened only on a user cache miss, so requests authorized from the token
+# or the cache never check out a connection for it.
+auth_db = contextmanager(get_db)
+
+
+def user_from_claims(payload: dict):
+    """The user described by a stateless access token, or None when the
+    claims cannot be trusted and the database must be asked instead."""
+    if not STATELESS_TOKENS:
+        return None
+    user_id, role, version = payload.get("uid"), payload.get("role"), payload.get("ver")
+    if user_id is None or role is None or version is None:
+        return None  # issued before STATELESS_TOKENS was turned on
+    if not token_versions.fresh() or not token_versions.is_current(user_id, version):
+        return None
+    return {
+        "id": user_id,
+        "email": payload["sub"],
+        "full_name": payload.get("name"),
+        "role": role,
+        "is_active": True,
+    }
+
+
+def get_current_user(request: Request, token: str = Depends(oauth2_scheme)):
     # Try getting token from cookie if not in header
     if not token:
         cookie_authorization = request.cookies.get("access_token")
@@ -29,10 +54,19 @@ def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db:
         email = payload.get("sub")
         if email is None:
             raise HTTPException(401, "Invalid token")
+
+        user = user_from_claims(payload)
+        if user is not None:
+            return user
         
-        user = get_user_by_email(db, email)
+        user = get_cached_user(email)
+        if user is None:
+            with auth_db() as db:
+                user = get_auth_user(db, email)
         if user is None:
             raise HTTPException(401, "User not found")
+        if not user["is_active"]:
+            raise HTTPException(403, "User is deactivated")
             
         return user
     except JWTError:
@@ -42,6 +76,3 @@ def get_current_admin_user(current_user: dict = Depends(get_current_user)):
     if current_user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="The user doesn't have enough privileges")
     return current_user
-
-
-
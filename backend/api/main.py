@@ -1,13 +1,132 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 from api.core.limiter import limiter
-from api.routers import auth, user, categories, products, cart, orders, reviews
+from api.core.config import SEARCH_INDEX_ENABLED, SEARCH_INDEX_REFRESH_SECONDS, QUERY_COUNT_HEADER, STATELESS_TOKENS, TOKEN_VERSIONS_REFRESH_SECONDS, RESPONSE_CACHE_MAX_ENTRY_BYTES, ORDER_RESERVATION_MINUTES, ORDER_RESERVATION_SWEEP_SECONDS
+from api.core.search_index import product_index
+from api.core import metrics as metrics_registry
+from api.core.hashing import password_hasher
+from api.core.response_cache import response_cache, ResponseCacheMiddleware
+from api.db.conn import close_pool, pooled_connection
+from api.db.aio.conn import close_async_pool
+from api.db.querycount import query_counter, record_request, query_stats
+from api.db.orders import release_expired_reservations
+from api.db.products import load_product_index
+from api.db.repository import load_token_versions
+from api.routers import auth, user, categories, products, cart, orders, reviews, metrics
 
 
-api = FastAPI()
+logger = logging.getLogger(__name__)
+
+metrics_registry.register("search_index", product_index.stats)
+metrics_registry.register("queries", query_stats)
+metrics_registry.register("response_cache", response_cache.stats)
+
+# GET routes served by the response cache: route path -> (ttl seconds,
+# surrogate tags, per_user). "product:*" marks responses built from the
+# whole product collection; product responses embed their category's name,
+# hence "category:*" on them too. Ids are matched as :int so literal routes
+# next to them (e.g. the admin-only /products/export) are never cached.
+RESPONSE_CACHE_RULES = {
+    "/products/": (30, ["product:*", "category:*"], False),
+    "/products/paginated": (30, ["product:*", "category:*"], False),
+    "/products/search": (30, ["product:*", "category:*"], False),
+    "/products/{product_id:int}": (120, ["product:{product_id}", "category:*"], False),
+    "/categories/": (300, ["category:*"], False),
+    "/categories/paginated": (300, ["category:*"], False),
+    "/categories/{category_id:int}": (300, ["category:{category_id}"], False),
+    "/reviews/product/{product_id:int}": (60, ["product:{product_id}"], False),
+    "/reviews/product/{product_id:int}/stats": (60, ["product:{product_id}"], False),
+}
+
+
+def build_search_index():
+    try:
+        with pooled_connection() as db:
+            cursor = db.cursor(dictionary=True)
+            try:
+                load_product_index((db, cursor))
+            finally:
+                cursor.close()
+    except Exception:
+        logger.exception("Building the product search index failed")
+
+
+async def refresh_search_index():
+    # Until the first build finishes, /products/search answers from MySQL.
+    while True:
+        await asyncio.to_thread(build_search_index)
+        if SEARCH_INDEX_REFRESH_SECONDS <= 0:
+            break
+        await asyncio.sleep(SEARCH_INDEX_REFRESH_SECONDS)
+
+
+def reload_token_versions():
+    try:
+        with pooled_connection() as db:
+            cursor = db.cursor(dictionary=True)
+            try:
+                load_token_versions((db, cursor))
+            finally:
+                cursor.close()
+    except Exception:
+        logger.exception("Loading token versions failed")
+
+
+async def refresh_token_versions():
+    # While the versions are stale, get_current_user looks users up in MySQL.
+    while True:
+        await asyncio.to_thread(reload_token_versions)
+        await asyncio.sleep(TOKEN_VERSIONS_REFRESH_SECONDS)
+
+
+def cancel_expired_orders():
+    try:
+        with pooled_connection() as db:
+            cursor = db.cursor(dictionary=True)
+            try:
+                cancelled = release_expired_reservations((db, cursor))
+            finally:
+                cursor.close()
+        if cancelled:
+            logger.info("Cancelled %d unpaid orders past their reservation", len(cancelled))
+    except Exception:
+        logger.exception("Releasing expired stock reservations failed")
+
+
+async def expire_reservations():
+    while True:
+        await asyncio.to_thread(cancel_expired_orders)
+        await asyncio.sleep(ORDER_RESERVATION_SWEEP_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = []
+    if SEARCH_INDEX_ENABLED:
+        tasks.append(asyncio.create_task(refresh_search_index()))
+    if STATELESS_TOKENS:
+        tasks.append(asyncio.create_task(refresh_token_versions()))
+    if ORDER_RESERVATION_MINUTES > 0 and ORDER_RESERVATION_SWEEP_SECONDS > 0:
+        tasks.append(asyncio.create_task(expire_reservations()))
+    yield
+    for task in tasks:
+        task.cancel()
+    password_hasher.shutdown()
+    await close_async_pool()
+    close_pool()
+
+
+api = FastAPI(lifespan=lifespan)
+
+# Added first so it sits inside CORS: cached responses never carry another
+# origin's CORS headers.
+api.add_middleware(ResponseCacheMiddleware, cache=response_cache, rules=RESPONSE_CACHE_RULES, max_entry_bytes=RESPONSE_CACHE_MAX_ENTRY_BYTES)
 
 origins = [
     "http://localhost:5173",
@@ -22,6 +141,7 @@ api.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Prev-Cursor", "X-Cache"],
 )
 
 
@@ -39,6 +159,15 @@ async def add_security_headers(request, call_next):
     response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
     return response
 
+@api.middleware("http")
+async def count_queries(request, call_next):
+    with query_counter() as counter:
+        response = await call_next(request)
+    record_request(counter.count)
+    if QUERY_COUNT_HEADER:
+        response.headers["X-Query-Count"] = str(counter.count)
+    return response
+
 
 api.include_router(auth.router, prefix="/auth", tags=["Auth"])
 api.include_router(user.router, prefix="/users", tags=["Users"])
@@ -46,4 +175,5 @@ api.include_router(categories.router, prefix="/categories", tags=["Categories"])
 api.include_router(products.router, prefix="/products", tags=["Products"])
 api.include_router(cart.router, prefix="/cart", tags=["Cart"])
 api.include_router(orders.router, prefix="/orders", tags=["Orders"])
-api.include_router(reviews.router, prefix="/reviews", tags=["Reviews"])
\ No newline at end of file
+api.include_router(reviews.router, prefix="/reviews", tags=["Reviews"])
+api.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
\ No newline at end of file
@@ -1,11 +1,14 @@
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import OAuth2PasswordRequestForm
 from api.schemas.user import UserCreate
-from api.db.repository import get_user_by_email, create_user
+from api.db.repository import get_user_by_email
+from api.db.aio import repository as repository_aio
 from api.db.conn import get_db
-from api.core.security import hash_password, verify_password, create_access_token, create_refresh_token
+from api.db.aio.conn import get_async_db
+from api.core.security import hash_password, verify_and_update_password, create_access_token, create_refresh_token, access_token_claims
+from api.core.hashing import password_hasher, HashPoolBusy
 from api.core.limiter import limiter
-from api.core.config import SECRET_KEY, ALGORITHM
+from api.core.config import SECRET_KEY, ALGORITHM, PASSWORD_HASH_RETRY_AFTER
 from jose import jwt, JWTError
 from fastapi import Request, Header, Response
 
@@ -13,24 +16,40 @@ from fastapi import Request, Header, Response
 router = APIRouter()
 
 
+async def run_password_hasher(fn, *args):
+    # Argon2 runs in its own process pool; when that is saturated, shed the
+    # request rather than queue it behind everything else.
+    try:
+        return await password_hasher.run(fn, *args)
+    except HashPoolBusy:
+        raise HTTPException(503, "Server busy, please retry", headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)})
+
+
 @router.post("/register")
 @limiter.limit("5/minute")
-def register(user: UserCreate, request: Request, db: tuple = Depends(get_db)):
-    existed = get_user_by_email(db, user.email)
+async def register(user: UserCreate, request: Request, db: tuple = Depends(get_async_db)):
+    existed = await repository_aio.get_user_by_email(db, user.email)
     if existed:
         raise HTTPException(400, "Email already registered")
-    create_user(db, user.email, hash_password(user.password), user.full_name)
+    hashed = await run_password_hasher(hash_password, user.password)
+    await repository_aio.create_user(db, user.email, hashed, user.full_name)
     return {"message": "User created"}
 
 
 @router.post("/login")
 @limiter.limit("5/minute")
-def login(request: Request, response: Response, form: OAuth2PasswordRequestForm = Depends(), db: tuple = Depends(get_db)):
-    user = get_user_by_email(db, form.username)
-    if not user or not verify_password(form.password, user["password"]):
+async def login(request: Request, response: Response, form: OAuth2PasswordRequestForm = Depends(), db: tuple = Depends(get_async_db)):
+    user = await repository_aio.get_user_by_email(db, form.username)
+    if not user:
         raise HTTPException(400, "Invalid credentials")
+    valid, new_hash = await run_password_hasher(verify_and_update_password, form.password, user["password"])
+    if not valid:
+        raise HTTPException(400, "Invalid credentials")
+    if new_hash:
+        # Stored with other Argon2 parameters than configured now.
+        await repository_aio.update_user_password(db, user["id"], new_hash)
     
-    access_token = create_access_token({"sub": user["email"]})
+    access_token = create_access_token(access_token_claims(user))
     refresh_token = create_refresh_token({"sub": user["email"]})
     
     # Set HttpOnly Cookies
@@ -55,7 +74,7 @@ def login(request: Request, response: Response, form: OAuth2PasswordRequestForm
 
 
 @router.post("/refresh")
-def refresh_token(response: Response, request: Request):
+def refresh_token(response: Response, request: Request, db: tuple = Depends(get_db)):
     token = request.cookies.get("refresh_token")
     if not token:
          raise HTTPException(401, "Refresh token missing")
@@ -67,8 +86,13 @@ def refresh_token(response: Response, request: Request):
              raise HTTPException(401, "Invalid token")
     except JWTError:
         raise HTTPException(401, "Invalid token")
+
+    # Re-read the user so the new token carries the current role and version.
+    user = get_user_by_email(db, email)
+    if user is None or not user["is_active"]:
+        raise HTTPException(401, "Invalid token")
         
-    new_access_token = create_access_token({"sub": email})
+    new_access_token = create_access_token(access_token_claims(user))
     
     response.set_cookie(
         key="access_token", 
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from typing import List
 from api.db.conn import get_db
 from api.dependencies import get_current_user
-from api.schemas.cart import CartResponse, CartItemCreate
+from api.schemas.cart import CartResponse, CartItemCreate, CartBatchUpdate
 from api.db import cart as cart_db
 
 router = APIRouter()
@@ -19,7 +19,25 @@ def add_item_to_cart(
     db=Depends(get_db)
 ):
     user_id = current_user['id']
-    return cart_db.add_to_cart(db, user_id, item.product_id, item.quantity)
+    try:
+        return cart_db.add_to_cart(db, user_id, item.product_id, item.quantity)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.post("/items:batch", response_model=CartResponse)
+def update_cart_items(
+    batch: CartBatchUpdate,
+    current_user: dict = Depends(get_current_user),
+    db=Depends(get_db)
+):
+    # E.g. merging a guest cart after login: one transaction and one cart
+    # read instead of a POST /cart/items per product.
+    user_id = current_user['id']
+    operations = [(op.product_id, op.quantity, op.delta) for op in batch.items]
+    try:
+        return cart_db.update_cart_items(db, user_id, operations)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
 @router.delete("/items/{item_id}", response_model=CartResponse)
 def remove_item_from_cart(
@@ -1,37 +1,79 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from typing import List
 from api.schemas.category import CategoryCreate, CategoryResponse, PaginatedCategoryResponse
-from api.db.categories import get_all_categories, get_category_by_id, create_category, update_category, delete_category, count_categories
+from api.db.categories import get_category_by_id, create_category, update_category, delete_category, CATEGORY_SORT_COLUMNS, categories_etag_for_rows
+from api.db.pagination import parse_sort, decode_cursor, page_cursors
+from api.db.counts import category_counts, resolve_count_strategy, count_with_strategy
 from api.db.conn import get_db
+from api.db.aio.conn import get_async_read_db
+from api.db.aio import categories as categories_aio
 from api.core.limiter import limiter
+from api.core.etag import etag_matches, not_modified, set_etag
+from api.core.config import MAX_PAGE_SIZE
 
 router = APIRouter()
 
 @router.get("/", response_model=List[CategoryResponse])
-def list_categories(request: Request, db=Depends(get_db), q: str = None):
-    return get_all_categories(db, search_query=q)
+async def list_categories(request: Request, response: Response, db=Depends(get_async_read_db), q: str = None):
+    # Revalidating a cached copy costs one aggregate instead of the listing.
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        etag = await categories_aio.get_categories_etag(db, search_query=q)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+    categories = await categories_aio.get_all_categories(db, search_query=q)
+    set_etag(response, categories_etag_for_rows(categories))
+    return categories
 
 @router.get("/paginated", response_model=PaginatedCategoryResponse)
-def list_categories_paginated(
+async def list_categories_paginated(
     request: Request, 
-    db=Depends(get_db),
+    db=Depends(get_async_read_db),
     q: str = None,
     page: int = 1,
-    size: int = 10
+    size: int = 10,
+    sort: str = "id",
+    cursor: str = None,
+    count: str = None,
+    include_total: bool = True
 ):
-    offset = (page - 1) * size
-    items = get_all_categories(db, search_query=q, limit=size, offset=offset)
-    total = count_categories(db, search_query=q)
+    # Page/size mode uses OFFSET; passing a next_cursor/prev_cursor from a
+    # previous response switches to keyset pagination on (sort key, id).
+    if not 1 <= size <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"size must be between 1 and {MAX_PAGE_SIZE}")
+    if page < 1:
+        raise HTTPException(status_code=400, detail="page must be at least 1")
+    try:
+        key, _, _ = parse_sort(sort, CATEGORY_SORT_COLUMNS)
+        seek, backwards = decode_cursor(cursor, sort) if cursor else (None, False)
+        strategy = resolve_count_strategy(count, include_total)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    offset = None if cursor else (page - 1) * size
+    rows = await categories_aio.get_all_categories(db, search_query=q, limit=size + 1, offset=offset, sort=sort, seek=seek, backwards=backwards)
+    items, next_cursor, prev_cursor = page_cursors(rows, size, sort, key, backwards, has_previous=bool(cursor) or page > 1)
+    total, estimated = await count_with_strategy(
+        strategy,
+        category_counts,
+        (q or None,),
+        exact=lambda: categories_aio.count_categories(db, search_query=q),
+        estimate=lambda: categories_aio.estimate_categories(db)
+    )
     
     import math
-    pages = math.ceil(total / size) if size > 0 else 0
+    pages = (math.ceil(total / size) if size > 0 else 0) if total is not None else None
     
     return {
         "items": items,
         "total": total,
-        "page": page,
+        "total_estimated": estimated,
+        "page": None if cursor else page,
         "size": size,
-        "pages": pages
+        "pages": pages,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor
     }
 
 from api.dependencies import get_current_admin_user
@@ -48,8 +90,8 @@ def create_new_category(
     return get_category_by_id(db, category_id)
 
 @router.get("/{category_id}", response_model=CategoryResponse)
-def get_category(category_id: int, request: Request, db=Depends(get_db)):
-    category = get_category_by_id(db, category_id)
+async def get_category(category_id: int, request: Request, db=Depends(get_async_read_db)):
+    category = await categories_aio.get_category_by_id(db, category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     return category
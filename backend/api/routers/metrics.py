@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Depends
+from api.core import metrics
+from api.dependencies import get_current_admin_user
+
+router = APIRouter()
+
+
+@router.get("/")
+def get_metrics(admin: dict = Depends(get_current_admin_user)):
+    """Internal counters (connection pool, caches, ...) (Admin only)"""
+    return metrics.snapshot()
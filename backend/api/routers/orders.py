@@ -1,6 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from typing import List
-from api.db.conn import get_db
+from api.core.config import EXPORT_CHUNK_SIZE, MAX_PAGE_SIZE
+from api.core.export import EXPORT_MEDIA_TYPES, stream_export
+from api.db.conn import get_db, streaming_cursor
+from api.db.pagination import decode_cursor, page_cursors
 from api.dependencies import get_current_user
 from api.schemas.order import OrderCreate, OrderResponse
 from api.db import orders as orders_db
@@ -40,20 +45,80 @@ from pydantic import BaseModel
 class OrderStatusUpdate(BaseModel):
     status: str
 
+def _check_order_filters(status: str = None):
+    if status is not None and status not in orders_db.ORDER_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Unknown status '{status}'. Allowed: {', '.join(orders_db.ORDER_STATUSES)}")
+
 @router.get("/admin/all", response_model=List[OrderResponse])
 def list_all_orders(
+    response: Response,
     q: str = None,
+    status: str = None,
+    created_from: datetime = None,
+    created_to: datetime = None,
+    size: int = None,
+    cursor: str = None,
     admin: dict = Depends(get_current_admin_user), 
     db=Depends(get_db)
 ):
-    return orders_db.get_all_orders(db, search_query=q)
+    # Without size or cursor every matching order is returned, as before.
+    # With them the list is one keyset page and the neighbouring pages are
+    # linked through the X-Next-Cursor / X-Prev-Cursor headers.
+    _check_order_filters(status)
+    if size is None and cursor is None:
+        return orders_db.get_all_orders(db, search_query=q, status=status, created_from=created_from, created_to=created_to)
+
+    size = size or 50
+    if not 1 <= size <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"size must be between 1 and {MAX_PAGE_SIZE}")
+    try:
+        seek, backwards = decode_cursor(cursor, orders_db.ORDER_SORT) if cursor else (None, False)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    rows = orders_db.get_all_orders(db, search_query=q, status=status, created_from=created_from, created_to=created_to, limit=size + 1, seek=seek, backwards=backwards)
+    items, next_cursor, prev_cursor = page_cursors(list(rows), size, orders_db.ORDER_SORT, "created_at", backwards, has_previous=bool(cursor))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if prev_cursor:
+        response.headers["X-Prev-Cursor"] = prev_cursor
+    return items
+
+@router.get("/admin/export")
+def export_orders(
+    format: str = "ndjson",
+    q: str = None,
+    status: str = None,
+    created_from: datetime = None,
+    created_to: datetime = None,
+    admin: dict = Depends(get_current_admin_user)
+):
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}'. Allowed: {', '.join(EXPORT_MEDIA_TYPES)}")
+    _check_order_filters(status)
+
+    def chunks():
+        # The connection is held only while the response is being streamed.
+        with streaming_cursor() as conn:
+            yield from orders_db.iter_orders_export(conn, search_query=q, status=status, created_from=created_from, created_to=created_to, chunk_size=EXPORT_CHUNK_SIZE)
+
+    return StreamingResponse(
+        stream_export(chunks(), format, orders_db.ORDER_EXPORT_CSV_FIELDS, orders_db.flatten_export_order),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="orders.{format}"'}
+    )
 
 @router.get("/admin/stats")
 def get_stats(
+    days: int = 30,
     admin: dict = Depends(get_current_admin_user),
     db=Depends(get_db)
 ):
-    return orders_db.get_order_stats(db)
+    # Sums the maintained counters: at most statuses x ORDER_TOTALS_SLOTS
+    # and days x ORDER_TOTALS_SLOTS rows, whatever the number of orders.
+    if not 1 <= days <= 366:
+        raise HTTPException(status_code=400, detail="days must be between 1 and 366")
+    return orders_db.get_order_stats(db, days)
 
 @router.put("/{order_id}/status", response_model=OrderResponse)
 def update_order_status(
@@ -62,7 +127,11 @@ def update_order_status(
     admin: dict = Depends(get_current_admin_user),
     db=Depends(get_db)
 ):
-    order = orders_db.update_order_status(db, order_id, status_update.status)
+    _check_order_filters(status_update.status)
+    try:
+        order = orders_db.update_order_status(db, order_id, status_update.status)
+    except orders_db.OrderStatusConflict as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
@@ -82,7 +151,11 @@ def pay_order(order_id: int, current_user: dict = Depends(get_current_user), db=
         
     # 3. Simulate payment success -> update status
     # In real world, here we would verify with Stripe/Midtrans
-    return orders_db.update_order_status(db, order_id, 'processing')
+    # Re-checked under the row lock: the order may have expired meanwhile.
+    try:
+        return orders_db.update_order_status(db, order_id, 'processing', from_statuses=('pending',))
+    except orders_db.OrderStatusConflict:
+        raise HTTPException(status_code=400, detail="Order is already paid or cancelled")
 
 @router.post("/{order_id}/receive", response_model=OrderResponse)
 def receive_order(order_id: int, current_user: dict = Depends(get_current_user), db=Depends(get_db)):
@@ -98,7 +171,10 @@ def receive_order(order_id: int, current_user: dict = Depends(get_current_user),
         raise HTTPException(status_code=400, detail="Order must be shipped before it can be received")
         
     # 3. Update status to completed
-    return orders_db.update_order_status(db, order_id, 'completed')
+    try:
+        return orders_db.update_order_status(db, order_id, 'completed', from_statuses=('shipped',))
+    except orders_db.OrderStatusConflict:
+        raise HTTPException(status_code=400, detail="Order must be shipped before it can be received")
 
 @router.post("/{order_id}/cancel", response_model=OrderResponse)
 def cancel_order(order_id: int, current_user: dict = Depends(get_current_user), db=Depends(get_db)):
@@ -114,16 +190,13 @@ def cancel_order(order_id: int, current_user: dict = Depends(get_current_user),
         raise HTTPException(status_code=403, detail="Not authorized")
     
     # 2. Check status based on role
-    allowed = False
-    if is_admin:
-        if order['status'] in ['pending', 'processing']:
-            allowed = True
-    elif is_owner:
-        if order['status'] == 'pending':
-            allowed = True
-            
-    if not allowed:
+    allowed_statuses = ('pending', 'processing') if is_admin else ('pending',)
+    if order['status'] not in allowed_statuses:
         raise HTTPException(status_code=400, detail=f"Cannot cancel order in status '{order['status']}'")
         
-    # 3. Update status to cancelled
-    return orders_db.update_order_status(db, order_id, 'cancelled')
+    # 3. Update status to cancelled; the reserved stock goes back on sale.
+    # The status is checked again under the row lock.
+    try:
+        return orders_db.update_order_status(db, order_id, 'cancelled', from_statuses=allowed_statuses)
+    except orders_db.OrderStatusConflict as e:
+        raise HTTPException(status_code=400, detail=str(e))
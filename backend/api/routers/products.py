@@ -1,37 +1,111 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from typing import List
-from api.schemas.product import ProductCreate, ProductResponse, PaginatedProductResponse
-from api.db.products import get_all_products, get_product_by_id, create_product, update_product, delete_product, count_products
-from api.db.conn import get_db
+from api.schemas.product import ProductCreate, ProductResponse, PaginatedProductResponse, ProductBulkUpdate, ProductBulkUpdateResult
+from api.db.products import get_product_by_id, create_product, update_product, delete_product, PRODUCT_SORT_COLUMNS, default_product_sort, product_etag, PRODUCT_EXPORT_FIELDS, iter_products_export, bulk_update_products
+from api.db.pagination import parse_sort, decode_cursor, page_cursors
+from api.db.counts import product_counts, resolve_count_strategy, count_with_strategy
+from api.db.conn import get_db, pooled_connection, streaming_cursor
+from api.db.product_import import import_products
+from api.db.querycount import CountingCursor
+from api.db.aio.conn import get_async_read_db
+from api.db.aio import products as products_aio
 from api.core.limiter import limiter
+from api.core.search_index import product_index
+from api.core.config import EXPORT_CHUNK_SIZE, MAX_PAGE_SIZE
+from api.core.etag import etag_matches, not_modified, set_etag
+from api.core.export import EXPORT_MEDIA_TYPES, stream_export
+from api.core.imports import IMPORT_FORMATS, iter_lines, iter_records, iter_sync
 
 router = APIRouter()
 
 @router.get("/", response_model=List[ProductResponse])
-def list_products(
+async def list_products(
     request: Request, 
-    db=Depends(get_db),
+    db=Depends(get_async_read_db),
     q: str = None,
     min_price: float = None,
     max_price: float = None,
     category_id: int = None
 ):
-    return get_all_products(db, search_query=q, min_price=min_price, max_price=max_price, category_id=category_id)
+    return await products_aio.get_all_products(db, search_query=q, min_price=min_price, max_price=max_price, category_id=category_id, sort=default_product_sort(q))
 
 @router.get("/paginated", response_model=PaginatedProductResponse)
-def list_products_paginated(
+async def list_products_paginated(
     request: Request, 
-    db=Depends(get_db),
+    db=Depends(get_async_read_db),
     q: str = None,
     min_price: float = None,
     max_price: float = None,
     category_id: int = None,
     page: int = 1,
+    size: int = 10,
+    sort: str = None,
+    cursor: str = None,
+    count: str = None,
+    include_total: bool = True
+):
+    # Page/size mode uses OFFSET; passing a next_cursor/prev_cursor from a
+    # previous response switches to keyset pagination on (sort key, id).
+    if not 1 <= size <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"size must be between 1 and {MAX_PAGE_SIZE}")
+    if page < 1:
+        raise HTTPException(status_code=400, detail="page must be at least 1")
+    sort = sort or default_product_sort(q)
+    try:
+        key, _, _ = parse_sort(sort, PRODUCT_SORT_COLUMNS)
+        seek, backwards = decode_cursor(cursor, sort) if cursor else (None, False)
+        strategy = resolve_count_strategy(count, include_total)
+        offset = None if cursor else (page - 1) * size
+        rows = await products_aio.get_all_products(db, search_query=q, min_price=min_price, max_price=max_price, category_id=category_id, limit=size + 1, offset=offset, sort=sort, seek=seek, backwards=backwards)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    items, next_cursor, prev_cursor = page_cursors(rows, size, sort, key, backwards, has_previous=bool(cursor) or page > 1)
+    total, estimated = await count_with_strategy(
+        strategy,
+        product_counts,
+        (q or None, min_price, max_price, category_id),
+        exact=lambda: products_aio.count_products(db, search_query=q, min_price=min_price, max_price=max_price, category_id=category_id),
+        estimate=lambda: products_aio.estimate_products(db)
+    )
+    
+    import math
+    pages = (math.ceil(total / size) if size > 0 else 0) if total is not None else None
+    
+    return {
+        "items": items,
+        "total": total,
+        "total_estimated": estimated,
+        "page": None if cursor else page,
+        "size": size,
+        "pages": pages,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor
+    }
+
+@router.get("/search", response_model=PaginatedProductResponse)
+async def search_products(
+    request: Request,
+    q: str,
+    db=Depends(get_async_read_db),
+    min_price: float = None,
+    max_price: float = None,
+    category_id: int = None,
+    page: int = 1,
     size: int = 10
 ):
+    """Typeahead search served by the in-memory index (BM25 ranked)."""
     offset = (page - 1) * size
-    items = get_all_products(db, search_query=q, min_price=min_price, max_price=max_price, category_id=category_id, limit=size, offset=offset)
-    total = count_products(db, search_query=q, min_price=min_price, max_price=max_price, category_id=category_id)
+    if product_index.ready:
+        product_ids, total = product_index.search(q, min_price=min_price, max_price=max_price, category_id=category_id, limit=size, offset=offset)
+        items = await products_aio.get_products_by_ids(db, product_ids)
+    else:
+        # Index still building (or disabled): fall back to MySQL full-text search
+        items = await products_aio.get_all_products(db, search_query=q, min_price=min_price, max_price=max_price, category_id=category_id, limit=size, offset=offset, sort=default_product_sort(q))
+        total = await products_aio.count_products(db, search_query=q, min_price=min_price, max_price=max_price, category_id=category_id)
     
     import math
     pages = math.ceil(total / size) if size > 0 else 0
@@ -65,12 +139,67 @@ def create_new_product(
     )
     return get_product_by_id(db, product_id)
 
+@router.post("/import")
+@limiter.limit("20/minute")
+async def import_product_feed(
+    request: Request,
+    format: str = "csv",
+    admin: dict = Depends(get_current_admin_user)
+):
+    # The body is read as it arrives and written in chunks, one commit per
+    # chunk; invalid rows are reported in the summary instead of failing
+    # the request.
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}'. Allowed: {', '.join(IMPORT_FORMATS)}")
+
+    def run():
+        records = iter_records(iter_lines(iter_sync(request.stream())), format)
+        with pooled_connection() as db:
+            cursor = CountingCursor(db.cursor(dictionary=True))
+            try:
+                return import_products((db, cursor), records)
+            finally:
+                cursor.close()
+
+    return await run_in_threadpool(run)
+
+@router.get("/export")
+def export_products(
+    format: str = "ndjson",
+    updated_since: datetime = None,
+    admin: dict = Depends(get_current_admin_user)
+):
+    # Rows are encoded as they are fetched, without building response
+    # models. With updated_since only products changed since then (by
+    # products.updated_at) are exported.
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}'. Allowed: {', '.join(EXPORT_MEDIA_TYPES)}")
+
+    def chunks():
+        # The connection is held only while the response is being streamed.
+        with streaming_cursor() as conn:
+            yield from iter_products_export(conn, updated_since=updated_since, chunk_size=EXPORT_CHUNK_SIZE)
+
+    return StreamingResponse(
+        stream_export(chunks(), format, PRODUCT_EXPORT_FIELDS),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="products.{format}"'}
+    )
+
 @router.get("/{product_id}", response_model=ProductResponse)
-def get_product(product_id: int, request: Request, db=Depends(get_db)):
-    product = get_product_by_id(db, product_id)
+async def get_product(product_id: int, request: Request, response: Response, db=Depends(get_async_read_db)):
+    # Revalidating a cached copy only costs a primary-key lookup.
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        version = await products_aio.get_product_version(db, product_id)
+        if version and etag_matches(if_none_match, product_etag(version)):
+            return not_modified(product_etag(version))
+
+    product = await products_aio.get_product_by_id(db, product_id)
 
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
+    set_etag(response, product_etag(product))
     return product
 
 @router.put("/{product_id}", response_model=ProductResponse)
@@ -99,6 +228,20 @@ def update_existing_product(
     
     return get_product_by_id(db, product_id)
 
+@router.patch("/bulk", response_model=ProductBulkUpdateResult)
+@limiter.limit("20/minute")
+def bulk_update_price_and_stock(
+    batch: ProductBulkUpdate,
+    request: Request,
+    admin: dict = Depends(get_current_admin_user),
+    db=Depends(get_db)
+):
+    # For ERP syncs: price and stock of many products in one transaction,
+    # two statements per PRODUCT_BULK_CHUNK_SIZE ids instead of three per
+    # product through PUT /products/{id}.
+    changed, missing = bulk_update_products(db, [(item.id, item.price, item.stock) for item in batch.items])
+    return {"changed": len(changed), "missing": missing}
+
 @router.delete("/{product_id}")
 @limiter.limit("20/minute")
 def delete_existing_product(
@@ -1,10 +1,17 @@
 
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 from datetime import datetime
+from decimal import Decimal
+from api.core.config import MAX_PAGE_SIZE
 from api.db.conn import get_db
+from api.db.pagination import decode_cursor, keyset_clause, order_clause, page_cursors
+from api.db.aio.conn import get_async_read_db
 from api.dependencies import get_current_user
+from api.db.products import bump_product_version, invalidate_product_caches
+from api.db.aio.products import get_product_version
+from api.core.etag import make_etag, etag_matches, not_modified, set_etag
 
 class ReviewCreate(BaseModel):
     product_id: int
@@ -21,12 +28,35 @@ class ReviewResponse(BaseModel):
     created_at: datetime
     user_name: Optional[str] = None
 
+class RatingStatsResponse(BaseModel):
+    product_id: int
+    rating_count: int
+    rating_average: Optional[Decimal]
+    histogram: Dict[int, int]
+
 router = APIRouter()
 
 # DB Helper functions
+RATING_COLUMNS = {rating: f"rating_{rating}" for rating in range(1, 6)}
+
+def build_rating_stats_upsert(product_id: int, rating: int):
+    column = RATING_COLUMNS[rating]
+    query = f"""
+        INSERT INTO product_rating_stats (product_id, rating_count, rating_sum, {column})
+        VALUES (%s, 1, %s, 1)
+        ON DUPLICATE KEY UPDATE
+            rating_count = rating_count + 1,
+            rating_sum = rating_sum + VALUES(rating_sum),
+            {column} = {column} + 1
+    """
+    return query, (product_id, rating)
+
 def create_review_db(db_conn, user_id: int, review: ReviewCreate):
     db, cursor = db_conn
     
+    if review.rating not in RATING_COLUMNS:
+        raise ValueError("Rating must be between 1 and 5")
+
     # 1. Check if order is valid and completed
     # Using existing logic or raw query
     cursor.execute("SELECT * FROM orders WHERE id = %s AND user_id = %s", (review.order_id, user_id))
@@ -55,23 +85,68 @@ def create_review_db(db_conn, user_id: int, review: ReviewCreate):
         (user_id, review.product_id, review.order_id, review.rating, review.comment)
     )
     review_id = cursor.lastrowid
+
+    # 5. Update the product's rating aggregate in the same transaction
+    cursor.execute(*build_rating_stats_upsert(review.product_id, review.rating))
+    # Reviews (and the rating) are part of the product's ETag.
+    bump_product_version(db_conn, review.product_id)
     db.commit()
+    invalidate_product_caches([review.product_id])
     
-    # 5. Return created review
+    # 6. Return created review
     cursor.execute("SELECT * FROM reviews WHERE id = %s", (review_id,))
     return cursor.fetchone()
 
-def get_product_reviews_db(db_conn, product_id: int):
+PRODUCT_REVIEWS_SELECT = """
+    SELECT r.*, u.full_name as user_name 
+    FROM reviews r
+    JOIN users u ON r.user_id = u.id
+    WHERE r.product_id = %s
+"""
+
+# Newest first; cursors carry (created_at, id).
+PRODUCT_REVIEWS_SORT = "-created_at"
+
+def build_product_reviews_query(product_id: int, limit: int = None, seek=None, backwards: bool = False):
+    query = PRODUCT_REVIEWS_SELECT
+    params = [product_id]
+    if seek is not None:
+        seek_clause, seek_params = keyset_clause("r.created_at", "r.id", seek, True, backwards)
+        query += seek_clause
+        params.extend(seek_params)
+    query += order_clause("r.created_at", "r.id", True, backwards)
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+    return query, tuple(params)
+
+def get_product_reviews_db(db_conn, product_id: int, limit: int = None, seek=None, backwards: bool = False):
     db, cursor = db_conn
-    cursor.execute("""
-        SELECT r.*, u.full_name as user_name 
-        FROM reviews r
-        JOIN users u ON r.user_id = u.id
-        WHERE r.product_id = %s
-        ORDER BY r.created_at DESC
-    """, (product_id,))
+    cursor.execute(*build_product_reviews_query(product_id, limit, seek, backwards))
     return cursor.fetchall()
 
+async def get_product_reviews_db_async(db_conn, product_id: int, limit: int = None, seek=None, backwards: bool = False):
+    db, cursor = db_conn
+    await cursor.execute(*build_product_reviews_query(product_id, limit, seek, backwards))
+    return await cursor.fetchall()
+
+RATING_STATS_QUERY = "SELECT * FROM product_rating_stats WHERE product_id = %s"
+
+def rating_stats_response(product_id: int, row: dict = None):
+    row = row or {}
+    count = row.get('rating_count', 0)
+    return {
+        "product_id": product_id,
+        "rating_count": count,
+        "rating_average": round(Decimal(row['rating_sum']) / count, 2) if count else None,
+        "histogram": {rating: row.get(column, 0) for rating, column in RATING_COLUMNS.items()},
+    }
+
+async def get_rating_stats_db_async(db_conn, product_id: int):
+    db, cursor = db_conn
+    await cursor.execute(RATING_STATS_QUERY, (product_id,))
+    return rating_stats_response(product_id, await cursor.fetchone())
+
 # Endpoints
 @router.post("/", response_model=ReviewResponse)
 def create_review(
@@ -87,6 +162,48 @@ def create_review(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+def reviews_etag(version: dict):
+    return make_etag("reviews", version['id'], version['version'])
+
 @router.get("/product/{product_id}", response_model=List[ReviewResponse])
-def get_product_reviews(product_id: int, db=Depends(get_db)):
-    return get_product_reviews_db(db, product_id)
+async def get_product_reviews(
+    product_id: int,
+    request: Request,
+    response: Response,
+    size: int = None,
+    cursor: str = None,
+    db=Depends(get_async_read_db)
+):
+    # Without size or cursor every review is returned, as before. With them
+    # the list is one keyset page, linked through X-Next-Cursor / X-Prev-Cursor.
+    paginated = size is not None or cursor is not None
+    size = size or 20
+    if paginated and not 1 <= size <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"size must be between 1 and {MAX_PAGE_SIZE}")
+    try:
+        seek, backwards = decode_cursor(cursor, PRODUCT_REVIEWS_SORT) if cursor else (None, False)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # New reviews bump the product's version, so it versions the list too.
+    version = await get_product_version(db, product_id)
+    if version is not None:
+        etag = reviews_etag(version)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+
+    if not paginated:
+        return await get_product_reviews_db_async(db, product_id)
+
+    rows = await get_product_reviews_db_async(db, product_id, limit=size + 1, seek=seek, backwards=backwards)
+    items, next_cursor, prev_cursor = page_cursors(list(rows), size, PRODUCT_REVIEWS_SORT, "created_at", backwards, has_previous=bool(cursor))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if prev_cursor:
+        response.headers["X-Prev-Cursor"] = prev_cursor
+    return items
+
+@router.get("/product/{product_id}/stats", response_model=RatingStatsResponse)
+async def get_product_rating_stats(product_id: int, db=Depends(get_async_read_db)):
+    return await get_rating_stats_db_async(db, product_id)
@@ -1,25 +1,33 @@
 from fastapi import APIRouter, Depends, HTTPException
-from api.dependencies import get_current_user
+from api.dependencies import get_current_user, auth_db
 from api.db.conn import get_db
+from api.db.repository import get_auth_user, get_cached_user
 
 router = APIRouter()
 
 
 @router.get("/me")
 def get_me(user: dict = Depends(get_current_user)):
-    if "password" in user:
-        del user["password"]
-    return user
+    # Stateless tokens only carry part of the profile. Like get_current_user,
+    # only check out a connection when the user cache misses.
+    profile = get_cached_user(user["email"])
+    if profile is None:
+        with auth_db() as db:
+            profile = get_auth_user(db, user["email"])
+    return profile or user
 
 
 from typing import List
 from pydantic import BaseModel
 from api.dependencies import get_current_admin_user
-from api.db.repository import get_all_users, update_user_role
+from api.db.repository import get_all_users, update_user_role, set_user_active
 
 class UserRoleUpdate(BaseModel):
     role: str
 
+class UserActiveUpdate(BaseModel):
+    is_active: bool
+
 @router.get("/", response_model=List[dict])
 def list_users(
     q: str = None,
@@ -41,3 +49,16 @@ def change_user_role(
     if not success:
         raise HTTPException(status_code=404, detail="User not found")
     return {"message": "Role updated successfully"}
+
+@router.put("/{user_id}/active")
+def change_user_active(
+    user_id: int,
+    active_update: UserActiveUpdate,
+    admin: dict = Depends(get_current_admin_user),
+    db=Depends(get_db)
+):
+    """Activate or deactivate a user (Admin only)"""
+    success = set_user_active(db, user_id, active_update.is_active)
+    if not success:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"message": "User updated successfully"}
@@ -1,11 +1,35 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator, model_validator
 from typing import List, Optional
+from api.core.config import CART_BATCH_MAX_ITEMS
 from api.schemas.product import ProductResponse
 
 class CartItemCreate(BaseModel):
     product_id: int
     quantity: int = 1
 
+class CartBatchOperation(BaseModel):
+    product_id: int
+    quantity: Optional[int] = None  # set the quantity; 0 removes the item
+    delta: Optional[int] = None     # add to the quantity; negative takes units out
+
+    @model_validator(mode="after")
+    def check_one_change(self):
+        if (self.quantity is None) == (self.delta is None):
+            raise ValueError("Give exactly one of quantity or delta")
+        if self.quantity is not None and self.quantity < 0:
+            raise ValueError("quantity must not be negative")
+        return self
+
+class CartBatchUpdate(BaseModel):
+    items: List[CartBatchOperation]
+
+    @field_validator("items")
+    @classmethod
+    def check_size(cls, v: list) -> list:
+        if not 1 <= len(v) <= CART_BATCH_MAX_ITEMS:
+            raise ValueError(f"Between 1 and {CART_BATCH_MAX_ITEMS} operations per batch")
+        return v
+
 class CartItemResponse(BaseModel):
     id: int
     product: ProductResponse
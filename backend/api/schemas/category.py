@@ -15,11 +15,14 @@ class CategoryResponse(CategoryBase):
     class Config:
         from_attributes = True
 
-from typing import List
+from typing import List, Optional
 
 class PaginatedCategoryResponse(BaseModel):
     items: List[CategoryResponse]
-    total: int
-    page: int
+    total: Optional[int] = None  # None when include_total=false
+    total_estimated: bool = False
+    page: Optional[int] = None  # None when paginating by cursor
     size: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
@@ -19,4 +19,6 @@ class OrderResponse(BaseModel):
     status: str
     shipping_address: str
     created_at: datetime
+    # Unpaid orders are cancelled after this, releasing their stock.
+    reserved_until: Optional[datetime] = None
     items: List[OrderItemResponse] = []
@@ -1,7 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import Optional
 from datetime import datetime
 from decimal import Decimal
+from api.core.config import PRODUCT_BULK_MAX_ITEMS
 
 class ProductBase(BaseModel):
     name: str
@@ -18,6 +19,8 @@ class ProductResponse(ProductBase):
     id: int
     created_at: datetime | None = None
     category_name: Optional[str] = None
+    rating_average: Optional[Decimal] = None  # None until the first review
+    rating_count: int = 0
 
     class Config:
         from_attributes = True
@@ -26,7 +29,41 @@ from typing import List
 
 class PaginatedProductResponse(BaseModel):
     items: List[ProductResponse]
-    total: int
-    page: int
+    total: Optional[int] = None  # None when include_total=false
+    total_estimated: bool = False
+    page: Optional[int] = None  # None when paginating by cursor
     size: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+# Largest value of a MySQL INT column.
+INT_MAX = 2147483647
+
+class ProductBulkUpdateItem(BaseModel):
+    id: int
+    # Bounded like the columns (price DECIMAL(10, 2), stock INT): one bad
+    # item is a 422 naming it, not a database error rolling back the batch.
+    price: Optional[Decimal] = Field(None, ge=0, max_digits=10, decimal_places=2)
+    stock: Optional[int] = Field(None, ge=0, le=INT_MAX)
+
+    @model_validator(mode="after")
+    def check_change(self):
+        if self.price is None and self.stock is None:
+            raise ValueError("Give price, stock or both")
+        return self
+
+class ProductBulkUpdate(BaseModel):
+    items: List[ProductBulkUpdateItem]
+
+    @field_validator("items")
+    @classmethod
+    def check_size(cls, v: list) -> list:
+        if not 1 <= len(v) <= PRODUCT_BULK_MAX_ITEMS:
+            raise ValueError(f"Between 1 and {PRODUCT_BULK_MAX_ITEMS} updates per request")
+        return v
+
+class ProductBulkUpdateResult(BaseModel):
+    changed: int
+    missing: List[int]
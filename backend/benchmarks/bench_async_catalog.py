@@ -0,0 +1,49 @@
+"""Requests/sec of the catalog read path, threadpool (sync) vs asyncio.
+
+Serves ``GET /products/{id}`` twice from one app: once through the sync
+``get_db`` + ``def`` endpoint the routers used before, once through
+``get_async_db`` + ``async def``, and drives each with N concurrent clients.
+
+Usage (from backend/, with a reachable database configured in .env):
+
+    python -m benchmarks.bench_async_catalog --product-id 1 --concurrency 500
+"""
+import argparse
+from fastapi import Depends, FastAPI
+from api.db.conn import get_db
+from api.db.aio.conn import get_async_db
+from api.db.products import get_product_by_id
+from api.db.aio import products as products_aio
+from benchmarks._http import ServerThread, run_load
+
+app = FastAPI()
+
+
+@app.get("/sync/products/{product_id}")
+def sync_product(product_id: int, db=Depends(get_db)):
+    return get_product_by_id(db, product_id)
+
+
+@app.get("/async/products/{product_id}")
+async def async_product(product_id: int, db=Depends(get_async_db)):
+    return await products_aio.get_product_by_id(db, product_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--product-id", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with ServerThread(app, args.port) as server:
+        for mode in ("sync", "async"):
+            url = f"{server.base_url}/{mode}/products/{args.product_id}"
+            run_load(url, min(args.concurrency, 20), 1.0)  # warm up pools
+            result = run_load(url, args.concurrency, args.duration)
+            print(f"{mode:>5}: {result}")
+
+
+if __name__ == "__main__":
+    main()
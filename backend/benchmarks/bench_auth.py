@@ -0,0 +1,74 @@
+"""Requests/sec of an authenticated endpoint by how the caller is resolved.
+
+Serves ``GET /whoami`` (``Depends(get_current_user)``, no other work) and
+drives it with N concurrent clients in three modes:
+
+- ``lookup``: the user is read from MySQL on every request (cache disabled).
+- ``cached``: the per-worker user cache (the default setup).
+- ``stateless``: STATELESS_TOKENS, authorized from the token claims alone.
+
+Usage (from backend/, with a reachable database configured in .env and an
+existing user, after running the migrations):
+
+    python -m benchmarks.bench_auth --email admin@example.com --concurrency 200
+"""
+import argparse
+from fastapi import Depends, FastAPI
+from api import dependencies
+from api.core.cache import TTLCache
+from api.core.security import create_access_token, access_token_claims
+from api.db import repository
+from api.db.conn import pooled_connection
+from api.dependencies import get_current_user
+from benchmarks._http import ServerThread, run_load
+
+app = FastAPI()
+
+
+@app.get("/whoami")
+def whoami(user: dict = Depends(get_current_user)):
+    return {"id": user["id"], "role": user["role"]}
+
+
+def load_user(email: str):
+    with pooled_connection() as db:
+        cursor = db.cursor(dictionary=True)
+        try:
+            user = repository.get_user_by_email((db, cursor), email)
+            repository.load_token_versions((db, cursor))
+        finally:
+            cursor.close()
+    if user is None:
+        raise SystemExit(f"No user with email {email}")
+    return user
+
+
+def configure(mode: str):
+    dependencies.STATELESS_TOKENS = mode == "stateless"
+    repository.user_cache = TTLCache(maxsize=0 if mode == "lookup" else 1024, ttl=3600)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    user = load_user(args.email)
+    headers = {"Authorization": f"Bearer {create_access_token(access_token_claims(user))}"}
+    # Long enough that the map stays fresh for the whole run.
+    repository.token_versions.max_age = 3600
+
+    with ServerThread(app, args.port) as server:
+        url = f"{server.base_url}/whoami"
+        for mode in ("lookup", "cached", "stateless"):
+            configure(mode)
+            run_load(url, min(args.concurrency, 20), 1.0, headers=headers)  # warm up
+            result = run_load(url, args.concurrency, args.duration, headers=headers)
+            print(f"{mode:>9}: {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Checkout latency and round trips by cart size.
+
+For carts of 1 to 200 items, fills a scratch user's cart and checks it out
+``--repeat`` times with:
+
+- ``legacy``: the previous create_order (cart read that may commit, one
+  INSERT per item, the order re-read with get_order_by_id).
+- ``current``: orders.create_order (locked cart read, one multi-row INSERT,
+  order built in memory).
+
+The scratch user, its orders and the scratch products are removed at the
+end, and the order counters are corrected for the orders created here.
+
+Usage (from backend/, after `alembic upgrade head`):
+
+    python -m benchmarks.bench_checkout --sizes 1 10 50 200 --repeat 20
+"""
+import argparse
+import statistics
+import time
+from api.db.conn import pooled_connection
+from api.db.cart import get_cart_by_user_id
+from api.db.orders import create_order, get_order_by_id, build_status_totals_update, totals_slot, DAILY_TOTALS_UPDATE
+from api.db.querycount import CountingCursor, query_counter
+
+EMAIL = "bench-checkout@example.com"
+SLUG = "bench-checkout"
+
+
+def legacy_create_order(db_conn, user_id: int, shipping_address: str):
+    db, cursor = db_conn
+    cart = get_cart_by_user_id(db_conn, user_id)
+    if not cart['items']:
+        raise ValueError("Cart is empty")
+    cursor.execute(
+        "INSERT INTO orders (user_id, total_price, status, shipping_address) VALUES (%s, %s, %s, %s)",
+        (user_id, cart['total_price'], 'pending', shipping_address)
+    )
+    order_id = cursor.lastrowid
+    for item in cart['items']:
+        cursor.execute(
+            "INSERT INTO order_items (order_id, product_id, quantity, price_at_purchase) VALUES (%s, %s, %s, %s)",
+            (order_id, item['product']['id'], item['quantity'], item['product']['price'])
+        )
+    cursor.execute("DELETE FROM cart_items WHERE cart_id = %s", (cart['id'],))
+    db.commit()
+    return get_order_by_id(db_conn, order_id)
+
+
+def setup(db, cursor, products: int):
+    cursor.execute("SELECT id FROM users WHERE email = %s", (EMAIL,))
+    row = cursor.fetchone()
+    if row:
+        user_id = row["id"]
+    else:
+        cursor.execute("INSERT INTO users (email, password, full_name) VALUES (%s, %s, %s)", (EMAIL, "!", "Benchmark"))
+        user_id = cursor.lastrowid
+    cursor.execute("INSERT IGNORE INTO categories (name, slug) VALUES (%s, %s)", ("Benchmark checkout", SLUG))
+    cursor.execute("SELECT id FROM categories WHERE slug = %s", (SLUG,))
+    category_id = cursor.fetchone()["id"]
+    cursor.execute("SELECT id FROM products WHERE category_id = %s ORDER BY id", (category_id,))
+    product_ids = [row["id"] for row in cursor.fetchall()]
+    missing = products - len(product_ids)
+    if missing > 0:
+        cursor.executemany(
+            "INSERT INTO products (name, price, stock, category_id) VALUES (%s, %s, %s, %s)",
+            [(f"Checkout item {i}", 9.99, 1_000_000, category_id) for i in range(missing)]
+        )
+        cursor.execute("SELECT id FROM products WHERE category_id = %s ORDER BY id", (category_id,))
+        product_ids = [row["id"] for row in cursor.fetchall()]
+    cursor.execute("INSERT IGNORE INTO carts (user_id) VALUES (%s)", (user_id,))
+    cursor.execute("SELECT id FROM carts WHERE user_id = %s", (user_id,))
+    cart_id = cursor.fetchone()["id"]
+    db.commit()
+    return user_id, cart_id, product_ids
+
+
+def fill_cart(db, cursor, cart_id: int, product_ids):
+    cursor.executemany(
+        "INSERT INTO cart_items (cart_id, product_id, quantity) VALUES (%s, %s, %s)",
+        [(cart_id, product_id, 1) for product_id in product_ids]
+    )
+    db.commit()
+
+
+def cleanup(db, cursor, user_id: int, counted: list):
+    # Undo what create_order added to the counters, then drop the data.
+    for created_at, total_price in counted:
+        cursor.execute(*build_status_totals_update({'pending': (-1, -total_price)}))
+        cursor.execute(DAILY_TOTALS_UPDATE, (created_at.date(), totals_slot(), -1, -total_price))
+    cursor.execute("DELETE FROM orders WHERE user_id = %s", (user_id,))
+    cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+    cursor.execute("DELETE FROM categories WHERE slug = %s", (SLUG,))
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with pooled_connection() as db:
+        raw_cursor = db.cursor(dictionary=True)
+        cursor = CountingCursor(raw_cursor)
+        user_id, cart_id, product_ids = setup(db, raw_cursor, max(args.sizes))
+        counted = []
+        print(f"{'items':>6}{'legacy ms':>12}{'queries':>9}{'current ms':>12}{'queries':>9}   (median)")
+        try:
+            for size in args.sizes:
+                results = {}
+                for name, checkout in (("legacy", legacy_create_order), ("current", create_order)):
+                    timings, queries = [], 0
+                    for _ in range(args.repeat):
+                        fill_cart(db, raw_cursor, cart_id, product_ids[:size])
+                        with query_counter() as counter:
+                            start = time.perf_counter()
+                            order = checkout((db, cursor), user_id, "Benchmark street 1")
+                            timings.append(time.perf_counter() - start)
+                        queries = counter.count
+                        if checkout is create_order:
+                            counted.append((order['created_at'], order['total_price']))
+                    results[name] = (statistics.median(timings) * 1000, queries)
+                print(f"{size:>6}{results['legacy'][0]:>12.2f}{results['legacy'][1]:>9}{results['current'][0]:>12.2f}{results['current'][1]:>9}")
+        finally:
+            cleanup(db, raw_cursor, user_id, counted)
+            raw_cursor.close()
+
+
+if __name__ == "__main__":
+    main()
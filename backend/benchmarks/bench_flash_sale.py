@@ -0,0 +1,167 @@
+"""Many checkouts of one product at once: no overselling, and how long they take.
+
+Creates ``--buyers`` scratch users, each with ``--quantity`` units of one
+scratch product (``--stock`` units in stock) in their cart, then checks all
+of them out at once from ``--concurrency`` threads, each with its own
+connection. Afterwards it verifies that:
+
+- the stock never went below zero,
+- exactly min(buyers, stock / quantity) checkouts succeeded and the others
+  failed with "Insufficient stock",
+- the units in order_items equal what left products.stock.
+
+Then every order is cancelled, which must put the whole stock back. The
+scratch users, orders and product are removed at the end and the order
+counters corrected.
+
+Usage (from backend/, after `alembic upgrade head`; the server's
+max_connections must allow ``--concurrency`` connections):
+
+    python -m benchmarks.bench_flash_sale --buyers 1000 --stock 100 --concurrency 100
+"""
+import argparse
+import queue
+import statistics
+import threading
+import time
+import mysql.connector
+from api.core.config import DB_CONFIG
+from api.db.orders import create_order, update_order_status, build_status_totals_update, totals_slot, DAILY_TOTALS_UPDATE
+
+EMAIL = "bench-flash-{}@example.com"
+SLUG = "bench-flash-sale"
+
+
+def setup(db, cursor, buyers: int, stock: int, quantity: int):
+    cursor.execute("INSERT IGNORE INTO categories (name, slug) VALUES (%s, %s)", ("Benchmark flash sale", SLUG))
+    cursor.execute("SELECT id FROM categories WHERE slug = %s", (SLUG,))
+    category_id = cursor.fetchone()["id"]
+    cursor.execute("INSERT INTO products (name, price, stock, category_id) VALUES (%s, %s, %s, %s)", ("Flash sale item", 19.99, stock, category_id))
+    product_id = cursor.lastrowid
+    cursor.executemany(
+        "INSERT INTO users (email, password, full_name) VALUES (%s, %s, %s)",
+        [(EMAIL.format(i), "!", "Benchmark") for i in range(buyers)]
+    )
+    cursor.execute("SELECT id FROM users WHERE email LIKE %s ORDER BY id", (EMAIL.format("%"),))
+    user_ids = [row["id"] for row in cursor.fetchall()]
+    cursor.executemany("INSERT INTO carts (user_id) VALUES (%s)", [(user_id,) for user_id in user_ids])
+    cursor.execute(
+        "INSERT INTO cart_items (cart_id, product_id, quantity) SELECT id, %s, %s FROM carts WHERE user_id IN (SELECT id FROM users WHERE email LIKE %s)",
+        (product_id, quantity, EMAIL.format("%"))
+    )
+    db.commit()
+    return product_id, user_ids
+
+
+def run_checkouts(user_ids, concurrency: int):
+    pending = queue.Queue()
+    for user_id in user_ids:
+        pending.put(user_id)
+    start = threading.Barrier(concurrency)
+    lock = threading.Lock()
+    results = {"orders": [], "sold_out": 0, "errors": [], "latencies": []}
+
+    def worker():
+        db = mysql.connector.connect(**DB_CONFIG)
+        cursor = db.cursor(dictionary=True)
+        start.wait()
+        try:
+            while True:
+                try:
+                    user_id = pending.get_nowait()
+                except queue.Empty:
+                    return
+                began = time.perf_counter()
+                try:
+                    order = create_order((db, cursor), user_id, "Benchmark street 1")
+                    outcome = ("orders", order)
+                except ValueError as e:
+                    outcome = ("sold_out", None) if "Insufficient stock" in str(e) else ("errors", e)
+                except mysql.connector.Error as e:
+                    outcome = ("errors", e)
+                elapsed = time.perf_counter() - began
+                with lock:
+                    results["latencies"].append(elapsed)
+                    if outcome[0] == "sold_out":
+                        results["sold_out"] += 1
+                    else:
+                        results[outcome[0]].append(outcome[1])
+        finally:
+            cursor.close()
+            db.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results["elapsed"] = time.perf_counter() - began
+    return results
+
+
+def stock_and_sold(cursor, product_id: int):
+    cursor.execute("SELECT stock FROM products WHERE id = %s", (product_id,))
+    stock = cursor.fetchone()["stock"]
+    cursor.execute("SELECT COALESCE(SUM(quantity), 0) AS sold FROM order_items WHERE product_id = %s", (product_id,))
+    return stock, int(cursor.fetchone()["sold"])
+
+
+def cleanup(db, cursor, user_ids):
+    # Take the scratch orders out of the counters, in whatever status they
+    # ended up, then drop the data.
+    if user_ids:
+        placeholders = ", ".join(["%s"] * len(user_ids))
+        cursor.execute(f"SELECT status, total_price, created_at FROM orders WHERE user_id IN ({placeholders})", tuple(user_ids))
+        for order in cursor.fetchall():
+            cursor.execute(*build_status_totals_update({order['status']: (-1, -order['total_price'])}))
+            cursor.execute(DAILY_TOTALS_UPDATE, (order['created_at'].date(), totals_slot(), -1, -order['total_price']))
+        cursor.execute(f"DELETE FROM orders WHERE user_id IN ({placeholders})", tuple(user_ids))
+        cursor.execute(f"DELETE FROM users WHERE id IN ({placeholders})", tuple(user_ids))
+    cursor.execute("DELETE FROM categories WHERE slug = %s", (SLUG,))
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--buyers", type=int, default=1000)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--quantity", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    db = mysql.connector.connect(**DB_CONFIG)
+    cursor = db.cursor(dictionary=True)
+    user_ids = []
+    try:
+        product_id, user_ids = setup(db, cursor, args.buyers, args.stock, args.quantity)
+        results = run_checkouts(user_ids, args.concurrency)
+        orders = results["orders"]
+        db.commit()  # new snapshot
+        stock, sold = stock_and_sold(cursor, product_id)
+
+        latencies = sorted(results["latencies"])
+        print(f"checkouts: {len(latencies)} in {results['elapsed']:.2f}s, ok={len(orders)} sold_out={results['sold_out']} errors={len(results['errors'])}")
+        print(f"latency ms: median={statistics.median(latencies) * 1000:.1f} p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f}")
+        print(f"stock: {args.stock} -> {stock}, units sold: {sold}")
+        for error in results["errors"][:5]:
+            print(f"  error: {error!r}")
+
+        expected = min(args.buyers, args.stock // args.quantity)
+        assert stock >= 0, "stock went negative"
+        assert sold == args.stock - stock, "order items and stock disagree"
+        assert len(orders) == expected, f"expected {expected} successful checkouts"
+
+        for order in orders:
+            update_order_status((db, cursor), order['id'], 'cancelled')
+        stock, _ = stock_and_sold(cursor, product_id)
+        assert stock == args.stock, "cancelling did not restore the stock"
+        print("OK: no overselling, cancellations restored the stock")
+    finally:
+        cleanup(db, cursor, user_ids)
+        cursor.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
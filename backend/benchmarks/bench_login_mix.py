@@ -0,0 +1,84 @@
+"""Login p99 and catalog p99 under a mixed load.
+
+Drives a login endpoint and ``GET /products/{id}`` at the same time, twice:
+
+- ``inline``: the password is verified inside a sync ``def`` handler, i.e.
+  in the request threadpool (how /auth/login worked before).
+- ``pool``: verified through ``password_hasher`` (process pool with an
+  admission limit), as /auth/login does now. Rejected logins (503) are
+  reported separately.
+
+The login endpoints verify against a hash made at startup with the
+configured Argon2 cost, so only the catalog side needs the database.
+
+Usage (from backend/, with a reachable database configured in .env):
+
+    python -m benchmarks.bench_login_mix --product-id 1 --login-concurrency 64 --catalog-concurrency 200
+"""
+import argparse
+import threading
+from fastapi import FastAPI, HTTPException
+from api.core.hashing import password_hasher, HashPoolBusy
+from api.core.security import hash_password, verify_password
+from api.routers import products
+from benchmarks._http import ServerThread, run_load
+
+PASSWORD = "benchmark-password-1"
+PASSWORD_HASH = hash_password(PASSWORD)
+
+app = FastAPI()
+app.include_router(products.router, prefix="/products")
+
+
+@app.post("/inline/login")
+def inline_login():
+    return {"valid": verify_password(PASSWORD, PASSWORD_HASH)}
+
+
+@app.post("/pool/login")
+async def pool_login():
+    try:
+        return {"valid": await password_hasher.run(verify_password, PASSWORD, PASSWORD_HASH)}
+    except HashPoolBusy:
+        raise HTTPException(503, "Server busy, please retry")
+
+
+def run_mixed(base_url: str, mode: str, product_id: int, args):
+    results = {}
+
+    def login_load():
+        results["login"] = run_load(f"{base_url}/{mode}/login", args.login_concurrency, args.duration, method="POST")
+
+    def catalog_load():
+        results["catalog"] = run_load(f"{base_url}/products/{product_id}", args.catalog_concurrency, args.duration)
+
+    threads = [threading.Thread(target=login_load), threading.Thread(target=catalog_load)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--product-id", type=int, default=1)
+    parser.add_argument("--login-concurrency", type=int, default=64)
+    parser.add_argument("--catalog-concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    with ServerThread(app, args.port) as server:
+        run_load(f"{server.base_url}/products/{args.product_id}", 20, 1.0)  # warm up pools
+        for mode in ("inline", "pool"):
+            rejected_before = password_hasher.stats()["rejected"]
+            results = run_mixed(server.base_url, mode, args.product_id, args)
+            rejected = password_hasher.stats()["rejected"] - rejected_before
+            print(f"{mode:>6} login:   {results['login']}" + (f" rejected={rejected}" if mode == "pool" else ""))
+            print(f"{mode:>6} catalog: {results['catalog']}")
+    password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""LIKE '%q%' vs FULLTEXT search on a generated catalog.
+
+Fills a scratch category with synthetic products (skipped if it already
+holds enough rows), then times the old LIKE predicate against the
+MATCH ... AGAINST path of build_products_query for a few queries.
+
+Usage (from backend/, after `alembic upgrade head`):
+
+    python -m benchmarks.bench_product_search --rows 1000000
+    python -m benchmarks.bench_product_search --cleanup
+"""
+import argparse
+import random
+import statistics
+import time
+from api.db.conn import pooled_connection
+from api.db.products import build_products_query, build_count_products_query, default_product_sort
+
+SLUG = "bench-search"
+WORDS = (
+    "lamp desk chair table sofa shelf mirror rug cushion blanket kettle toaster blender "
+    "phone laptop tablet monitor keyboard mouse speaker headset camera charger cable "
+    "shirt jacket jeans sneaker boot scarf glove backpack wallet watch bracelet necklace "
+    "oak walnut steel glass leather cotton wool linen bamboo ceramic copper marble"
+).split()
+ADJECTIVES = "red blue green black white vintage modern compact wireless portable premium classic".split()
+QUERIES = ("lamp", "wireless speaker", "walnut desk", "vintage leather jacket", "cer")
+
+
+def _scratch_category(cursor):
+    cursor.execute("SELECT id FROM categories WHERE slug = %s", (SLUG,))
+    row = cursor.fetchone()
+    if row:
+        return row["id"]
+    cursor.execute("INSERT INTO categories (name, slug) VALUES (%s, %s)", ("Benchmark", SLUG))
+    return cursor.lastrowid
+
+
+def _random_product(category_id):
+    name = f"{random.choice(ADJECTIVES)} {random.choice(WORDS)} {random.choice(WORDS)}"
+    description = " ".join(random.choice(WORDS + ADJECTIVES) for _ in range(30))
+    return (name, description, round(random.uniform(1, 2000), 2), random.randint(0, 500), category_id)
+
+
+def generate(db, cursor, rows, batch_size=10000):
+    category_id = _scratch_category(cursor)
+    cursor.execute("SELECT COUNT(*) AS n FROM products WHERE category_id = %s", (category_id,))
+    existing = cursor.fetchone()["n"]
+    remaining = rows - existing
+    print(f"catalog: {existing} generated rows present, inserting {max(remaining, 0)}")
+
+    while remaining > 0:
+        batch = [_random_product(category_id) for _ in range(min(batch_size, remaining))]
+        cursor.executemany(
+            "INSERT INTO products (name, description, price, stock, category_id) VALUES (%s, %s, %s, %s, %s)",
+            batch
+        )
+        db.commit()
+        remaining -= len(batch)
+    cursor.execute("ANALYZE TABLE products")
+    cursor.fetchall()
+
+
+def _time(cursor, statement, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(*statement)
+        cursor.fetchall()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def like_statement(q, limit):
+    return (
+        "SELECT p.* FROM products p WHERE (p.name LIKE %s OR p.description LIKE %s) ORDER BY p.id LIMIT %s",
+        (f"%{q}%", f"%{q}%", limit),
+    )
+
+
+def like_count_statement(q):
+    return (
+        "SELECT COUNT(*) FROM products p WHERE (p.name LIKE %s OR p.description LIKE %s)",
+        (f"%{q}%", f"%{q}%"),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--cleanup", action="store_true", help="delete the generated catalog and exit")
+    args = parser.parse_args()
+
+    with pooled_connection() as db:
+        cursor = db.cursor(dictionary=True)
+        if args.cleanup:
+            cursor.execute("DELETE FROM categories WHERE slug = %s", (SLUG,))
+            db.commit()
+            print("generated catalog removed")
+            return
+
+        generate(db, cursor, args.rows)
+        print(f"{'query':<24}{'LIKE page':>12}{'FT page':>12}{'LIKE count':>12}{'FT count':>12}   (median ms)")
+        for q in QUERIES:
+            like_page = _time(cursor, like_statement(q, args.limit), args.repeat)
+            ft_page = _time(cursor, build_products_query(search_query=q, limit=args.limit, sort=default_product_sort(q)), args.repeat)
+            like_count = _time(cursor, like_count_statement(q), args.repeat)
+            ft_count = _time(cursor, build_count_products_query(search_query=q), args.repeat)
+            print(f"{q:<24}{like_page:>12.1f}{ft_page:>12.1f}{like_count:>12.1f}{ft_count:>12.1f}")
+        cursor.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Per-request cost of the rate limiter, by storage.
+
+Times ``hit()`` of the sliding window counter strategy (what slowapi calls
+for every rate-limited request) against:
+
+- ``memory://``: per-process dict, what each worker used before.
+- ``shm://``: the table shared by all workers of the host, first from one
+  process, then from ``--processes`` processes at once (lock contention).
+- ``redis://``: only with ``--redis-url`` (needs the redis package).
+
+Clients are spread over ``--keys`` addresses; more keys than slots shows
+the cost of eviction. No database is needed.
+
+Usage (from backend/):
+
+    python -m benchmarks.bench_rate_limiter --hits 200000 --processes 4
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import SlidingWindowCounterRateLimiter
+from api.core import rate_limit_storage  # registers shm://
+
+ITEM = parse("1000000/minute")
+
+
+def run_hits(uri: str, options: dict, hits: int, keys: int, seed: int = 0):
+    limiter = SlidingWindowCounterRateLimiter(storage_from_string(uri, **options))
+    addresses = [f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}" for i in range(keys)]
+    start = time.perf_counter()
+    for i in range(hits):
+        limiter.hit(ITEM, "LIMITER/bench", addresses[(i * 7919 + seed) % keys])
+    return time.perf_counter() - start
+
+
+def _worker(args):
+    return run_hits(*args)
+
+
+def report(label: str, hits: int, elapsed: float, processes: int = 1):
+    print(f"{label:>22}: {elapsed / hits * 1e6:7.2f} us/hit   {hits * processes / elapsed:>10,.0f} hits/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hits", type=int, default=200000, help="hits per process")
+    parser.add_argument("--keys", type=int, default=10000)
+    parser.add_argument("--slots", type=int, default=65536)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--redis-url")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        shm_uri = f"shm://{os.path.join(directory, 'limits')}"
+        shm_options = {"slots": args.slots}
+
+        report("memory", args.hits, run_hits("memory://", {}, args.hits, args.keys))
+        report("shm, 1 process", args.hits, run_hits(shm_uri, shm_options, args.hits, args.keys))
+
+        jobs = [(shm_uri, shm_options, args.hits, args.keys, seed) for seed in range(args.processes)]
+        with multiprocessing.Pool(args.processes) as pool:
+            elapsed = pool.map(_worker, jobs)
+        report(f"shm, {args.processes} processes", args.hits, statistics.mean(elapsed), args.processes)
+
+        stats = storage_from_string(shm_uri, **shm_options).stats()
+        print(f"shm table: {stats['bytes']:,} bytes, {stats['live_keys']:,} live keys, {stats['evictions']:,} evictions")
+
+    if args.redis_url:
+        report("redis", args.hits, run_hits(args.redis_url, {}, args.hits, args.keys))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,8 @@
+import os
+# Per-process rate limit counters: the shared default (a file under
+# /dev/shm) would carry the counts over from one test run to the next.
+os.environ.setdefault("RATE_LIMIT_STORAGE_URI", "memory://")
+
 import pytest
 from fastapi.testclient import TestClient
 from api.main import api
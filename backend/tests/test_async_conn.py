@@ -0,0 +1,163 @@
+import asyncio
+import pytest
+from api.db.aio import conn
+from api.db.replica import ReplicaMonitor
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.closed = False
+        self.rows = []
+
+    async def execute(self, query, params=None):
+        self.connection.queries.append(query)
+        self.rows = [] if self.connection.lag is None else [{"Seconds_Behind_Source": self.connection.lag}]
+
+    async def fetchall(self):
+        return self.rows
+
+    async def close(self):
+        self.closed = True
+
+
+class CursorCall:
+    # aiomysql's db.cursor() is both awaited and used with "async with".
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __await__(self):
+        return self._get().__await__()
+
+    async def _get(self):
+        return self.cursor
+
+    async def __aenter__(self):
+        return self.cursor
+
+    async def __aexit__(self, *exc_info):
+        await self.cursor.close()
+
+
+class FakeConnection:
+    def __init__(self, name, lag=None):
+        self.name = name
+        self.lag = lag
+        self.queries = []
+        self.cursors = []
+        self.rollbacks = 0
+        self.closed = False
+
+    def cursor(self, cursor_class=None):
+        cursor = FakeCursor(self)
+        self.cursors.append(cursor)
+        return CursorCall(cursor)
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool:
+    def __init__(self, connection, down=False, hang=False):
+        self.connection = connection
+        self.down = down
+        self.hang = hang
+        self.released = []
+        self.size = 1
+        self.maxsize = 1
+        self.freesize = 1
+
+    async def acquire(self):
+        if self.down:
+            raise ConnectionError("server unreachable")
+        if self.hang:
+            await asyncio.Event().wait()
+        return self.connection
+
+    def release(self, connection):
+        self.released.append(connection)
+
+
+@pytest.fixture
+def servers(monkeypatch):
+    primary = FakePool(FakeConnection("primary"))
+    replica = FakePool(FakeConnection("replica", lag=0))
+
+    async def get_replica_pool():
+        return replica
+
+    async def get_pool():
+        return primary
+
+    monkeypatch.setattr(conn, "get_async_pool", get_pool)
+    monkeypatch.setattr(conn, "get_async_replica_pool", get_replica_pool)
+    monkeypatch.setattr(conn, "REPLICA_DB_CONFIG", {"host": "replica"})
+    monkeypatch.setattr(conn, "replica_monitor", ReplicaMonitor(max_lag=5, check_interval=0, retry_after=60))
+    return primary, replica
+
+
+async def read_connection_name():
+    dependency = conn.get_async_read_db()
+    db, cursor = await dependency.__anext__()
+    await dependency.aclose()
+    return db.name
+
+
+def test_connection_is_rolled_back_and_released_when_handler_raises(servers):
+    primary, _ = servers
+
+    async def failing_request():
+        dependency = conn.get_async_db()
+        db, cursor = await dependency.__anext__()
+        await dependency.athrow(RuntimeError("handler failed"))
+
+    with pytest.raises(RuntimeError, match="handler failed"):
+        asyncio.run(failing_request())
+    assert primary.connection.rollbacks == 1
+    assert primary.released == [primary.connection]
+    assert primary.connection.cursors[0].closed
+
+
+def test_checkout_timeout_is_counted(servers, monkeypatch):
+    primary, _ = servers
+    primary.hang = True
+    monkeypatch.setattr(conn, "DB_POOL_TIMEOUT", 0.01)
+    timeouts = conn.async_pool_stats()["timeouts"]
+
+    async def request():
+        async with conn.async_pooled_connection():
+            pass
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(request())
+    assert conn.async_pool_stats()["timeouts"] == timeouts + 1
+    assert primary.released == []
+
+
+def test_reads_go_to_healthy_replica(servers):
+    primary, replica = servers
+    assert asyncio.run(read_connection_name()) == "replica"
+    assert replica.released == [replica.connection]
+
+
+def test_lagging_replica_falls_back_to_primary(servers):
+    primary, replica = servers
+    replica.connection.lag = 30
+    assert asyncio.run(read_connection_name()) == "primary"
+    # The replica connection used for the lag check goes back to its pool.
+    assert replica.released == [replica.connection]
+    assert conn.replica_monitor.stats()["fallbacks"] == 1
+
+
+def test_unreachable_replica_falls_back_and_backs_off(servers):
+    primary, replica = servers
+    replica.down = True
+    assert asyncio.run(read_connection_name()) == "primary"
+    replica.down = False
+    # Still inside the retry window: the replica is not tried again yet.
+    assert asyncio.run(read_connection_name()) == "primary"
+    assert conn.replica_monitor.stats()["failures"] == 1
+    assert replica.connection.queries == []
@@ -0,0 +1,170 @@
+from datetime import datetime
+from decimal import Decimal
+import pytest
+from fastapi.testclient import TestClient
+from api import main
+from api.db import cart as cart_db
+from api.db.conn import get_db
+from api.dependencies import get_current_user
+from api.db.querycount import CountingCursor, query_counter
+from tests.test_checkout import FakeDB
+
+PRODUCTS = {
+    1: {"name": "Lamp", "description": None, "price": Decimal("20.00"), "image_url": None, "stock": 5, "category_id": 1, "created_at": datetime(2025, 1, 1)},
+    2: {"name": "Chair", "description": None, "price": Decimal("45.00"), "image_url": None, "stock": 2, "category_id": 1, "created_at": datetime(2025, 1, 1)},
+}
+PRODUCTS.update({product_id: dict(PRODUCTS[1], name=f"Item {product_id}") for product_id in range(3, 33)})
+
+
+class CartCursor:
+    """carts and cart_items for one user, answering the cart statements."""
+
+    def __init__(self, items=None, cart_id=None):
+        self.cart_id = cart_id
+        self.items = dict(items or {})  # product id -> (item id, quantity)
+        self.rows = []
+        self.lastrowid = None
+        self.rowcount = -1
+
+    def _item_rows(self):
+        return [
+            dict(PRODUCTS[product_id], cart_id=self.cart_id, id=item_id, quantity=quantity, product_id=product_id)
+            for product_id, (item_id, quantity) in sorted(self.items.items(), key=lambda item: item[1][0])
+        ]
+
+    def execute(self, query, params=None):
+        if query == cart_db.CART_UPSERT:
+            self.cart_id = self.cart_id or 3
+            self.lastrowid = self.cart_id
+        elif query == cart_db.CART_ITEM_UPSERT:
+            cart_id, quantity, product_id, _ = params
+            if product_id not in PRODUCTS:
+                self.rowcount = 0
+                return
+            item_id, current = self.items.get(product_id, (100 + len(self.items), 0))
+            self.items[product_id] = (item_id, current + quantity)
+            self.rowcount = 1 if current == 0 else 2
+        elif query == cart_db.CART_ITEM_DECREMENT:
+            quantity, _, product_id = params
+            if product_id in self.items:
+                item_id, current = self.items[product_id]
+                self.items[product_id] = (item_id, current + quantity)
+        elif query == cart_db.CART_ITEM_DELETE_EMPTY:
+            self.items = {product_id: item for product_id, item in self.items.items() if item[1] > 0}
+        elif query == cart_db.CART_ITEM_REMOVE:
+            self.items = {product_id: item for product_id, item in self.items.items() if item[0] != params[0]}
+        elif query.startswith("SELECT id FROM products WHERE id IN"):
+            self.rows = [{"id": product_id} for product_id in params if product_id in PRODUCTS]
+        elif query.startswith("INSERT INTO cart_items (cart_id, product_id, quantity) VALUES"):
+            add = "cart_items.quantity + VALUES(quantity)" in query
+            for i in range(0, len(params), 3):
+                _, product_id, quantity = params[i:i + 3]
+                item_id, current = self.items.get(product_id, (100 + len(self.items), 0))
+                self.items[product_id] = (item_id, current + quantity if add else quantity)
+        elif query.startswith("DELETE FROM cart_items WHERE cart_id = %s AND product_id IN"):
+            self.items = {product_id: item for product_id, item in self.items.items() if product_id not in params[1:] or item[1] > 0}
+        elif query == cart_db.USER_CART_QUERY:
+            if self.cart_id is None:
+                self.rows = []
+            else:
+                self.rows = self._item_rows() or [{"cart_id": self.cart_id, "id": None, "quantity": None, "product_id": None}]
+        elif query == cart_db.CART_ITEMS_QUERY:
+            self.rows = self._item_rows()
+
+    def fetchall(self):
+        return self.rows
+
+
+def run(cursor, fn, *args):
+    db = FakeDB()
+    with query_counter() as counter:
+        cart = fn((db, CountingCursor(cursor)), 9, *args)
+    return cart, counter.count, db
+
+
+def test_adding_an_item_takes_three_round_trips():
+    cursor = CartCursor()
+    cart, count, db = run(cursor, cart_db.add_to_cart, 1, 2)
+    assert count == 3 and db.committed
+    assert cart["id"] == 3 and cart["total_price"] == Decimal("40.00")
+
+    cart, count, _ = run(cursor, cart_db.add_to_cart, 1, 1)
+    assert count == 3
+    assert [(item["product"]["id"], item["quantity"]) for item in cart["items"]] == [(1, 3)]
+
+
+def test_taking_the_last_units_out_removes_the_item():
+    cursor = CartCursor({1: (100, 2), 2: (101, 1)}, cart_id=3)
+    cart, count, _ = run(cursor, cart_db.add_to_cart, 1, -2)
+    assert count == 4
+    assert [item["product"]["id"] for item in cart["items"]] == [2]
+
+
+def test_unknown_product_is_rolled_back():
+    cursor = CartCursor()
+    with pytest.raises(ValueError):
+        run(cursor, cart_db.add_to_cart, 99, 1)
+    assert cursor.items == {}
+
+
+def test_cart_reads_and_removal_are_single_statements():
+    cursor = CartCursor({1: (100, 2), 2: (101, 1)}, cart_id=3)
+    cart, count, _ = run(cursor, cart_db.get_cart_by_user_id)
+    assert count == 1 and len(cart["items"]) == 2
+
+    cart, count, _ = run(cursor, cart_db.remove_from_cart, 100)
+    assert count == 2 and [item["id"] for item in cart["items"]] == [101]
+
+    cart, count, _ = run(cursor, cart_db.remove_from_cart, 101)
+    assert count == 2 and cart["id"] == 3 and cart["items"] == [] and cart["total_price"] == 0
+
+
+def test_first_visit_creates_the_cart():
+    cart, count, db = run(CartCursor(), cart_db.get_cart_by_user_id)
+    assert count == 2 and db.committed
+    assert cart == {"id": 3, "user_id": 9, "items": [], "total_price": 0}
+
+
+def test_batch_operations_fold_per_product():
+    sets, deltas = cart_db.fold_cart_operations([(2, None, 1), (1, 3, None), (2, None, 2), (1, None, -5), (4, None, 1), (4, None, -1)])
+    assert sets == {1: 0} and deltas == {2: 3}
+
+
+def test_batch_cost_does_not_grow_with_the_batch():
+    cursor = CartCursor({1: (100, 2)}, cart_id=3)
+    operations = [(product_id, None, 1) for product_id in range(3, 33)] + [(1, 0, None)]
+    cart, count, db = run(cursor, cart_db.update_cart_items, operations)
+    # product check, cart upsert, set upsert, add upsert, delete emptied, cart read
+    assert count == 6 and db.committed
+    assert [item["product"]["id"] for item in cart["items"]] == list(range(3, 33))
+
+
+def test_batch_with_an_unknown_product_changes_nothing():
+    cursor = CartCursor({1: (100, 2)}, cart_id=3)
+    with pytest.raises(ValueError, match="Products not found: 99"):
+        run(cursor, cart_db.update_cart_items, [(1, None, 1), (99, None, 1)])
+    assert cursor.items == {1: (100, 2)}
+
+
+@pytest.fixture
+def cart_client():
+    cursor = CartCursor({1: (100, 2)}, cart_id=3)
+
+    def fake_db():
+        yield FakeDB(), cursor
+
+    main.api.dependency_overrides[get_db] = fake_db
+    main.api.dependency_overrides[get_current_user] = lambda: {"id": 9, "role": "user"}
+    yield TestClient(main.api), cursor
+    main.api.dependency_overrides.clear()
+
+
+def test_batch_endpoint(cart_client):
+    client, cursor = cart_client
+    response = client.post("/cart/items:batch", json={"items": [{"product_id": 1, "delta": 1}, {"product_id": 2, "quantity": 2}]})
+    assert response.status_code == 200
+    assert [(item["product"]["id"], item["quantity"]) for item in response.json()["items"]] == [(1, 3), (2, 2)]
+
+    assert client.post("/cart/items:batch", json={"items": [{"product_id": 99, "delta": 1}]}).status_code == 404
+    assert client.post("/cart/items:batch", json={"items": [{"product_id": 1, "delta": 1, "quantity": 1}]}).status_code == 422
+    assert client.post("/cart/items:batch", json={"items": []}).status_code == 422
@@ -0,0 +1,99 @@
+import asyncio
+from contextlib import asynccontextmanager
+import pytest
+from api.core.cache import SnapshotCache
+from api.core.notify import FileNotifier
+from api.db import categories
+from api.db.aio import categories as aio_categories
+from api.db.categories import select_categories, invalidate_category_caches
+
+ROWS = [
+    {"id": 1, "name": "Lamps", "slug": "lamps", "version": 1},
+    {"id": 2, "name": "books", "slug": "books", "version": 1},
+    {"id": 3, "name": "Bags", "slug": "bags", "version": 2},
+    {"id": 4, "name": "Tables", "slug": "home-tables", "version": 1},
+]
+
+
+def ids(rows):
+    return [row["id"] for row in rows]
+
+
+def test_select_matches_sql_ordering_and_paging():
+    assert ids(select_categories(ROWS, sort="name")) == [3, 2, 1, 4]
+    assert ids(select_categories(ROWS, sort="-id", limit=2, offset=1)) == [3, 2]
+    assert ids(select_categories(ROWS, "BA")) == [3]
+    assert ids(select_categories(ROWS, "home")) == [4]
+
+
+def test_select_seeks_like_keyset_queries():
+    assert ids(select_categories(ROWS, sort="name", seek=("books", 2), limit=2)) == [1, 4]
+    # Backwards scans come back in scan order; the router reverses them.
+    assert ids(select_categories(ROWS, sort="name", seek=("Lamps", 1), backwards=True)) == [2, 3]
+
+
+def test_write_in_another_worker_invalidates(tmp_path):
+    first = SnapshotCache("categories", FileNotifier(str(tmp_path)))
+    second = SnapshotCache("categories", FileNotifier(str(tmp_path)))
+    for cache in (first, second):
+        cache.store(ROWS, cache.begin_load())
+        assert cache.get() is ROWS
+
+    first.invalidate()
+    assert first.get() is None
+    assert second.get() is None
+
+
+def test_write_during_load_is_not_cached(tmp_path):
+    cache = SnapshotCache("categories", FileNotifier(str(tmp_path)))
+    version = cache.begin_load()
+    FileNotifier(str(tmp_path)).publish("categories")
+    cache.store(ROWS, version)
+    assert cache.get() is None
+
+
+def test_snapshot_expires(tmp_path):
+    cache = SnapshotCache("categories", FileNotifier(str(tmp_path)), ttl=-1)
+    cache.store(ROWS, cache.begin_load())
+    assert cache.get() is None
+
+
+@pytest.fixture
+def cached(monkeypatch, tmp_path):
+    cache = SnapshotCache("categories", FileNotifier(str(tmp_path)))
+    monkeypatch.setattr(categories, "category_cache", cache)
+    monkeypatch.setattr(aio_categories, "category_cache", cache)
+    monkeypatch.setattr(aio_categories, "CATEGORY_CACHE_ENABLED", True)
+    loads = []
+
+    class TableCursor:
+        async def execute(self, query, params=None):
+            loads.append(query)
+
+        async def fetchall(self):
+            return [dict(row) for row in ROWS]
+
+    @asynccontextmanager
+    async def primary():
+        yield None, TableCursor()
+
+    monkeypatch.setattr(aio_categories, "async_pooled_connection", primary)
+    return loads
+
+
+def test_reads_are_served_from_one_load(cached):
+    async def reads():
+        page = await aio_categories.get_all_categories(None, limit=2, sort="name")
+        total = await aio_categories.count_categories(None, "a")
+        category = await aio_categories.get_category_by_id(None, 4)
+        return page, total, category
+
+    page, total, category = asyncio.run(reads())
+    assert ids(page) == [3, 2]
+    assert total == 3
+    assert category["slug"] == "home-tables"
+    assert len(cached) == 1
+
+    invalidate_category_caches([4])
+    asyncio.run(aio_categories.get_category_by_id(None, 4))
+    assert len(cached) == 2
@@ -0,0 +1,87 @@
+from datetime import datetime
+from decimal import Decimal
+import pytest
+from api.db import orders as orders_db
+from api.db.querycount import CountingCursor, query_counter
+
+CHECKOUT_AT = datetime(2025, 3, 1, 12, 30)
+
+
+def cart_rows(n):
+    return [
+        {
+            "cart_id": 3, "id": 100 + i, "quantity": 2, "product_id": i, "name": f"Product {i}", "description": None,
+            "price": Decimal("1.50"), "image_url": None, "stock": 10, "category_id": 1, "created_at": CHECKOUT_AT,
+            "checkout_at": CHECKOUT_AT,
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+class CheckoutCursor:
+    def __init__(self, rows, fail_on=None):
+        self.rows = rows
+        self.fail_on = fail_on
+        self.statements = []
+        self.lastrowid = None
+        self.rowcount = -1
+
+    def execute(self, query, params=None):
+        self.statements.append((query, params))
+        if self.fail_on and self.fail_on in query:
+            raise RuntimeError("lost connection")
+        if query.strip().startswith("INSERT INTO orders"):
+            self.lastrowid = 77
+        if query.startswith("UPDATE products SET stock"):
+            # Every product has enough stock.
+            self.rowcount = len({row["product_id"] for row in self.rows})
+
+    def executemany(self, query, rows):
+        self.statements.append((query, rows))
+        self.lastrowid = 500
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeDB:
+    def __init__(self):
+        self.committed = False
+        self.rolled_back = False
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+@pytest.mark.parametrize("n", [1, 200])
+def test_checkout_round_trips_do_not_grow_with_the_cart(n):
+    cursor, db = CheckoutCursor(cart_rows(n)), FakeDB()
+    with query_counter() as counter:
+        order = orders_db.create_order((db, CountingCursor(cursor)), 9, "Street 1")
+    assert counter.count == 7
+    assert db.committed
+    assert "FOR UPDATE OF c, ci" in cursor.statements[0][0]
+    inserted = [params for query, params in cursor.statements if query == orders_db.ORDER_ITEMS_INSERT][0]
+    assert len(inserted) == n and inserted[0] == (77, 1, 2, Decimal("1.50"))
+
+    assert order["id"] == 77 and order["status"] == "pending" and order["created_at"] == CHECKOUT_AT
+    assert order["total_price"] == Decimal("3.00") * n
+    assert [item["id"] for item in order["items"]] == list(range(500, 500 + n))
+    assert order["items"][0]["product_name"] == "Product 1"
+
+
+def test_empty_cart_releases_its_locks():
+    cursor, db = CheckoutCursor([]), FakeDB()
+    with pytest.raises(ValueError):
+        orders_db.create_order((db, cursor), 9, "Street 1")
+    assert db.rolled_back and len(cursor.statements) == 1
+
+
+def test_failed_checkout_is_rolled_back():
+    cursor, db = CheckoutCursor(cart_rows(3), fail_on="DELETE FROM cart_items"), FakeDB()
+    with pytest.raises(RuntimeError):
+        orders_db.create_order((db, cursor), 9, "Street 1")
+    assert db.rolled_back and not db.committed
@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from api.core.cache import TTLCache
+from api.db.counts import count_with_strategy, resolve_count_strategy
+from api.db.products import invalidate_product_caches
+from api.db import counts
+
+
+class Counter:
+    def __init__(self, exact=42, estimate=40):
+        self.exact_calls = 0
+        self.estimate_calls = 0
+        self._exact = exact
+        self._estimate = estimate
+
+    async def exact(self):
+        self.exact_calls += 1
+        return self._exact
+
+    async def estimate(self):
+        self.estimate_calls += 1
+        return self._estimate
+
+
+def run(strategy, cache, key, counter):
+    return asyncio.run(count_with_strategy(strategy, cache, key, counter.exact, counter.estimate))
+
+
+def test_cached_strategy_counts_once_per_filter_set():
+    cache, counter = TTLCache(), Counter()
+    assert run("cached", cache, ("lamp", None), counter) == (42, False)
+    assert run("cached", cache, ("lamp", None), counter) == (42, False)
+    assert run("cached", cache, ("desk", None), counter) == (42, False)
+    assert counter.exact_calls == 2
+    assert cache.stats()["hits"] == 1
+
+
+def test_estimate_only_for_unfiltered_queries():
+    cache, counter = TTLCache(), Counter()
+    assert run("estimate", cache, (None, None), counter) == (40, True)
+    assert run("estimate", cache, ("lamp", None), counter) == (42, False)
+    assert counter.estimate_calls == 1
+
+
+def test_none_strategy_skips_counting():
+    counter = Counter()
+    assert run("none", TTLCache(), (None,), counter) == (None, False)
+    assert counter.exact_calls == 0
+
+
+def test_resolve_count_strategy():
+    assert resolve_count_strategy("exact") == "exact"
+    assert resolve_count_strategy("exact", include_total=False) == "none"
+    with pytest.raises(ValueError):
+        resolve_count_strategy("guess")
+
+
+def test_product_writes_invalidate_cached_totals():
+    counts.product_counts.set((None, None, None, None), 10)
+    invalidate_product_caches([1])
+    assert counts.product_counts.get((None, None, None, None)) is None
+
+
+def test_ttl_cache_expiry_and_lru():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    cache.set("d", 4, ttl=-1)
+    assert cache.get("d") is None
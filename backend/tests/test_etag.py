@@ -0,0 +1,84 @@
+from datetime import datetime
+from decimal import Decimal
+import pytest
+from fastapi.testclient import TestClient
+from api import main
+from api.core.etag import etag_matches, make_etag
+from api.db.aio.conn import get_async_read_db
+from api.db.categories import build_update_category_query, categories_etag, categories_etag_for_rows
+from api.db.products import build_update_product_query
+
+
+def test_if_none_match_comparison():
+    etag = make_etag("product", 1, 2, 3)
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(make_etag("product", 1, 3, 3), etag)
+    assert not etag_matches(None, etag)
+
+
+def test_writes_bump_row_versions():
+    query, _ = build_update_product_query(7, price=10)
+    assert query == "UPDATE products SET price = %s, version = version + 1 WHERE id = %s"
+    query, _ = build_update_category_query(3, name="Lamps")
+    assert "version = version + 1" in query
+    assert build_update_product_query(7) is None
+
+
+def test_collection_etag_from_rows_matches_aggregate():
+    rows = [{"id": 1, "version": 1}, {"id": 4, "version": 3}]
+    assert categories_etag_for_rows(rows) == categories_etag(2, 4, Decimal(4))
+    assert categories_etag_for_rows([]) == categories_etag(0, 0, 0)
+
+
+class CatalogCursor:
+    def __init__(self):
+        self.product = {
+            "id": 5, "name": "Lamp", "description": None, "price": Decimal("20.00"), "image_url": None, "stock": 3,
+            "category_id": 1, "created_at": datetime(2025, 1, 1), "category_name": "Home",
+            "version": 2, "category_version": 1,
+        }
+        self.queries = []
+        self.row = None
+
+    async def execute(self, query, params=None):
+        self.queries.append(query)
+        if "SELECT p.id, p.version" in query:
+            self.row = {key: self.product[key] for key in ("id", "version", "category_version")}
+        else:
+            self.row = self.product
+
+    async def fetchone(self):
+        return self.row
+
+
+@pytest.fixture
+def catalog():
+    cursor = CatalogCursor()
+
+    async def fake_db():
+        yield None, cursor
+
+    main.api.dependency_overrides[get_async_read_db] = fake_db
+    yield TestClient(main.api), cursor
+    main.api.dependency_overrides.clear()
+
+
+def test_product_revalidation_returns_304(catalog):
+    client, cursor = catalog
+    first = client.get("/products/5")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    cursor.queries.clear()
+    second = client.get("/products/5", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert len(cursor.queries) == 1 and "SELECT p.id, p.version" in cursor.queries[0]
+
+    # A write (here: the category being renamed) changes the ETag.
+    cursor.product["category_version"] = 2
+    third = client.get("/products/5", headers={"If-None-Match": etag})
+    assert third.status_code == 200
+    assert third.headers["ETag"] != etag
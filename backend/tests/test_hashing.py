@@ -0,0 +1,63 @@
+import asyncio
+import time
+from fastapi.testclient import TestClient
+from passlib.hash import argon2
+from api import main
+from api.core.hashing import HashPool, HashPoolBusy
+from api.core.security import verify_and_update_password
+from api.db.aio.conn import get_async_db
+from api.routers import auth
+
+
+def test_admission_limit_rejects_excess_calls():
+    pool = HashPool(workers=0, max_pending=2)
+
+    async def burst():
+        return await asyncio.gather(*(pool.run(time.sleep, 0.1) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert sum(isinstance(result, HashPoolBusy) for result in results) == 1
+    stats = pool.stats()
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 2
+    assert stats["pending"] == 0
+
+
+def test_calls_run_in_worker_processes():
+    pool = HashPool(workers=1, max_pending=4)
+    try:
+        assert asyncio.run(pool.run(pow, 2, 10)) == 1024
+    finally:
+        pool.shutdown()
+
+
+def test_hashes_with_other_cost_are_upgraded():
+    old_hash = argon2.using(rounds=1, memory_cost=1024, parallelism=1).hash("password123")
+    valid, new_hash = verify_and_update_password("password123", old_hash)
+    assert valid
+    assert new_hash is not None and new_hash != old_hash
+    assert verify_and_update_password("password123", new_hash) == (True, None)
+    assert verify_and_update_password("wrong", old_hash) == (False, None)
+
+
+class NoUserCursor:
+    async def execute(self, query, params=None):
+        pass
+
+    async def fetchone(self):
+        return None
+
+
+def test_saturated_hasher_answers_503(monkeypatch):
+    async def fake_db():
+        yield None, NoUserCursor()
+
+    monkeypatch.setattr(auth, "password_hasher", HashPool(workers=0, max_pending=0))
+    main.api.dependency_overrides[get_async_db] = fake_db
+    try:
+        response = TestClient(main.api).post("/auth/register", json={"email": "new@example.com", "password": "password123"})
+    finally:
+        main.api.dependency_overrides.clear()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
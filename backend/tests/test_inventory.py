@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+import pytest
+from api.db import orders as orders_db
+from tests.test_checkout import FakeDB, cart_rows
+
+CHECKOUT_AT = datetime(2025, 3, 1, 12, 30)
+
+
+class InventoryCursor:
+    """Products, orders and order items, enough for checkout and cancellation."""
+
+    def __init__(self, stock, cart=(), orders=(), items=()):
+        self.stock = dict(stock)
+        self.cart = list(cart)
+        self.orders = {order["id"]: dict(order) for order in orders}
+        self.items = list(items)
+        self.queries = []
+        self.rows = []
+        self.lastrowid = None
+        self.rowcount = -1
+
+    def _quantities(self, params, count):
+        return dict(zip(params[0:2 * count:2], params[1:2 * count:2]))
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+        query = query.strip()
+        if query.startswith("SELECT c.id as cart_id"):
+            self.rows = self.cart
+        elif query.startswith("INSERT INTO orders"):
+            self.lastrowid = 77
+            self.orders[77] = {"id": 77, "status": "pending", "total_price": params[1], "stock_reserved": True, "reserved_until": params[5]}
+        elif query.startswith("UPDATE products SET stock = stock -"):
+            quantities = self._quantities(params, (len(params)) // 5)
+            matched = [id for id, quantity in quantities.items() if self.stock[id] >= quantity]
+            for id in matched:
+                self.stock[id] -= quantities[id]
+            self.rowcount = len(matched)
+        elif query.startswith("UPDATE products SET stock = stock +"):
+            for id, quantity in self._quantities(params, len(params) // 3).items():
+                self.stock[id] += quantity
+        elif "FOR UPDATE" in query:
+            order = self.orders.get(params[0])
+            self.rows = [dict(order)] if order else []
+        elif query == orders_db.ORDER_RESERVED_ITEMS_QUERY:
+            self.rows = [item for item in self.items if item["order_id"] == params[0]]
+        elif query.startswith("UPDATE orders"):
+            self.orders[params[1]]["status"] = params[0]
+            if "stock_reserved = FALSE" in query:
+                self.orders[params[1]]["stock_reserved"] = False
+        elif "reserved_until < NOW()" in query:
+            self.rows = [{"id": id} for id, order in self.orders.items() if order["status"] == "pending" and order.get("reserved_until")]
+        elif "FROM orders WHERE id" in query:
+            self.rows = [dict(self.orders[params[0]])]
+        else:
+            self.rows = []
+
+    def executemany(self, query, rows):
+        self.queries.append(query)
+        self.lastrowid = 500
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_reservation_locks_products_in_id_order():
+    quantities = orders_db.stock_quantities([(9, 1), (2, 3), (9, 2), (None, 5)])
+    assert quantities == {2: 3, 9: 3}
+    query, params = orders_db.build_stock_reservation(quantities)
+    assert "WHERE id IN (%s, %s) AND stock >= CASE id" in query
+    assert params == (2, 3, 9, 3, 2, 9, 2, 3, 9, 3)
+
+
+def test_checkout_reserves_stock():
+    cursor, db = InventoryCursor({1: 5, 2: 2}, cart=cart_rows(2)), FakeDB()
+    order = orders_db.create_order((db, cursor), 9, "Street 1")
+    assert db.committed
+    assert cursor.stock == {1: 3, 2: 0}
+    assert order["reserved_until"] == CHECKOUT_AT + timedelta(minutes=orders_db.ORDER_RESERVATION_MINUTES)
+    assert cursor.queries[-1].startswith("UPDATE products SET stock = stock -")
+
+
+def test_checkout_without_enough_stock_is_rolled_back():
+    rows = cart_rows(2)
+    rows[1]["stock"] = 1
+    cursor, db = InventoryCursor({1: 5, 2: 1}, cart=rows), FakeDB()
+    with pytest.raises(ValueError, match="Insufficient stock for: Product 2"):
+        orders_db.create_order((db, cursor), 9, "Street 1")
+    assert db.rolled_back and not db.committed
+
+
+def reserved_order(status="pending", **fields):
+    order = {"id": 1, "status": status, "total_price": Decimal("30.00"), "stock_reserved": True, "reserved_until": CHECKOUT_AT}
+    order.update(fields)
+    return order
+
+
+ITEMS = [{"order_id": 1, "product_id": 4, "quantity": 2}, {"order_id": 1, "product_id": 3, "quantity": 1}]
+
+
+def test_cancelling_gives_the_stock_back_once():
+    cursor, db = InventoryCursor({3: 0, 4: 0}, orders=[reserved_order()], items=ITEMS), FakeDB()
+    orders_db.update_order_status((db, cursor), 1, "cancelled")
+    assert cursor.stock == {3: 1, 4: 2}
+    assert cursor.orders[1]["stock_reserved"] is False
+
+    orders_db.update_order_status((db, cursor), 1, "cancelled")
+    assert cursor.stock == {3: 1, 4: 2}
+    with pytest.raises(orders_db.OrderStatusConflict):
+        orders_db.update_order_status((db, cursor), 1, "pending")
+
+
+def test_orders_without_a_reservation_or_already_shipped_keep_the_stock():
+    for order in (reserved_order(stock_reserved=False), reserved_order("shipped")):
+        cursor, db = InventoryCursor({3: 0, 4: 0}, orders=[order], items=ITEMS), FakeDB()
+        orders_db.update_order_status((db, cursor), 1, "cancelled")
+        assert cursor.stock == {3: 0, 4: 0}
+
+
+def test_status_guard_is_checked_under_the_lock():
+    cursor, db = InventoryCursor({}, orders=[reserved_order("cancelled")]), FakeDB()
+    with pytest.raises(orders_db.OrderStatusConflict):
+        orders_db.update_order_status((db, cursor), 1, "processing", from_statuses=("pending",))
+    assert db.rolled_back and not db.committed
+
+
+def test_expired_reservations_are_cancelled():
+    orders = [reserved_order(), reserved_order(id=2, reserved_until=None)]
+    cursor, db = InventoryCursor({3: 0, 4: 0}, orders=orders, items=ITEMS), FakeDB()
+    assert orders_db.release_expired_reservations((db, cursor)) == [1]
+    assert cursor.orders[1]["status"] == "cancelled" and cursor.orders[2]["status"] == "pending"
+    assert cursor.stock == {3: 1, 4: 2}
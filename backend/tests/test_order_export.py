@@ -0,0 +1,98 @@
+import json
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+from fastapi.testclient import TestClient
+from api import main
+from api.core.export import stream_export
+from api.db import orders as orders_db
+from api.dependencies import get_current_admin_user
+from api.routers import orders as orders_router
+
+
+def export_rows(n_orders, items_per_order=2):
+    rows = []
+    for order_id in range(n_orders, 0, -1):
+        order = {"id": order_id, "user_id": 1, "total_price": Decimal("20.00"), "status": "pending", "shipping_address": "Street 1", "created_at": datetime(2025, 1, order_id)}
+        if not items_per_order:
+            rows.append(dict(order, item_id=None, product_id=None, quantity=None, price_at_purchase=None, product_name=None))
+        for k in range(items_per_order):
+            rows.append(dict(order, item_id=order_id * 10 + k, product_id=k + 1, quantity=1, price_at_purchase=Decimal("10.00"), product_name=f"Product {k + 1}"))
+    return rows
+
+
+class StreamingCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.position = 0
+        self.fetches = []
+
+    def execute(self, query, params=None):
+        self.query, self.params = query, params
+
+    def fetchmany(self, size):
+        chunk = self.rows[self.position:self.position + size]
+        self.position += len(chunk)
+        self.fetches.append(len(chunk))
+        return chunk
+
+
+def test_admin_query_filters_and_seek():
+    query, params = orders_db.build_all_orders_query(status="shipped", created_from="2025-01-01", created_to="2025-02-01", limit=51, seek=("2025-01-15 10:00:00", 90))
+    assert "o.status = %s" in query
+    assert "o.created_at >= %s AND o.created_at < %s" in query
+    assert "(o.created_at < %s OR (o.created_at = %s AND o.id < %s))" in query
+    assert query.endswith("ORDER BY o.created_at DESC, o.id DESC LIMIT %s")
+    assert params == ("shipped", "2025-01-01", "2025-02-01", "2025-01-15 10:00:00", "2025-01-15 10:00:00", 90, 51)
+
+
+def test_export_groups_items_across_chunk_boundaries():
+    # 3 rows per order with a chunk size of 2: every order spans two fetches.
+    cursor = StreamingCursor(export_rows(5, items_per_order=3))
+    orders = [order for chunk in orders_db.iter_orders_export((None, cursor), chunk_size=2) for order in chunk]
+    assert [order["id"] for order in orders] == [5, 4, 3, 2, 1]
+    assert all(len(order["items"]) == 3 for order in orders)
+    assert max(cursor.fetches) == 2
+
+
+def test_export_keeps_orders_without_items():
+    cursor = StreamingCursor(export_rows(2, items_per_order=0))
+    orders = [order for chunk in orders_db.iter_orders_export((None, cursor)) for order in chunk]
+    assert [order["items"] for order in orders] == [[], []]
+
+
+def test_csv_export_has_one_row_per_item():
+    cursor = StreamingCursor(export_rows(2))
+    chunks = orders_db.iter_orders_export((None, cursor))
+    text = "".join(stream_export(chunks, "csv", orders_db.ORDER_EXPORT_CSV_FIELDS, orders_db.flatten_export_order))
+    lines = text.strip().splitlines()
+    assert lines[0] == ",".join(orders_db.ORDER_EXPORT_CSV_FIELDS)
+    assert len(lines) == 1 + 4
+    assert lines[1].startswith("2,1,20.00,pending,Street 1,2025-01-02T00:00:00,20,1,1,10.00,Product 1")
+
+
+def test_export_endpoint_streams_ndjson(monkeypatch):
+    cursor = StreamingCursor(export_rows(30))
+
+    @contextmanager
+    def fake_streaming_cursor():
+        yield None, cursor
+
+    monkeypatch.setattr(orders_router, "streaming_cursor", fake_streaming_cursor)
+    monkeypatch.setattr(orders_router, "EXPORT_CHUNK_SIZE", 7)
+    main.api.dependency_overrides[get_current_admin_user] = lambda: {"id": 1, "role": "admin"}
+    try:
+        client = TestClient(main.api)
+        response = client.get("/orders/admin/export", params={"status": "pending"})
+        bad = client.get("/orders/admin/export", params={"format": "xml"})
+    finally:
+        main.api.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    orders = [json.loads(line) for line in response.text.splitlines()]
+    assert len(orders) == 30
+    assert orders[0]["total_price"] == "20.00"
+    assert cursor.params == ("pending",)
+    assert max(cursor.fetches) == 7
+    assert bad.status_code == 400
@@ -0,0 +1,111 @@
+import asyncio
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+from api import main
+from api.db.conn import get_db
+from api.db.querycount import CountingCursor, AsyncCountingCursor, query_counter
+from api.db import orders as orders_db
+from api.db.aio import orders as orders_aio
+from api.dependencies import get_current_user
+
+
+def make_orders(n):
+    orders = [
+        {"id": i, "user_id": 1, "total_price": 10.0, "status": "pending", "shipping_address": "Street 1", "created_at": datetime(2025, 1, 1)}
+        for i in range(1, n + 1)
+    ]
+    items = [
+        {"id": i * 10 + k, "order_id": i, "product_id": k, "quantity": 1, "price_at_purchase": 5.0, "product_name": f"Product {k}"}
+        for i in range(1, n + 1) for k in (1, 2)
+    ]
+    return orders, items
+
+
+class FakeCursor:
+    def __init__(self, orders, items):
+        self.orders = orders
+        self.items = items
+        self.rows = []
+
+    def execute(self, query, params=None):
+        if "FROM order_items" in query:
+            wanted = set(params)
+            self.rows = [dict(item) for item in self.items if item["order_id"] in wanted]
+        else:
+            self.rows = [dict(order) for order in self.orders]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class AsyncFakeCursor(FakeCursor):
+    async def execute(self, query, params=None):
+        FakeCursor.execute(self, query, params)
+
+    async def fetchall(self):
+        return self.rows
+
+
+@pytest.mark.parametrize("n", [1, 50, 500])
+def test_order_listing_query_count_is_constant(n):
+    orders, items = make_orders(n)
+    cursor = CountingCursor(FakeCursor(orders, items))
+    with query_counter() as counter:
+        result = orders_db.get_all_orders((None, cursor))
+    assert counter.count == 2
+    assert len(result) == n
+    assert [item["product_id"] for item in result[-1]["items"]] == [1, 2]
+
+
+def test_orders_without_items_get_empty_list():
+    orders, _ = make_orders(3)
+    cursor = CountingCursor(FakeCursor(orders, []))
+    with query_counter() as counter:
+        result = orders_db.get_orders_by_user((None, cursor), 1)
+    assert counter.count == 2
+    assert all(order["items"] == [] for order in result)
+
+
+def test_no_orders_skips_item_query():
+    cursor = CountingCursor(FakeCursor([], []))
+    with query_counter() as counter:
+        assert orders_db.get_orders_by_user((None, cursor), 1) == []
+    assert counter.count == 1
+
+
+@pytest.mark.parametrize("n", [1, 200])
+def test_async_order_listing_query_count_is_constant(n):
+    orders, items = make_orders(n)
+    cursor = AsyncCountingCursor(AsyncFakeCursor(orders, items))
+
+    async def list_orders():
+        with query_counter() as counter:
+            result = await orders_aio.get_orders_by_user((None, cursor), 1)
+        return counter.count, result
+
+    count, result = asyncio.run(list_orders())
+    assert count == 2
+    assert len(result) == n
+
+
+def test_request_query_count_header(monkeypatch):
+    orders, items = make_orders(20)
+
+    def fake_db():
+        yield None, CountingCursor(FakeCursor(orders, items))
+
+    monkeypatch.setattr(main, "QUERY_COUNT_HEADER", True)
+    main.api.dependency_overrides[get_db] = fake_db
+    main.api.dependency_overrides[get_current_user] = lambda: {"id": 1, "role": "user"}
+    try:
+        response = TestClient(main.api).get("/orders/")
+    finally:
+        main.api.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert len(response.json()) == 20
+    assert response.headers["X-Query-Count"] == "2"
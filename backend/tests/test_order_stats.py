@@ -0,0 +1,92 @@
+from datetime import date
+from decimal import Decimal
+from api.db import orders as orders_db
+
+
+class CountersCursor:
+    """Orders and order_status_totals, enough for update_order_status."""
+
+    def __init__(self, orders):
+        self.orders = {order["id"]: order for order in orders}
+        self.totals = {}
+        self.queries = []
+        self.row = None
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+        if "FOR UPDATE" in query:
+            order = self.orders.get(params[0])
+            self.row = dict(order) if order else None
+        elif query.startswith("UPDATE orders"):
+            self.orders[params[1]]["status"] = params[0]
+        elif "INSERT INTO order_status_totals" in query:
+            for i in range(0, len(params), 4):
+                status, slot, count, revenue = params[i:i + 4]
+                current = self.totals.get(status, (0, Decimal(0)))
+                self.totals[status] = (current[0] + count, current[1] + revenue)
+        elif "FROM orders WHERE id" in query:
+            self.row = dict(self.orders[params[0]])
+
+    def fetchone(self):
+        return self.row
+
+    def fetchall(self):
+        return []
+
+
+class FakeDB:
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def test_status_change_moves_the_counters():
+    cursor = CountersCursor([{"id": 1, "status": "pending", "total_price": Decimal("30.00")}])
+    cursor.totals = {"pending": (1, Decimal("30.00"))}
+    db = FakeDB()
+
+    order = orders_db.update_order_status((db, cursor), 1, "processing")
+    assert order["status"] == "processing"
+    assert cursor.totals == {"pending": (0, Decimal("0.00")), "processing": (1, Decimal("30.00"))}
+    assert db.commits == 1
+
+    # Setting the same status again does not count twice.
+    orders_db.update_order_status((db, cursor), 1, "processing")
+    assert cursor.totals["processing"] == (1, Decimal("30.00"))
+
+
+def test_unknown_order_releases_its_lock():
+    cursor = CountersCursor([])
+    db = FakeDB()
+    assert orders_db.update_order_status((db, cursor), 9, "shipped") is None
+    assert db.rollbacks == 1 and cursor.totals == {}
+
+
+def test_counter_rows_are_locked_in_status_order():
+    query, params = orders_db.build_status_totals_update(orders_db.status_change_deltas("shipped", "completed", Decimal(5)), slot=3)
+    assert params == ("completed", 3, 1, Decimal(5), "shipped", 3, -1, Decimal(-5))
+
+
+def test_counter_writes_spread_over_slots(monkeypatch):
+    monkeypatch.setattr(orders_db, "ORDER_TOTALS_SLOTS", 4)
+    slots = {orders_db.build_status_totals_update({"pending": (1, Decimal(5))})[1][1] for _ in range(200)}
+    assert slots == {0, 1, 2, 3}
+    assert "GROUP BY status" in orders_db.ORDER_STATUS_TOTALS_QUERY
+    assert "GROUP BY day" in orders_db.ORDER_DAILY_TOTALS_QUERY
+
+
+def test_stats_list_every_status_and_day():
+    stats = orders_db.order_stats_response(
+        [{"status": "pending", "order_count": 2, "revenue": Decimal("20.00")}, {"status": "processing", "order_count": 1, "revenue": Decimal("5.00")}],
+        [{"day": date(2025, 1, 1), "order_count": 3, "revenue": Decimal("25.00")}],
+    )
+    assert stats["pending_count"] == 3
+    assert list(stats["statuses"]) == list(orders_db.ORDER_STATUSES)
+    assert stats["statuses"]["cancelled"] == {"count": 0, "revenue": Decimal("0.00")}
+    assert stats["daily"] == [{"day": date(2025, 1, 1), "count": 3, "revenue": Decimal("25.00")}]
@@ -0,0 +1,92 @@
+import pytest
+from decimal import Decimal
+from fastapi.testclient import TestClient
+from api import main
+from api.db.aio.conn import get_async_read_db
+from api.db.pagination import encode_cursor, decode_cursor, keyset_clause, page_cursors
+from api.db.products import build_products_query
+
+
+def test_cursor_round_trip():
+    token = encode_cursor("-price", {"id": 7, "price": Decimal("12.50")}, "price")
+    assert decode_cursor(token, "-price") == (("12.50", 7), False)
+
+
+def test_cursor_rejects_other_sort_and_garbage():
+    token = encode_cursor("price", {"id": 7, "price": Decimal("1.00")}, "price")
+    with pytest.raises(ValueError):
+        decode_cursor(token, "name")
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor", "price")
+
+
+def test_keyset_clause_directions():
+    assert keyset_clause("p.id", "p.id", (5, 5), False, False) == (" AND p.id > %s", [5])
+    sql, params = keyset_clause("p.price", "p.id", ("9.99", 5), True, False)
+    assert sql == " AND (p.price < %s OR (p.price = %s AND p.id < %s))"
+    assert params == ["9.99", "9.99", 5]
+    # Walking backwards over an ascending sort scans descending.
+    assert keyset_clause("p.id", "p.id", (5, 5), False, True)[0] == " AND p.id < %s"
+
+
+def test_seek_query_keeps_filters():
+    query, params = build_products_query(search_query="lamp", category_id=3, limit=11, sort="price", seek=("10.00", 42))
+    assert "p.category_id = %s" in query
+    assert query.rstrip().endswith("ORDER BY p.price ASC, p.id ASC LIMIT %s")
+    assert "OFFSET" not in query
+    assert params == ("+lamp*", "+lamp*", 3, "10.00", "10.00", 42, 11)
+
+
+def test_page_cursors_forward_and_backward():
+    rows = [{"id": i} for i in range(1, 5)]
+    items, next_cursor, prev_cursor = page_cursors(list(rows), 3, "id", "id", False, has_previous=False)
+    assert [r["id"] for r in items] == [1, 2, 3]
+    assert decode_cursor(next_cursor, "id") == ((3, 3), False)
+    assert prev_cursor is None
+
+    # Backwards scan returns rows in descending order; items come back ascending.
+    back = [{"id": i} for i in (6, 5, 4)]
+    items, next_cursor, prev_cursor = page_cursors(back, 3, "id", "id", True, has_previous=True)
+    assert [r["id"] for r in items] == [4, 5, 6]
+    assert decode_cursor(next_cursor, "id") == ((6, 6), False)
+    assert prev_cursor is None
+
+
+def test_fulltext_query_builds_prefix_terms():
+    from api.db.products import fulltext_query
+    assert fulltext_query("Red LAMP for desk") == "+red* +lamp* +desk*"
+    assert fulltext_query("tv") is None
+    assert fulltext_query("the") is None
+
+
+def test_short_search_falls_back_to_like():
+    query, params = build_products_query(search_query="tv")
+    assert "LIKE" in query and "MATCH" not in query
+    assert params == ("%tv%", "%tv%")
+
+
+def test_relevance_seek_uses_having():
+    query, params = build_products_query(search_query="lamp", limit=11, sort="-relevance", seek=(1.5, 42))
+    assert "AS relevance" in query
+    assert "HAVING (relevance < %s OR (relevance = %s AND p.id < %s))" in query
+    assert query.rstrip().endswith("ORDER BY relevance DESC, p.id DESC LIMIT %s")
+    assert params == ("+lamp*", "+lamp*", 1.5, 1.5, 42, 11)
+
+
+def test_relevance_sort_requires_search():
+    with pytest.raises(ValueError):
+        build_products_query(sort="-relevance")
+
+
+@pytest.mark.parametrize("path", ["/products/paginated", "/categories/paginated"])
+@pytest.mark.parametrize("query", ["size=-5", "size=0", "size=100000", "page=0", "page=-3"])
+def test_page_and_size_are_checked_before_querying(path, query):
+    async def no_db():
+        yield None, None  # any query would fail
+
+    main.api.dependency_overrides[get_async_read_db] = no_db
+    try:
+        response = TestClient(main.api).get(f"{path}?{query}")
+    finally:
+        main.api.dependency_overrides.clear()
+    assert response.status_code == 400
@@ -0,0 +1,81 @@
+import threading
+import time
+import pytest
+from api.db.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+        self.rollbacks = 0
+
+    def is_connected(self):
+        return self.alive
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**kwargs):
+    created = []
+
+    def connect():
+        conn = FakeConnection()
+        created.append(conn)
+        return conn
+
+    return ConnectionPool(connect, **kwargs), created
+
+
+def test_connections_are_reused():
+    pool, created = make_pool(size=2)
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert len(created) == 1
+    assert conn.rollbacks == 1
+
+
+def test_checkout_times_out_when_exhausted():
+    pool, _ = make_pool(size=1, timeout=0.05)
+    pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    stats = pool.stats()
+    assert stats["exhausted"] == 1
+    assert stats["timeouts"] == 1
+
+
+def test_waiter_gets_released_connection():
+    pool, _ = make_pool(size=1, timeout=2)
+    conn = pool.acquire()
+    threading.Timer(0.05, pool.release, args=(conn,)).start()
+    assert pool.acquire() is conn
+    stats = pool.stats()
+    assert stats["waits"] == 1
+    assert stats["wait_time_max"] > 0
+
+
+def test_dead_connection_is_replaced_on_checkout():
+    pool, created = make_pool(size=1)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.alive = False
+    fresh = pool.acquire()
+    assert fresh is not conn
+    assert conn.closed
+    assert pool.stats()["invalidated"] == 1
+    assert len(created) == 2
+
+
+def test_old_connection_is_recycled():
+    pool, _ = make_pool(size=1, recycle=0.01)
+    conn = pool.acquire()
+    pool.release(conn)
+    time.sleep(0.02)
+    assert pool.acquire() is not conn
+    assert pool.stats()["recycled"] == 1
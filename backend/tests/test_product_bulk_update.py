@@ -0,0 +1,109 @@
+from decimal import Decimal
+import pytest
+from fastapi.testclient import TestClient
+from api import main
+from api.db import products as products_db
+from api.db.conn import get_db
+from api.db.querycount import CountingCursor, query_counter
+from api.dependencies import get_current_admin_user
+from tests.test_checkout import FakeDB
+
+
+class BulkCursor:
+    def __init__(self, products):
+        self.products = products  # id -> {"price", "stock", "version"}
+        self.queries = []
+        self.rows = []
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+        if query.startswith("SELECT id, price, stock FROM products"):
+            self.rows = [dict(self.products[id], id=id) for id in params if id in self.products]
+        elif query.startswith("UPDATE products SET"):
+            ids = params[-query.count("%s", query.index("WHERE")):]
+            values = iter(params)
+            for column in ("price", "stock"):
+                if f"{column} = CASE" in query:
+                    count = query.split(f"{column} = CASE id ")[1].split(" ELSE")[0].count("WHEN")
+                    for _ in range(count):
+                        id, value = next(values), next(values)
+                        self.products[id][column] = value
+            for id in ids:
+                self.products[id]["version"] += 1
+        else:
+            self.rows = []
+
+    def fetchall(self):
+        return self.rows
+
+
+def catalog(n):
+    return {id: {"price": Decimal("10.00"), "stock": 5, "version": 1} for id in range(1, n + 1)}
+
+
+@pytest.fixture
+def purged(monkeypatch):
+    calls = []
+    monkeypatch.setattr(products_db, "invalidate_product_caches", lambda ids=None: calls.append(ids))
+    return calls
+
+
+def test_merged_updates_are_rounded_and_ordered():
+    merged = products_db.merge_bulk_updates([(9, "1.005", None), (2, None, 4), (9, None, 7)])
+    assert merged == {2: (None, 4), 9: (Decimal("1.01"), 7)}
+
+
+def test_case_update_sets_only_the_given_columns():
+    query, params = products_db.build_bulk_update_query({3: {"price": Decimal("2.00")}, 5: {"price": Decimal("4.00"), "stock": 1}})
+    assert query == (
+        "UPDATE products SET price = CASE id WHEN %s THEN %s WHEN %s THEN %s ELSE price END, "
+        "stock = CASE id WHEN %s THEN %s ELSE stock END, version = version + 1 WHERE id IN (%s, %s)"
+    )
+    assert params == (3, Decimal("2.00"), 5, Decimal("4.00"), 5, 1, 3, 5)
+
+
+def test_bulk_update_reports_changes_and_missing_ids(purged):
+    cursor, db = BulkCursor(catalog(5)), FakeDB()
+    updates = [(1, Decimal("12.00"), None), (2, Decimal("10.00"), 5), (3, None, 0), (42, Decimal("1.00"), None)]
+    with query_counter() as counter:
+        changed, missing = products_db.bulk_update_products((db, CountingCursor(cursor)), updates, chunk_size=2)
+    assert (changed, missing) == ([1, 3], [42])
+    assert db.committed
+    # Chunks [1, 2], [3, 42]: a locking read and an UPDATE each (plus the
+    # search index refresh for the repriced product).
+    assert counter.count == 5
+    assert cursor.products[1] == {"price": Decimal("12.00"), "stock": 5, "version": 2}
+    assert cursor.products[2]["version"] == 1  # unchanged, left alone
+    assert cursor.products[3]["stock"] == 0
+    assert purged == [[1, 3]]
+
+
+def test_nothing_changed_purges_nothing(purged):
+    cursor, db = BulkCursor(catalog(2)), FakeDB()
+    assert products_db.bulk_update_products((db, cursor), [(1, Decimal("10"), 5)]) == ([], [])
+    assert purged == [] and not any(query.startswith("UPDATE") for query, _ in cursor.queries)
+
+
+def test_bulk_endpoint(purged):
+    cursor = BulkCursor(catalog(3))
+
+    def fake_db():
+        yield FakeDB(), cursor
+
+    main.api.dependency_overrides[get_db] = fake_db
+    main.api.dependency_overrides[get_current_admin_user] = lambda: {"id": 1, "role": "admin"}
+    try:
+        client = TestClient(main.api)
+        response = client.patch("/products/bulk", json={"items": [{"id": 1, "price": "11.50"}, {"id": 7, "stock": 3}]})
+        invalid = [
+            client.patch("/products/bulk", json={"items": [{"id": 1, "price": "2.00"}, item]})
+            for item in ({"id": 1}, {"id": 2, "stock": -5}, {"id": 2, "stock": 10**12}, {"id": 3, "price": "1e30"}, {"id": 3, "price": "-1"})
+        ]
+    finally:
+        main.api.dependency_overrides.clear()
+    assert response.status_code == 200
+    assert response.json() == {"changed": 1, "missing": [7]}
+    for response in invalid:
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["loc"][:3] == ["body", "items", 1]
+    assert cursor.products[1]["price"] == Decimal("11.50")
@@ -0,0 +1,70 @@
+import json
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+from fastapi.testclient import TestClient
+from api import main
+from api.core.export import stream_export
+from api.core.response_cache import ResponseCache, ResponseCacheMiddleware
+from api.db import products as products_db
+from api.dependencies import get_current_admin_user
+from api.routers import products as products_router
+from tests.test_order_export import StreamingCursor
+
+
+def product_rows(n):
+    return [
+        {
+            "id": i, "name": f"Product {i}", "description": None, "price": Decimal("9.50"), "image_url": None, "stock": 3,
+            "category_id": 1, "category_slug": "lamps", "category_name": "Lamps", "version": 1,
+            "created_at": datetime(2025, 1, 1), "updated_at": datetime(2025, 2, 1),
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+def test_incremental_export_query():
+    query, params = products_db.build_product_export_query(datetime(2025, 1, 1))
+    assert "WHERE p.updated_at >= %s" in query and query.endswith("ORDER BY p.id")
+    assert params == (datetime(2025, 1, 1),)
+    assert products_db.build_product_export_query()[1] == ()
+
+
+def test_csv_export_columns():
+    chunks = products_db.iter_products_export((None, StreamingCursor(product_rows(2))))
+    lines = "".join(stream_export(chunks, "csv", products_db.PRODUCT_EXPORT_FIELDS)).splitlines()
+    assert lines[0] == ",".join(products_db.PRODUCT_EXPORT_FIELDS)
+    assert lines[1] == "1,Product 1,,9.50,,3,1,lamps,Lamps,1,2025-01-01T00:00:00,2025-02-01T00:00:00"
+
+
+def test_export_is_never_served_from_the_response_cache():
+    middleware = ResponseCacheMiddleware(None, ResponseCache(None), main.RESPONSE_CACHE_RULES)
+    assert middleware.match("/products/export") is None
+    assert middleware.match("/products/12") is not None
+
+
+def test_export_endpoint_streams_in_chunks(monkeypatch):
+    cursor = StreamingCursor(product_rows(25))
+
+    @contextmanager
+    def fake_streaming_cursor():
+        yield None, cursor
+
+    monkeypatch.setattr(products_router, "streaming_cursor", fake_streaming_cursor)
+    monkeypatch.setattr(products_router, "EXPORT_CHUNK_SIZE", 10)
+    main.api.dependency_overrides[get_current_admin_user] = lambda: {"id": 1, "role": "admin"}
+    try:
+        client = TestClient(main.api)
+        response = client.get("/products/export", params={"updated_since": "2025-01-15T00:00:00"})
+        bad = client.get("/products/export", params={"format": "xml"})
+    finally:
+        main.api.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    products = [json.loads(line) for line in response.text.splitlines()]
+    assert [product["id"] for product in products] == list(range(1, 26))
+    assert products[0]["price"] == "9.50"
+    assert cursor.params == (datetime(2025, 1, 15),)
+    assert max(cursor.fetches) == 10
+    assert bad.status_code == 400
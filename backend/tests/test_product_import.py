@@ -0,0 +1,151 @@
+import mysql.connector
+import pytest
+from fastapi.testclient import TestClient
+from api import main
+from api.core.imports import iter_lines, iter_records
+from api.db import product_import
+from api.db.categories import category_cache
+from api.dependencies import get_current_admin_user
+from api.routers import products as products_router
+from tests.test_checkout import FakeDB
+
+CATEGORIES = [{"id": 1, "slug": "lamps", "name": "Lamps", "version": 1}, {"id": 2, "slug": "chairs", "name": "Chairs", "version": 1}]
+
+
+class ImportCursor:
+    def __init__(self, refuse=()):
+        self.refuse = set(refuse)  # product names the database refuses
+        self.batches = []
+        self.queries = []
+        self.rows = []
+        self.existing = {5}
+        self.next_id = 100
+        self.lastrowid = None
+        self.rowcount = -1
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+        self.rows = CATEGORIES if query.startswith("SELECT * FROM categories") else []
+
+    def executemany(self, query, rows):
+        self.batches.append((query, rows))
+        upsert = query == product_import.PRODUCT_IMPORT_UPSERT
+        names = [row[1] if upsert else row[0] for row in rows]
+        if self.refuse & set(names):
+            raise mysql.connector.Error(msg="Data too long for column 'name'", errno=1406)
+        if upsert:
+            self.rowcount = sum(2 if row[0] in self.existing else 1 for row in rows)
+        else:
+            self.lastrowid = self.next_id
+            self.next_id += len(rows)
+
+    def fetchall(self):
+        return self.rows
+
+
+@pytest.fixture(autouse=True)
+def fresh_categories():
+    category_cache.invalidate()
+    yield
+    category_cache.invalidate()
+
+
+def run_import(text: str, fmt: str, cursor, chunk_size=2, max_errors=10):
+    db = FakeDB()
+    chunks = [text.encode()[i:i + 7] for i in range(0, len(text.encode()), 7)]
+    summary = product_import.import_products((db, cursor), iter_records(iter_lines(chunks), fmt), chunk_size=chunk_size, max_errors=max_errors)
+    return summary, db
+
+
+def test_lines_survive_chunk_boundaries():
+    data = "﻿name\n\"Café\nlamp\"\r\nlast".encode()
+    lines = list(iter_lines(data[i:i + 1] for i in range(len(data))))
+    assert lines == ["name\n", "\"Café\n", "lamp\"\r\n", "last"]
+    assert [record for _, record in iter_records(lines, "csv")] == [{"name": "Café\nlamp"}, {"name": "last"}]
+
+
+def test_csv_rows_are_validated_and_written_in_chunks():
+    text = (
+        "id,name,price,stock,category_slug,category_id\n"
+        ",Desk lamp,19.99,4,lamps,\n"
+        ",Floor lamp,not a price,1,lamps,\n"
+        "5,Chair,45,2,,2\n"
+        ",Stool,12,1,stools,\n"
+        ",Armchair,99.50,,chairs,\n"
+        "77,Bench,30,1,,2\n"
+    )
+    cursor = ImportCursor()
+    summary, db = run_import(text, "csv", cursor)
+
+    assert summary["rows"] == 6
+    assert (summary["inserted"], summary["updated"], summary["failed"]) == (3, 1, 2)
+    assert [error["line"] for error in summary["errors"]] == [3, 5]
+    assert "price" in summary["errors"][0]["error"]
+    assert summary["errors"][1]["error"] == "Unknown category slug 'stools'"
+    # Chunks of two valid rows: [Desk lamp, Chair], [Armchair, Bench]
+    assert [len(rows) for _, rows in cursor.batches] == [1, 1, 1, 1]
+    assert cursor.queries.count("SELECT * FROM categories ORDER BY id") == 1
+
+
+def test_caches_are_invalidated_after_each_chunk(monkeypatch):
+    purged = []
+    monkeypatch.setattr(product_import, "invalidate_product_caches", lambda ids=None: purged.append(ids))
+    text = "\n".join(f'{{"name": "Lamp {i}", "price": 5, "category_id": 1}}' for i in range(5))
+    run_import(text, "ndjson", ImportCursor())
+    assert purged == [[100, 101], [102, 103], [104]]
+
+
+def test_a_refused_row_does_not_lose_its_chunk():
+    text = "\n".join([
+        '{"name": "Desk lamp", "price": 19.99, "category_id": 1}',
+        '{"name": "TOO LONG", "price": 1, "category_id": 1}',
+        '{"name": "Wall lamp", "price": 9, "category_id": 1}',
+        "[1, 2]",
+        "{broken",
+    ])
+    cursor = ImportCursor(refuse={"TOO LONG"})
+    summary, db = run_import(text, "ndjson", cursor, chunk_size=3)
+
+    assert (summary["inserted"], summary["failed"]) == (2, 3)
+    assert [(error["line"], error["error"]) for error in summary["errors"]][0] == (2, "Data too long for column 'name'")
+    assert [error["line"] for error in summary["errors"]] == [2, 4, 5]
+
+
+def test_errors_beyond_the_limit_are_only_counted():
+    text = "\n".join('{"name": "x"}' for _ in range(5))
+    summary, _ = run_import(text, "ndjson", ImportCursor(), max_errors=2)
+    assert summary["failed"] == 5 and len(summary["errors"]) == 2 and summary["errors_truncated"]
+
+
+def test_import_endpoint_streams_the_body(monkeypatch):
+    cursor = ImportCursor()
+
+    class FakeConnection:
+        def cursor(self, dictionary=False):
+            return cursor
+
+        def commit(self):
+            pass
+
+        def rollback(self):
+            pass
+
+    class FakePool:
+        def __enter__(self):
+            return FakeConnection()
+
+        def __exit__(self, *exc):
+            return False
+
+    cursor.close = lambda: None
+    monkeypatch.setattr(products_router, "pooled_connection", FakePool)
+    main.api.dependency_overrides[get_current_admin_user] = lambda: {"id": 1, "role": "admin"}
+    try:
+        client = TestClient(main.api)
+        body = "name,price,category_slug\nDesk lamp,19.99,lamps\nChair,45,chairs\n"
+        response = client.post("/products/import?format=csv", content=body.encode())
+        assert response.status_code == 200
+        assert response.json()["inserted"] == 2
+        assert client.post("/products/import?format=xml", content=b"").status_code == 400
+    finally:
+        main.api.dependency_overrides.clear()
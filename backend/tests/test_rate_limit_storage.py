@@ -0,0 +1,81 @@
+import os
+import pytest
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import SlidingWindowCounterRateLimiter
+from starlette.requests import Request
+from api.core import limiter as limiter_module
+from api.core import rate_limit_storage
+from api.core.limiter import get_real_ip
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(60 * 16000 + 20.0)  # 20 seconds into a minute window
+    monkeypatch.setattr(rate_limit_storage, "time", clock)
+    return clock
+
+
+def shm(tmp_path, slots=1024):
+    return storage_from_string(f"shm://{tmp_path / 'limits'}", slots=slots)
+
+
+def test_workers_share_one_limit(tmp_path, clock):
+    # Two storages on one file stand for two worker processes.
+    workers = [SlidingWindowCounterRateLimiter(shm(tmp_path)) for _ in range(2)]
+    item = parse("5/minute")
+    results = [workers[i % 2].hit(item, "1.2.3.4") for i in range(6)]
+    assert results == [True] * 5 + [False]
+    assert workers[0].hit(item, "5.6.7.8")
+
+
+def test_previous_window_is_weighted(tmp_path, clock):
+    limiter = SlidingWindowCounterRateLimiter(shm(tmp_path))
+    item = parse("10/minute")
+    for _ in range(10):
+        assert limiter.hit(item, "client")
+    # Halfway through the next window, half of the previous one still counts.
+    clock.now += 40 + 30
+    assert [limiter.hit(item, "client") for _ in range(6)] == [True] * 5 + [False]
+    # Two windows later it is forgotten.
+    clock.now += 120
+    assert limiter.hit(item, "client")
+
+
+def test_key_table_is_bounded(tmp_path, clock):
+    storage = shm(tmp_path, slots=16)
+    limiter = SlidingWindowCounterRateLimiter(storage)
+    item = parse("5/minute")
+    for i in range(100):
+        assert limiter.hit(item, f"10.0.0.{i}")
+    stats = storage.stats()
+    assert stats["live_keys"] == 16
+    assert stats["evictions"] == 84
+    assert os.path.getsize(tmp_path / "limits") == stats["bytes"]
+
+
+def test_other_table_size_reinitializes_the_file(tmp_path, clock):
+    SlidingWindowCounterRateLimiter(shm(tmp_path, slots=16)).hit(parse("5/minute"), "client")
+    assert shm(tmp_path, slots=32).stats() == {"slots": 32, "live_keys": 0, "evictions": 0, "bytes": 64 + 32 * 32}
+
+
+def request_from(forwarded_for):
+    headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for else []
+    return Request({"type": "http", "headers": headers, "client": ("9.9.9.9", 1234)})
+
+
+def test_client_supplied_forwarded_for_is_ignored(monkeypatch):
+    monkeypatch.setattr(limiter_module, "TRUSTED_PROXY_HOPS", 1)
+    assert get_real_ip(request_from("6.6.6.6, 1.2.3.4")) == "1.2.3.4"
+    assert get_real_ip(request_from("7.7.7.7, 1.2.3.4")) == "1.2.3.4"
+    assert get_real_ip(request_from(None)) == "9.9.9.9"
+    monkeypatch.setattr(limiter_module, "TRUSTED_PROXY_HOPS", 0)
+    assert get_real_ip(request_from("1.2.3.4")) == "9.9.9.9"
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+import pytest
+from fastapi.testclient import TestClient
+from api import main
+from api.db.aio.conn import get_async_read_db
+from api.db.pagination import decode_cursor
+from api.routers.reviews import (
+    ReviewCreate, PRODUCT_REVIEWS_SORT, build_rating_stats_upsert, build_product_reviews_query,
+    create_review_db, rating_stats_response,
+)
+
+
+def test_review_updates_its_histogram_bucket():
+    query, params = build_rating_stats_upsert(7, 4)
+    assert "rating_4 = rating_4 + 1" in query
+    assert "rating_5" not in query
+    assert params == (7, 4)
+
+
+def test_out_of_range_rating_is_rejected_before_any_query():
+    class NoQueries:
+        def execute(self, query, params=None):
+            raise AssertionError("no query expected")
+
+    with pytest.raises(ValueError):
+        create_review_db((None, NoQueries()), 1, ReviewCreate(product_id=7, order_id=1, rating=6))
+
+
+def test_stats_response():
+    row = {"rating_count": 3, "rating_sum": 11, "rating_1": 0, "rating_2": 0, "rating_3": 1, "rating_4": 0, "rating_5": 2}
+    stats = rating_stats_response(7, row)
+    assert stats["rating_average"] == Decimal("3.67")
+    assert stats["histogram"] == {1: 0, 2: 0, 3: 1, 4: 0, 5: 2}
+    assert rating_stats_response(7)["rating_average"] is None
+
+
+def test_reviews_query_seeks_on_created_at():
+    query, params = build_product_reviews_query(7, limit=21, seek=("2025-01-01 10:00:00", 40))
+    assert "r.created_at < %s OR (r.created_at = %s AND r.id < %s)" in query
+    assert query.endswith("ORDER BY r.created_at DESC, r.id DESC LIMIT %s")
+    assert params == (7, "2025-01-01 10:00:00", "2025-01-01 10:00:00", 40, 21)
+
+
+class ReviewsCursor:
+    def __init__(self, reviews):
+        self.reviews = reviews
+        self.row = None
+        self.rows = []
+
+    async def execute(self, query, params=None):
+        if "SELECT p.id, p.version" in query:
+            self.row = {"id": 7, "version": 3, "category_version": 1}
+        else:
+            self.rows = self.reviews[:params[-1]] if "LIMIT" in query else self.reviews
+
+    async def fetchone(self):
+        return self.row
+
+    async def fetchall(self):
+        return self.rows
+
+
+@pytest.fixture
+def client():
+    start = datetime(2025, 1, 1)
+    reviews = [
+        {"id": 10 - i, "user_id": 1, "product_id": 7, "rating": 5, "comment": None, "created_at": start - timedelta(hours=i), "user_name": "Ann"}
+        for i in range(5)
+    ]
+
+    async def fake_db():
+        yield None, ReviewsCursor(reviews)
+
+    main.api.dependency_overrides[get_async_read_db] = fake_db
+    yield TestClient(main.api)
+    main.api.dependency_overrides.clear()
+
+
+def test_reviews_are_paginated_by_cursor(client):
+    response = client.get("/reviews/product/7?size=2")
+    assert [review["id"] for review in response.json()] == [10, 9]
+    seek, backwards = decode_cursor(response.headers["X-Next-Cursor"], PRODUCT_REVIEWS_SORT)
+    assert seek == ("2024-12-31 23:00:00", 9) and not backwards
+    assert "X-Prev-Cursor" not in response.headers
+
+    # Without size or cursor the whole list is returned, as before.
+    assert len(client.get("/reviews/product/7").json()) == 5
+    assert client.get("/reviews/product/7?cursor=bogus").status_code == 400
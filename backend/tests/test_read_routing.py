@@ -0,0 +1,99 @@
+import pytest
+from api.db import conn
+from api.db.pool import ConnectionPool
+from api.db.replica import ReplicaMonitor, parse_replica_lag
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, params=None):
+        if self.connection.down:
+            raise ConnectionError("server gone")
+        self.connection.queries.append(query)
+
+    def fetchall(self):
+        if self.connection.lag is None:
+            return []
+        return [{"Seconds_Behind_Source": self.connection.lag}]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, name, lag=None, down=False):
+        self.name = name
+        self.lag = lag
+        self.down = down
+        self.queries = []
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self)
+
+    def is_connected(self):
+        return True
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def servers(monkeypatch):
+    primary = FakeConnection("primary")
+    replica = FakeConnection("replica", lag=0)
+
+    def connect_replica():
+        if replica.down:
+            raise ConnectionError("replica unreachable")
+        return replica
+
+    monkeypatch.setattr(conn, "get_pool", lambda: ConnectionPool(lambda: primary, size=1))
+    replica_pool = ConnectionPool(connect_replica, size=1)
+    monkeypatch.setattr(conn, "get_replica_pool", lambda: replica_pool)
+    monkeypatch.setattr(conn, "replica_monitor", ReplicaMonitor(max_lag=5, check_interval=0, retry_after=60))
+    return primary, replica
+
+
+def read_connection_name():
+    dependency = conn.get_read_db()
+    db, cursor = next(dependency)
+    dependency.close()
+    return db.name
+
+
+def test_reads_go_to_healthy_replica(servers):
+    assert read_connection_name() == "replica"
+
+
+def test_lagging_replica_falls_back_to_primary(servers):
+    primary, replica = servers
+    replica.lag = 30
+    assert read_connection_name() == "primary"
+    replica.lag = 1
+    assert read_connection_name() == "replica"
+
+
+def test_unreachable_replica_falls_back_and_backs_off(servers):
+    primary, replica = servers
+    replica.down = True
+    assert read_connection_name() == "primary"
+    replica.down = False
+    # Still inside the retry window: the replica is not tried again yet.
+    assert read_connection_name() == "primary"
+    assert conn.replica_monitor.stats()["failures"] == 1
+
+
+def test_no_replica_configured_uses_primary(servers, monkeypatch):
+    monkeypatch.setattr(conn, "get_replica_pool", lambda: None)
+    assert read_connection_name() == "primary"
+
+
+def test_parse_replica_lag():
+    assert parse_replica_lag(None) == 0.0
+    assert parse_replica_lag({"Seconds_Behind_Master": 3}) == 3.0
+    assert parse_replica_lag({"Seconds_Behind_Source": None}) is None
@@ -0,0 +1,210 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from api import main
+from api.core.notify import LocalNotifier
+from api.core.response_cache import MemoryBackend, RedisBackend, ResponseCache, response_cache
+from api.db.aio.conn import get_async_read_db
+from api.db.categories import invalidate_category_caches
+from api.db.products import invalidate_product_caches, invalidate_product_stock
+from tests.test_etag import CatalogCursor
+
+
+class FakeRedis:
+    """The subset of redis.Redis used by RedisBackend; ignores expiry."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, px=None):
+        self.data[key] = value
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+        return int(self.data[key])
+
+    def sadd(self, key, *members):
+        self.data.setdefault(key, set()).update(members)
+
+    def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    def expire(self, key, seconds):
+        pass
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+
+def entry(body: bytes):
+    return {"status": 200, "headers": [("content-type", "application/json")], "body": body}
+
+
+@pytest.mark.parametrize("make_backend", [lambda: MemoryBackend(1 << 20), lambda: RedisBackend(FakeRedis())])
+def test_purge_drops_tagged_entries_only(make_backend):
+    cache = ResponseCache(make_backend())
+
+    async def fill():
+        await cache.store("/products/1", entry(b"1"), 60, ["product:1"])
+        await cache.store("/products/2", entry(b"2"), 60, ["product:2"])
+        await cache.store("/products/", entry(b"[]"), 60, ["product:*"])
+        await cache.store("/categories/", entry(b"[]"), 60, ["category:*"])
+
+    async def cached(key):
+        return await cache.get(key) is not None
+
+    asyncio.run(fill())
+    cache.purge("product", [1])
+    assert [asyncio.run(cached(key)) for key in ("/products/1", "/products/2", "/products/", "/categories/")] == [False, True, False, True]
+
+    cache.purge("product")
+    assert not asyncio.run(cached("/products/2"))
+    assert asyncio.run(cached("/categories/"))
+    stats = cache.stats()
+    assert stats["hits"] == 3 and stats["misses"] == 3 and stats["hit_ratio"] == 0.5
+
+
+@pytest.mark.parametrize("make_backend", [lambda: MemoryBackend(1 << 20), lambda: RedisBackend(FakeRedis())])
+def test_responses_built_across_a_purge_are_not_stored(make_backend):
+    cache = ResponseCache(make_backend())
+
+    async def build(key, tags, write=None):
+        generation = await cache.generation(tags)
+        if write is not None:
+            write()  # committed and purged while the response was built
+        await cache.store(key, entry(b"old"), 60, tags, generation)
+        return await cache.get(key) is not None
+
+    assert not asyncio.run(build("/products/1", ["product:1"], lambda: cache.purge("product", [1])))
+    assert not asyncio.run(build("/products/2", ["product:2"], lambda: cache.purge("product")))
+    assert asyncio.run(build("/products/3", ["product:3"], lambda: cache.purge("category", [1])))
+    assert asyncio.run(build("/products/1", ["product:1"]))
+    assert cache.stats()["stale"] == 2
+
+
+@pytest.mark.parametrize("make_backend", [
+    lambda: MemoryBackend(1 << 20, purge_hold=60),
+    lambda: RedisBackend(FakeRedis(), purge_hold=60),
+])
+def test_purged_tags_are_held_for_replica_lag(make_backend):
+    cache = ResponseCache(make_backend())
+    cache.purge("product", [1])
+
+    async def build(key, tags):
+        await cache.store(key, entry(b"maybe old"), 60, tags, await cache.generation(tags))
+        return await cache.get(key) is not None
+
+    # Started after the purge, but a lagging replica may still serve the old row.
+    assert not asyncio.run(build("/products/1", ["product:1"]))
+    assert asyncio.run(build("/categories/", ["category:*"]))
+
+
+def test_memory_backend_is_bounded_by_bytes():
+    backend = MemoryBackend(max_bytes=2000)
+    for i in range(5):
+        backend.set(f"k{i}", entry(b"x" * 300), 60, [])
+    stats = backend.stats()
+    assert stats["bytes"] <= 2000
+    assert stats["evictions"] == 2
+    assert backend.get("k1") is None and backend.get("k2") is not None
+
+
+def test_purge_in_another_worker_clears_memory_cache():
+    notifier = LocalNotifier()
+    first, second = MemoryBackend(1 << 20, notifier), MemoryBackend(1 << 20, notifier)
+    for backend in (first, second):
+        backend.set("/products/1", entry(b"1"), 60, ["product:1"])
+    first.purge(["product:2"])
+    assert first.get("/products/1") is not None
+    assert second.get("/products/1") is None
+
+    generation = second.generation(["product:1"])
+    first.purge(["product:3"])
+    # second does not know which tags were purged, so nothing built meanwhile is stored.
+    assert second.set("/products/1", entry(b"1"), 60, ["product:1"], generation) is False
+
+
+def test_stock_changes_keep_listings_and_other_workers(monkeypatch):
+    notifier = LocalNotifier()
+    first, second = MemoryBackend(1 << 20, notifier), MemoryBackend(1 << 20, notifier)
+    monkeypatch.setattr(response_cache, "backend", first)
+    for backend in (first, second):
+        backend.set("/products/5", entry(b"5"), 60, ["product", "product:5"])
+        backend.set("/products/", entry(b"[]"), 60, ["product", "product:*"])
+    invalidate_product_stock([5])
+    assert first.get("/products/5") is None
+    assert first.get("/products/") is not None
+    assert second.get("/products/5") is not None and second.get("/products/") is not None
+
+
+@pytest.fixture
+def cached_catalog(monkeypatch):
+    monkeypatch.setattr(response_cache, "backend", MemoryBackend(1 << 20))
+    cursor = CatalogCursor()
+
+    async def fake_db():
+        yield None, cursor
+
+    main.api.dependency_overrides[get_async_read_db] = fake_db
+    yield TestClient(main.api), cursor
+    main.api.dependency_overrides.clear()
+
+
+def test_repeated_reads_skip_the_handler(cached_catalog):
+    client, cursor = cached_catalog
+    first = client.get("/products/5")
+    second = client.get("/products/5")
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.json() == first.json()
+    assert len(cursor.queries) == 1
+
+    revalidated = client.get("/products/5", headers={"If-None-Match": first.headers["ETag"]})
+    assert revalidated.status_code == 304
+    assert len(cursor.queries) == 1
+
+
+def test_writes_purge_affected_responses(cached_catalog):
+    client, cursor = cached_catalog
+    client.get("/products/5")
+    invalidate_product_caches([6])
+    assert client.get("/products/5").headers.get("X-Cache") == "HIT"
+
+    invalidate_product_caches([5])
+    assert "X-Cache" not in client.get("/products/5").headers
+
+    # Product responses embed the category name.
+    invalidate_category_caches([1])
+    assert "X-Cache" not in client.get("/products/5").headers
+    assert len(cursor.queries) == 3
+
+
+def test_write_during_a_read_is_not_cached(cached_catalog):
+    client, cursor = cached_catalog
+    execute = cursor.execute
+
+    async def execute_then_write(query, params=None):
+        # The row was read, then a write committed before the response was stored.
+        await execute(query, params)
+        invalidate_product_caches([5])
+
+    cursor.execute = execute_then_write
+    client.get("/products/5")
+    cursor.execute = execute
+    assert "X-Cache" not in client.get("/products/5").headers
+    assert client.get("/products/5").headers["X-Cache"] == "HIT"
+
+
+def test_errors_are_not_cached(cached_catalog):
+    client, cursor = cached_catalog
+    cursor.product = None
+    uncacheable = response_cache.stats()["uncacheable"]
+    assert client.get("/products/5").status_code == 404
+    assert client.get("/products/5").status_code == 404
+    assert len(cursor.queries) == 2
+    assert response_cache.stats()["uncacheable"] == uncacheable + 2
@@ -0,0 +1,77 @@
+from decimal import Decimal
+from api.core.search_index import SearchIndex, tokenize
+
+
+def product(product_id, name, description="", price="10.00", category_id=1, category_name="Home"):
+    return {
+        "id": product_id,
+        "name": name,
+        "description": description,
+        "price": Decimal(price),
+        "category_id": category_id,
+        "category_name": category_name,
+    }
+
+
+def make_index():
+    index = SearchIndex()
+    index.begin_rebuild()
+    index.load([
+        product(1, "Walnut desk lamp", "Warm light for your desk"),
+        product(2, "Standing desk", "Oak top, electric", price="450.00", category_id=2, category_name="Office"),
+        product(3, "Floor lamp", "Tall lamp with linen shade", price="89.00"),
+        product(4, "Wireless speaker", "Portable speaker", price="59.00", category_id=3, category_name="Audio"),
+    ])
+    return index
+
+
+def test_tokenize_lowercases_and_drops_stopwords():
+    assert tokenize("The Lamp, for DESKS") == ["lamp", "desks"]
+
+
+def test_bm25_ranks_stronger_matches_first():
+    ids, total = make_index().search("lamp")
+    assert total == 2
+    # "lamp" twice in product 3 (name + description) outranks product 1.
+    assert ids == [3, 1]
+
+
+def test_all_words_required_and_last_word_is_prefix():
+    index = make_index()
+    assert index.search("desk la")[0] == [1]
+    assert index.search("wire")[0] == [4]
+    assert index.search("desk speaker") == ([], 0)
+
+
+def test_category_name_is_searchable():
+    assert make_index().search("office")[0] == [2]
+
+
+def test_filters_and_paging():
+    index = make_index()
+    assert index.search("lamp", max_price=50)[0] == [1]
+    assert index.search("desk", category_id=2)[0] == [2]
+    ids, total = index.search("desk", limit=1, offset=1)
+    assert total == 2 and len(ids) == 1
+
+
+def test_incremental_add_update_remove():
+    index = make_index()
+    index.add(product(5, "Brass lamp"))
+    assert 5 in index.search("brass")[0]
+
+    index.add(product(5, "Brass mirror"))
+    assert index.search("brass lamp") == ([], 0)
+    assert index.search("mirror")[0] == [5]
+
+    index.remove(5)
+    assert index.search("brass") == ([], 0)
+    assert index.stats()["documents"] == 4
+
+
+def test_writes_during_rebuild_are_replayed():
+    index = make_index()
+    index.begin_rebuild()
+    index.add(product(9, "Velvet cushion"))
+    index.load([product(1, "Walnut desk lamp")])
+    assert index.search("velvet")[0] == [9]
@@ -0,0 +1,178 @@
+from contextlib import contextmanager
+from datetime import datetime
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+from api.core.revocation import TokenVersions
+from api.core.security import create_access_token, access_token_claims
+from api.dependencies import get_current_user
+from api import dependencies
+from api.core import security
+from api.db import repository
+from api.db.repository import user_cache, update_user_role, set_user_active, load_token_versions
+from api.routers import user as user_router
+
+
+class UsersCursor:
+    def __init__(self, users):
+        self.users = users
+        self.queries = []
+        self.rowcount = 0
+        self.row = None
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+        if query.startswith("UPDATE"):
+            value, user_id = params
+            column = "role" if "role" in query else "is_active"
+            matches = [user for user in self.users if user["id"] == user_id]
+            for user in matches:
+                user[column] = value
+                user["token_version"] += 1
+            self.rowcount = len(matches)
+        elif "WHERE email=%s" in query:
+            self.row = next((user for user in self.users if user["email"] == params[0]), None)
+            if self.row is not None:
+                self.row = {column: self.row[column] for column in repository.USER_PUBLIC_COLUMNS.split(", ")}
+        elif "WHERE id = %s" in query:
+            self.row = next(({"email": user["email"], "token_version": user["token_version"]} for user in self.users if user["id"] == params[0]), None)
+
+    def fetchone(self):
+        return self.row
+
+
+class FakeDB:
+    def commit(self):
+        pass
+
+
+@pytest.fixture
+def db_conn(monkeypatch):
+    for module in (security, dependencies):
+        monkeypatch.setattr(module, "SECRET_KEY", "test-secret")
+        monkeypatch.setattr(module, "ALGORITHM", "HS256")
+    user_cache.clear()
+    users = [{"id": 1, "email": "ann@example.com", "password": "$argon2id$hash", "full_name": "Ann", "role": "user", "is_active": 1, "created_at": datetime(2025, 1, 1), "token_version": 0}]
+    conn = (FakeDB(), UsersCursor(users))
+
+    @contextmanager
+    def fake_auth_db():
+        yield conn
+
+    monkeypatch.setattr(dependencies, "auth_db", fake_auth_db)
+    monkeypatch.setattr(user_router, "auth_db", fake_auth_db)
+    yield conn
+    user_cache.clear()
+
+
+def authenticate(db_conn, email="ann@example.com"):
+    request = Request({"type": "http", "headers": []})
+    return get_current_user(request, create_access_token({"sub": email}))
+
+
+def test_repeat_requests_skip_the_database(db_conn):
+    _, cursor = db_conn
+    hits_before = user_cache.stats()["hits"]
+    assert authenticate(db_conn)["id"] == 1
+    assert authenticate(db_conn)["id"] == 1
+    assert len(cursor.queries) == 1
+    assert user_cache.stats()["hits"] == hits_before + 1
+
+
+def test_profile_comes_from_the_cache(db_conn):
+    _, cursor = db_conn
+    user = authenticate(db_conn)
+    assert user_router.get_me(user)["full_name"] == "Ann"
+    assert len(cursor.queries) == 1  # the lookup made while authenticating
+
+    user_cache.clear()
+    assert user_router.get_me(user)["full_name"] == "Ann"
+    assert len(cursor.queries) == 2
+
+
+def test_password_hash_is_never_returned(db_conn):
+    user = authenticate(db_conn)
+    assert "password" not in user
+    # Callers get a copy; changing it does not change the cached entry.
+    user["role"] = "admin"
+    assert authenticate(db_conn)["role"] == "user"
+
+
+def test_role_change_invalidates_entry(db_conn):
+    assert authenticate(db_conn)["role"] == "user"
+    assert update_user_role(db_conn, 1, "admin")
+    assert authenticate(db_conn)["role"] == "admin"
+
+
+def test_deactivated_user_is_rejected_immediately(db_conn):
+    authenticate(db_conn)
+    assert set_user_active(db_conn, 1, False)
+    with pytest.raises(HTTPException) as exc:
+        authenticate(db_conn)
+    assert exc.value.status_code == 403
+
+
+def test_unknown_user_is_not_cached(db_conn):
+    with pytest.raises(HTTPException):
+        authenticate(db_conn, "nobody@example.com")
+    assert len(user_cache) == 0
+
+
+@pytest.fixture
+def stateless(db_conn, monkeypatch):
+    monkeypatch.setattr(dependencies, "STATELESS_TOKENS", True)
+    versions = TokenVersions(max_age=60)
+    monkeypatch.setattr(dependencies, "token_versions", versions)
+    monkeypatch.setattr(repository, "token_versions", versions)
+    versions.load([])
+    return versions
+
+
+def claims_token(db_conn):
+    _, cursor = db_conn
+    return create_access_token(access_token_claims(cursor.users[0]))
+
+
+def authenticate_with(token):
+    return get_current_user(Request({"type": "http", "headers": []}), token)
+
+
+def test_stateless_token_skips_the_database(db_conn, stateless):
+    _, cursor = db_conn
+    user = authenticate_with(claims_token(db_conn))
+    assert user["id"] == 1 and user["role"] == "user"
+    assert cursor.queries == []
+
+
+def test_role_change_outdates_stateless_tokens(db_conn, stateless):
+    _, cursor = db_conn
+    token = claims_token(db_conn)
+    assert update_user_role(db_conn, 1, "admin")
+    # The token still says "user", but its version is behind: the role is
+    # read from the database instead.
+    assert authenticate_with(token)["role"] == "admin"
+    assert stateless.stats()["outdated_tokens"] == 1
+
+
+def test_other_workers_see_bumps_on_reload(db_conn, stateless):
+    _, cursor = db_conn
+    token = claims_token(db_conn)
+    cursor.users[0]["role"] = "admin"
+    cursor.users[0]["token_version"] = 1
+
+    class VersionsCursor:
+        def execute(self, query, params=None):
+            pass
+
+        def fetchall(self):
+            return [{"id": 1, "token_version": 1}]
+
+    load_token_versions((None, VersionsCursor()))
+    assert authenticate_with(token)["role"] == "admin"
+
+
+def test_stale_versions_fall_back_to_the_database(db_conn, stateless):
+    _, cursor = db_conn
+    stateless.max_age = -1
+    authenticate_with(claims_token(db_conn))
+    assert len(cursor.queries) == 1